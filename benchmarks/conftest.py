@@ -0,0 +1,44 @@
+from pathlib import Path
+from typing import Dict, List
+import numpy as np
+import pytest
+from scripts.serialization_benchmark import synthetic_corpus
+
+def pytest_addoption(parser):
+    group = parser.getgroup("fioneer benchmarks")
+    group.addoption("--bench-sizes", default="10000",
+                    help="Comma-separated corpus sizes in vectors, e.g. 10000,1000000,10000000")
+    group.addoption("--bench-dim", type=int, default=1536,
+                    help="Embedding dimension of the synthetic corpus (1536 for text-embedding-ada-002)")
+
+def pytest_generate_tests(metafunc):
+    if "n_vectors" in metafunc.fixturenames:
+        sizes = [int(size) for size in metafunc.config.getoption("--bench-sizes").split(",")]
+        metafunc.parametrize("n_vectors", sizes, scope="session")
+
+@pytest.fixture(scope="session")
+def dimension(request) -> int:
+    return request.config.getoption("--bench-dim")
+
+@pytest.fixture(scope="session")
+def corpus(n_vectors: int, dimension: int):
+    """Normalized random vectors and extractor-shaped metadata; the metadata cycles 10k distinct entries"""
+    rng = np.random.default_rng(0)
+    vectors = np.empty((n_vectors, dimension), dtype=np.float32)
+    # Filled in chunks so large corpora do not need a float64 copy
+    for start in range(0, n_vectors, 100_000):
+        chunk = rng.standard_normal((min(100_000, n_vectors - start), dimension), dtype=np.float32)
+        vectors[start:start + len(chunk)] = chunk / np.linalg.norm(chunk, axis=1, keepdims=True)
+    entries = synthetic_corpus(min(n_vectors, 10_000))
+    metadata: List[Dict] = [entries[i % len(entries)] for i in range(n_vectors)]
+    return vectors, metadata
+
+@pytest.fixture(scope="session")
+def index_dir(corpus, tmp_path_factory) -> Path:
+    """A flat index over the corpus, built once per size"""
+    from scripts.create_index import create_and_save_index
+
+    vectors, metadata = corpus
+    output_dir = tmp_path_factory.mktemp(f"index-{len(vectors)}")
+    create_and_save_index(vectors, metadata, output_dir)
+    return output_dir
@@ -0,0 +1,45 @@
+import asyncio
+import numpy as np
+import pandas as pd
+import pytest
+from fioneer.embeddings.vectorizer import EmbeddingGenerator
+from scripts.earnings_to_csv import parse_earnings_call
+from scripts.metadata_extractor import MetadataExtractor
+from scripts.serialization_benchmark import synthetic_corpus
+
+SPEAKERS = ["Operator", "Tim Cook", "Luca Maestri", "Erik Woodring", "Analyst"]
+
+@pytest.fixture(scope="module")
+def entries():
+    return synthetic_corpus(2000)
+
+@pytest.fixture(scope="module")
+def transcript() -> str:
+    """About 600 lines, the length of a long earnings call"""
+    lines = [f"{SPEAKERS[i % len(SPEAKERS)]}: " + "Revenue grew in every geography this quarter. " * (1 + i % 8)
+             for i in range(600)]
+    return "\n\n".join(lines)
+
+def test_format_text(benchmark, entries):
+    generator = EmbeddingGenerator()
+    texts = benchmark(lambda: [generator.format_text(entry) for entry in entries])
+    assert len(texts) == len(entries)
+
+def test_process_items(benchmark, entries, monkeypatch):
+    # Stubbed embedder: measures formatting and batching around the API call
+    async def create_embeddings(texts, model):
+        return np.zeros((len(texts), 1536), dtype=np.float32)
+
+    monkeypatch.setattr("fioneer.embeddings.backends.create_embeddings", create_embeddings)
+    generator = EmbeddingGenerator()
+    embeddings = benchmark(lambda: asyncio.run(generator.process_items(entries)))
+    assert embeddings.shape == (len(entries), 1536)
+
+def test_parse_earnings_call(benchmark, transcript):
+    parsed = benchmark(parse_earnings_call, transcript)
+    assert len(parsed) == 600
+
+def test_split_sections(benchmark, transcript):
+    df = pd.DataFrame(parse_earnings_call(transcript))
+    sections = benchmark(MetadataExtractor.split_sections, df)
+    assert len(sections) == 120
@@ -0,0 +1,32 @@
+import asyncio
+import numpy as np
+from fioneer.retrieval.faiss_retriever import FaissRetriever
+from scripts.create_index import create_and_save_index
+
+def test_search_similar(benchmark, corpus, index_dir):
+    vectors, _ = corpus
+    retriever = FaissRetriever()
+    retriever.load_index(index_dir)
+    query = vectors[:1] + np.float32(0.01)
+
+    # Stubbed embedder: measures search and result assembly, not the API call
+    async def generate_embeddings(texts):
+        return query
+
+    retriever.embedding_generator.generate_embeddings = generate_embeddings
+    loop = asyncio.new_event_loop()
+    try:
+        results = benchmark(lambda: loop.run_until_complete(retriever.search_similar("guidance", k=5)))
+    finally:
+        loop.close()
+    assert len(results) == 5
+
+def test_load_index(benchmark, index_dir):
+    retriever = FaissRetriever()
+    benchmark.pedantic(retriever.load_index, args=(index_dir,), rounds=3, warmup_rounds=1)
+    assert retriever.index.ntotal == len(retriever.metadata)
+
+def test_create_and_save_index(benchmark, corpus, tmp_path):
+    vectors, metadata = corpus
+    benchmark.pedantic(create_and_save_index, args=(vectors, metadata, tmp_path), rounds=3)
+    assert (tmp_path / "earnings.index").exists()
@@ -1,5 +1,7 @@
+import argparse
 import unittest
 import sys
+from pathlib import Path
 
 def run_tests():
     """Run all tests with verbose output"""
@@ -17,5 +19,43 @@ def run_tests_quiet():
     result = runner.run(test_suite)
     sys.exit(not result.wasSuccessful())
 
+def main():
+    """fioneer command line: run or inspect the data pipeline"""
+    from fioneer.pipeline import build_pipeline
+
+    parser = argparse.ArgumentParser(prog="fioneer", description="Run the fioneer data pipeline")
+    parser.add_argument("--root", type=Path, default=Path("."), help="Repository checkout to run in")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser("run", help="Run stages whose inputs changed")
+    run_parser.add_argument("stages", nargs="*", help="Target stages (default: all but manual ones)")
+    run_parser.add_argument("--force", action="store_true", help="Rerun targets and dependencies regardless of hashes")
+    run_parser.add_argument("--dry-run", action="store_true", help="Only show what would run")
+    run_parser.add_argument("--jobs", type=int, default=4, help="Maximum stages running in parallel")
+
+    status_parser = subparsers.add_parser("status", help="Show which stages are stale")
+    status_parser.add_argument("stages", nargs="*")
+
+    args = parser.parse_args()
+    pipeline = build_pipeline(args.root)
+
+    if args.command == "status":
+        for name in pipeline.selected(args.stages):
+            missing = pipeline.stages[name].missing_requirements()
+            plan = None if missing else pipeline.plan(pipeline.stages[name])
+            if missing:
+                status = f"skipped ({', '.join(missing)} not installed)"
+            elif plan is None:
+                status = "up to date"
+            elif plan and not plan[0].startswith("-"):
+                status = f"stale ({len(plan)} items)"
+            else:
+                status = "stale"
+            print(f"{name:<14}{status}")
+        return
+
+    results = pipeline.run(args.stages, force=args.force, dry_run=args.dry_run, jobs=args.jobs)
+    sys.exit(any(result in ("failed", "blocked") for result in results.values()))
+
 if __name__ == '__main__':
-    run_tests() 
\ No newline at end of file
+    main() 
\ No newline at end of file
@@ -1,16 +1,27 @@
 from pydantic_settings import BaseSettings
 from pydantic import Field
 from functools import lru_cache
+from typing import Optional
 from dotenv import load_dotenv
 
-load_dotenv()
-
 class Settings(BaseSettings):
-    ninja_api_key: str = Field(..., env='NINJA_API_KEY')
-    openai_api_key: str = Field(..., env='OPENAI_API_KEY')
-    hf_write_token: str = Field(..., env='HF_WRITE_TOKEN')
-    hf_read_token: str = Field(..., env='HF_READ_TOKEN')
+    # Every credential is optional so commands only need the keys they use
+    ninja_api_key: Optional[str] = Field(None, env='NINJA_API_KEY')
+    openai_api_key: Optional[str] = Field(None, env='OPENAI_API_KEY')
+    hf_write_token: Optional[str] = Field(None, env='HF_WRITE_TOKEN')
+    hf_read_token: Optional[str] = Field(None, env='HF_READ_TOKEN')
+    # OpenAI quotas; learned from response headers when unset
+    openai_rpm_limit: Optional[int] = Field(None, env='OPENAI_RPM_LIMIT')
+    openai_tpm_limit: Optional[int] = Field(None, env='OPENAI_TPM_LIMIT')
+
+    def require(self, name: str) -> str:
+        """Return a credential, raising a clear error if it is not configured"""
+        value = getattr(self, name)
+        if not value:
+            raise ValueError(f"{name.upper()} is not set; add it to the environment or .env")
+        return value
 
 @lru_cache()
 def get_settings():
-    return Settings() 
\ No newline at end of file
+    load_dotenv()
+    return Settings()
@@ -1,3 +1,6 @@
+from .backends import BACKENDS, EmbeddingBackend, LocalBackend, OpenAIBackend, create_backend
+from .hedging import HedgingPolicy
 from .vectorizer import EmbeddingGenerator
 
-__all__ = ["generate_embedding", "EmbeddingGenerator"]
\ No newline at end of file
+__all__ = ["EmbeddingGenerator", "HedgingPolicy",
+           "BACKENDS", "EmbeddingBackend", "LocalBackend", "OpenAIBackend", "create_backend"]
@@ -0,0 +1,148 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence
+from fioneer.llm.openai_client import create_embeddings
+
+# numpy and sentence-transformers are imported on first use to keep imports cheap
+if TYPE_CHECKING:
+    import numpy as np
+
+class EmbeddingBackend:
+    """
+    Turns texts into embedding vectors
+
+    spec() is what index and store manifests record, and create_backend()
+    rebuilds an equivalent backend from it, so queries are embedded by the
+    model the index was built with.
+    """
+
+    name = ""
+    # Remote calls have a latency tail worth hedging; local inference does not
+    remote = False
+
+    def __init__(self, model: str):
+        self.model = model
+
+    async def embed(self, texts: List[str]) -> Sequence[Sequence[float]]:
+        raise NotImplementedError
+
+    def spec(self) -> Dict[str, str]:
+        return {"backend": self.name, "model": self.model}
+
+    def warm(self, timeout: float = 300.0) -> None:
+        """Load whatever the first call would otherwise load"""
+
+    def close(self) -> None:
+        """Release workers and models; calls already submitted still complete"""
+
+class OpenAIBackend(EmbeddingBackend):
+    """OpenAI embeddings API"""
+
+    name = "openai"
+    remote = True
+
+    def __init__(self, model: str = "text-embedding-ada-002"):
+        super().__init__(model)
+
+    async def embed(self, texts: List[str]) -> List[List[float]]:
+        return await create_embeddings(texts, self.model)
+
+class LocalBackend(EmbeddingBackend):
+    """
+    sentence-transformers model run on CPU, from a local path or model name
+
+    Inputs are split into batches encoded on a pool of worker threads.
+    Each worker loads its own copy of the model, because tokenizers are not
+    safe to share between threads; the model's native code releases the
+    GIL, so workers encode batches in parallel and the event loop is never
+    blocked. runtime="onnx" runs an exported ONNX model with onnxruntime.
+    """
+
+    name = "local"
+    RUNTIMES = ("torch", "onnx")
+
+    def __init__(self, model: str, runtime: str = "torch", workers: int = 1, batch_size: int = 32, normalize: bool = True):
+        if runtime not in self.RUNTIMES:
+            raise ValueError(f"Unknown runtime {runtime}; expected one of {', '.join(self.RUNTIMES)}")
+        super().__init__(model)
+        self.runtime = runtime
+        self.workers = max(1, workers)
+        self.batch_size = batch_size
+        self.normalize = normalize
+        self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="local-embed")
+        self.local = threading.local()
+
+    def spec(self) -> Dict[str, str]:
+        return {**super().spec(), "runtime": self.runtime}
+
+    def load_model(self):
+        try:
+            from sentence_transformers import SentenceTransformer
+        except ImportError:
+            raise ImportError(
+                'The local embedding backend needs sentence-transformers: pip install "fioneer[local-embeddings]"'
+            ) from None
+        options = {"backend": "onnx"} if self.runtime == "onnx" else {}
+        return SentenceTransformer(os.path.expanduser(self.model), device="cpu", **options)
+
+    def _model(self):
+        if getattr(self.local, "model", None) is None:
+            self.local.model = self.load_model()
+        return self.local.model
+
+    def _encode(self, texts: List[str]) -> "np.ndarray":
+        import numpy as np
+
+        vectors = self._model().encode(
+            texts, batch_size=self.batch_size, normalize_embeddings=self.normalize, convert_to_numpy=True
+        )
+        return np.asarray(vectors, dtype=np.float32)
+
+    async def embed(self, texts: List[str]) -> "np.ndarray":
+        import numpy as np
+
+        loop = asyncio.get_running_loop()
+        batches = [texts[i:i + self.batch_size] for i in range(0, len(texts), self.batch_size)]
+        results = await asyncio.gather(*(loop.run_in_executor(self.executor, self._encode, batch) for batch in batches))
+        return np.vstack(results)
+
+    def warm(self, timeout: float = 300.0) -> None:
+        """Load the model on every worker, so no query waits for a load; raises if any load fails"""
+        # The barrier keeps each task on its own worker until all have loaded
+        barrier = threading.Barrier(self.workers, timeout=timeout)
+
+        def load() -> None:
+            try:
+                self._model()
+            except BaseException:
+                # Release the workers waiting on this one
+                barrier.abort()
+                raise
+            barrier.wait()
+
+        futures = [self.executor.submit(load) for _ in range(self.workers)]
+        errors = [future.exception() for future in futures if future.exception()]
+        if errors:
+            # Report the failed load rather than the broken barrier it caused
+            raise next((e for e in errors if not isinstance(e, threading.BrokenBarrierError)), errors[0])
+
+    def close(self) -> None:
+        # Workers exit once their queued batches finish, taking their model copies with them
+        self.executor.shutdown(wait=False)
+
+BACKENDS = {
+    "openai": OpenAIBackend,
+    "local": LocalBackend,
+}
+
+def create_backend(spec: Optional[Dict] = None, **options) -> EmbeddingBackend:
+    """Backend described by a manifest spec (default: OpenAI); options add settings such as workers"""
+    spec = dict(spec or {"backend": "openai"})
+    name = spec.pop("backend")
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown embedding backend: {name}; expected one of {', '.join(BACKENDS)}")
+    # Recorded for information only
+    spec.pop("dimension", None)
+    return BACKENDS[name](**spec, **options)
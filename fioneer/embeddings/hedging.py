@@ -0,0 +1,42 @@
+import threading
+from collections import deque
+
+class HedgingPolicy:
+    """
+    When to send a backup request for a slow query embedding
+
+    The hedge delay is a percentile of recent primary latencies, so roughly
+    (100 - percentile)% of calls are hedged. Until enough samples exist the
+    initial delay is used; the delay is always clipped to [min, max].
+    """
+
+    def __init__(
+        self,
+        percentile: float = 95.0,
+        initial_delay_ms: float = 500.0,
+        min_delay_ms: float = 20.0,
+        max_delay_ms: float = 5000.0,
+        min_samples: int = 20,
+        window: int = 1000,
+    ):
+        self.percentile = percentile
+        self.initial_delay = initial_delay_ms / 1000
+        self.min_delay = min_delay_ms / 1000
+        self.max_delay = max_delay_ms / 1000
+        self.min_samples = min_samples
+        self.latencies = deque(maxlen=window)
+        self.lock = threading.Lock()
+
+    def observe(self, seconds: float) -> None:
+        """Record how long a primary request took"""
+        with self.lock:
+            self.latencies.append(seconds)
+
+    def delay(self) -> float:
+        """Seconds to wait for the primary before sending a backup"""
+        with self.lock:
+            if len(self.latencies) < self.min_samples:
+                return self.initial_delay
+            samples = sorted(self.latencies)
+        value = samples[min(len(samples) - 1, int(round(self.percentile / 100 * (len(samples) - 1))))]
+        return min(self.max_delay, max(self.min_delay, value))
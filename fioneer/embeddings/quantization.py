@@ -0,0 +1,53 @@
+from pathlib import Path
+from typing import Optional
+import numpy as np
+
+# Storage formats for embedding files
+STORAGE_DTYPES = ("float32", "float16", "int8")
+EMBEDDING_SUFFIXES = (".npy", ".npz")
+
+def quantize_int8(embeddings: np.ndarray):
+    """Symmetric per-vector int8 scalar quantization, returns (codes, scales)"""
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    scales = np.abs(embeddings).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    codes = np.round(embeddings / scales[:, None]).astype(np.int8)
+    return codes, scales.astype(np.float32)
+
+def dequantize_int8(codes: np.ndarray, scales: np.ndarray) -> np.ndarray:
+    """Reconstruct float32 vectors from int8 codes and per-vector scales"""
+    return codes.astype(np.float32) * scales[:, None]
+
+def embedding_path(embeddings_dir: Path, stem: str, dtype: str = "float32") -> Path:
+    """Path of the embedding file for a metadata stem in the given storage dtype"""
+    suffix = ".npz" if dtype == "int8" else ".npy"
+    return Path(embeddings_dir) / f"{stem}{suffix}"
+
+def find_embedding_file(embeddings_dir: Path, stem: str) -> Optional[Path]:
+    """Find an existing embedding file for a stem regardless of storage dtype"""
+    for suffix in EMBEDDING_SUFFIXES:
+        path = Path(embeddings_dir) / f"{stem}{suffix}"
+        if path.exists():
+            return path
+    return None
+
+def save_embeddings(embeddings_dir: Path, stem: str, embeddings: np.ndarray, dtype: str = "float32") -> Path:
+    """Save embeddings in float32, float16 or int8 (scalar quantized) storage"""
+    if dtype not in STORAGE_DTYPES:
+        raise ValueError(f"Unsupported storage dtype: {dtype}")
+
+    path = embedding_path(embeddings_dir, stem, dtype)
+    if dtype == "int8":
+        codes, scales = quantize_int8(embeddings)
+        np.savez(path, codes=codes, scales=scales)
+    else:
+        np.save(path, np.asarray(embeddings).astype(dtype))
+    return path
+
+def load_embeddings(path: Path) -> np.ndarray:
+    """Load an embedding file of any storage dtype as float32"""
+    path = Path(path)
+    if path.suffix == ".npz":
+        with np.load(path) as data:
+            return dequantize_int8(data["codes"], data["scales"])
+    return np.load(path).astype(np.float32, copy=False)
@@ -0,0 +1,255 @@
+import json
+import os
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from fioneer.embeddings.backends import OpenAIBackend
+from fioneer.embeddings.quantization import (
+    STORAGE_DTYPES,
+    EMBEDDING_SUFFIXES,
+    dequantize_int8,
+    load_embeddings,
+    quantize_int8,
+)
+
+class EmbeddingStore:
+    """
+    Append-only embedding store made of memory-mappable shard files
+
+    Each shard is a raw row-major matrix (`shard-00000.bin`, plus
+    `shard-00000.scales.bin` for int8) and `store.json` maps every source
+    transcript to its shard, row range and content hash. Re-embedding a
+    source appends new rows and repoints its entry; `compact()` drops the
+    orphaned rows. Sealed shards never change, so delta syncs only move the
+    active shard.
+    """
+
+    MANIFEST_NAME = "store.json"
+
+    def __init__(self, root: Path, dtype: Optional[str] = None, shard_rows: int = 16384):
+        self.root = Path(root)
+        self.manifest_path = self.root / self.MANIFEST_NAME
+        self._arrays = {}
+
+        if self.manifest_path.exists():
+            with open(self.manifest_path, "r") as f:
+                self.manifest = json.load(f)
+            if dtype and dtype != self.manifest["dtype"] and self.manifest["entries"]:
+                raise ValueError(
+                    f"Store at {self.root} holds {self.manifest['dtype']} embeddings, not {dtype}"
+                )
+        else:
+            dtype = dtype or "float32"
+            if dtype not in STORAGE_DTYPES:
+                raise ValueError(f"Unsupported storage dtype: {dtype}")
+            self.manifest = {
+                "dtype": dtype,
+                "dimension": None,
+                "shard_rows": shard_rows,
+                "shards": [],
+                "entries": {},
+            }
+
+    @property
+    def dtype(self) -> str:
+        return self.manifest["dtype"]
+
+    @property
+    def dimension(self) -> Optional[int]:
+        return self.manifest["dimension"]
+
+    @property
+    def embedding(self) -> Optional[Dict]:
+        """Spec of the embedding backend that produced the stored rows (None for an empty store)"""
+        if self.manifest.get("embedding"):
+            return self.manifest["embedding"]
+        # Stores written before backends were recorded hold OpenAI embeddings
+        return OpenAIBackend().spec() if self.manifest["entries"] else None
+
+    def set_embedding(self, spec: Dict) -> None:
+        """Record the backend new rows come from; rows from different models cannot share a store"""
+        if self.manifest["entries"] and self.embedding != spec:
+            raise ValueError(f"Store at {self.root} holds embeddings from {self.embedding}, not {spec}")
+        self.manifest["embedding"] = spec
+
+    def __contains__(self, source: str) -> bool:
+        return source in self.manifest["entries"]
+
+    def __len__(self) -> int:
+        return len(self.manifest["entries"])
+
+    def sources(self) -> List[str]:
+        """Sources in the store, sorted by name"""
+        return sorted(self.manifest["entries"])
+
+    def content_hash(self, source: str) -> Optional[str]:
+        """Content hash of the source the stored embeddings were generated from"""
+        entry = self.manifest["entries"].get(source)
+        return entry["sha256"] if entry else None
+
+    def row_count(self, source: str) -> int:
+        """Number of embedding rows stored for a source"""
+        entry = self.manifest["entries"][source]
+        return entry["end"] - entry["start"]
+
+    @property
+    def live_rows(self) -> int:
+        return sum(entry["end"] - entry["start"] for entry in self.manifest["entries"].values())
+
+    @property
+    def total_rows(self) -> int:
+        return sum(shard["rows"] for shard in self.manifest["shards"])
+
+    def files(self) -> List[Path]:
+        """All files backing the store, with the manifest last"""
+        paths = []
+        for shard in self.manifest["shards"]:
+            paths.append(self.root / shard["file"])
+            if self.dtype == "int8":
+                paths.append(self.root / shard["scales_file"])
+        paths.append(self.manifest_path)
+        return paths
+
+    def _row_bytes(self) -> int:
+        return self.dimension * np.dtype(self.dtype).itemsize
+
+    def _shard_arrays(self, shard_idx: int) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+        """Memory-map a shard (and its int8 scales) read-only"""
+        if shard_idx not in self._arrays:
+            shard = self.manifest["shards"][shard_idx]
+            rows = shard["rows"]
+            codes = np.memmap(self.root / shard["file"], dtype=self.dtype, mode="r",
+                              shape=(rows, self.dimension))
+            scales = None
+            if self.dtype == "int8":
+                scales = np.memmap(self.root / shard["scales_file"], dtype=np.float32, mode="r",
+                                   shape=(rows,))
+            self._arrays[shard_idx] = (codes, scales)
+        return self._arrays[shard_idx]
+
+    def get(self, source: str) -> np.ndarray:
+        """Return the embeddings of a source as float32"""
+        entry = self.manifest["entries"][source]
+        codes, scales = self._shard_arrays(entry["shard"])
+        rows = codes[entry["start"]:entry["end"]]
+        if scales is not None:
+            return dequantize_int8(rows, scales[entry["start"]:entry["end"]])
+        return np.array(rows, dtype=np.float32)
+
+    def load(self, sources: Optional[List[str]] = None) -> np.ndarray:
+        """Stack the embeddings of the given sources (default: all, sorted) as one float32 matrix"""
+        sources = self.sources() if sources is None else sources
+        if not sources:
+            return np.empty((0, self.dimension or 0), dtype=np.float32)
+        return np.vstack([self.get(source) for source in sources])
+
+    def append(self, source: str, embeddings: np.ndarray, content_hash: str) -> None:
+        """Append embeddings for a source, replacing any previous entry for it"""
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        if embeddings.ndim != 2 or len(embeddings) == 0:
+            raise ValueError(f"Expected a non-empty 2D embedding matrix for {source}")
+        if self.dimension is None:
+            self.manifest["dimension"] = int(embeddings.shape[1])
+        elif embeddings.shape[1] != self.dimension:
+            raise ValueError(
+                f"Embedding dimension {embeddings.shape[1]} does not match store dimension {self.dimension}"
+            )
+
+        self.root.mkdir(parents=True, exist_ok=True)
+        if self.dtype == "int8":
+            codes, scales = quantize_int8(embeddings)
+        else:
+            codes, scales = embeddings.astype(self.dtype), None
+        location = self._write_rows(self.manifest, codes, scales)
+        self.manifest["entries"][source] = {**location, "sha256": content_hash}
+        self._save_manifest()
+
+    def _write_rows(self, manifest: Dict, codes: np.ndarray, scales: Optional[np.ndarray]) -> Dict:
+        """Append rows in storage format to a shard of the manifest; returns their shard and row range"""
+        shard_idx = self._active_shard(manifest, len(codes))
+        shard = manifest["shards"][shard_idx]
+        if scales is not None:
+            self._append_bytes(self.root / shard["scales_file"], shard["rows"] * 4, scales.tobytes())
+        self._append_bytes(self.root / shard["file"], shard["rows"] * self._row_bytes(), codes.tobytes())
+
+        # Data is durable before the manifest points at it
+        start = shard["rows"]
+        shard["rows"] += len(codes)
+        if manifest is self.manifest:
+            self._arrays.pop(shard_idx, None)
+        return {"shard": shard_idx, "start": start, "end": shard["rows"]}
+
+    def _active_shard(self, manifest: Dict, rows: int) -> int:
+        """Index of the shard to append to, opening a new one when the active shard is full"""
+        shards = manifest["shards"]
+        if not shards or (shards[-1]["rows"] and shards[-1]["rows"] + rows > manifest["shard_rows"]):
+            # Numbers are never reused, so a compaction never writes over a live shard
+            number = manifest.get("next_shard", len(shards))
+            manifest["next_shard"] = number + 1
+            name = f"shard-{number:05d}"
+            shard = {"file": f"{name}.bin", "rows": 0}
+            if self.dtype == "int8":
+                shard["scales_file"] = f"{name}.scales.bin"
+            shards.append(shard)
+        return len(shards) - 1
+
+    @staticmethod
+    def _append_bytes(path: Path, expected_size: int, data: bytes) -> None:
+        """Append to a shard file, discarding bytes left behind by an interrupted append"""
+        with open(path, "ab") as f:
+            if f.tell() != expected_size:
+                f.truncate(expected_size)
+                f.seek(expected_size)
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _save_manifest(self) -> None:
+        tmp_path = self.manifest_path.with_name(self.MANIFEST_NAME + ".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(self.manifest, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.manifest_path)
+
+    def compact(self) -> None:
+        """
+        Rewrite the store without rows orphaned by re-embedded sources
+
+        Live rows are copied, one source at a time and without re-quantizing,
+        into newly numbered shards. A single manifest write then switches to
+        them, and only after that are the old shards deleted. A crash before
+        the switch leaves the old store intact. The partial new shards are not
+        in the manifest and are overwritten by the next compaction.
+        """
+        if self.live_rows == self.total_rows:
+            return
+        old_files = self.files()[:-1]
+        compacted = {**self.manifest, "shards": [], "entries": {}}
+        for source in self.sources():
+            entry = self.manifest["entries"][source]
+            codes, scales = self._shard_arrays(entry["shard"])
+            rows = slice(entry["start"], entry["end"])
+            location = self._write_rows(compacted, np.asarray(codes[rows]),
+                                        None if scales is None else np.asarray(scales[rows]))
+            compacted["entries"][source] = {**location, "sha256": entry["sha256"]}
+        self.manifest = compacted
+        self._arrays.clear()
+        self._save_manifest()
+        for path in old_files:
+            path.unlink()
+
+def migrate_legacy_files(embeddings_dir: Path, metadata_dir: Path, dtype: Optional[str] = None) -> int:
+    """Import per-transcript .npy/.npz files into the store and remove them"""
+    from fioneer.hub.manifest import file_sha256
+
+    embeddings_dir = Path(embeddings_dir)
+    store = EmbeddingStore(embeddings_dir, dtype=dtype)
+    migrated = 0
+    for path in sorted(embeddings_dir.iterdir()):
+        if path.suffix not in EMBEDDING_SUFFIXES or path.stem in store:
+            continue
+        metadata_path = Path(metadata_dir) / f"{path.stem}.json"
+        content_hash = file_sha256(metadata_path) if metadata_path.exists() else None
+        store.append(path.stem, load_embeddings(path), content_hash)
+        path.unlink()
+        migrated += 1
+    return migrated
@@ -1,16 +1,40 @@
-from typing import List, Dict, Any
-import numpy as np
-from fioneer.llm.openai_client import create_embeddings
-import json
+from typing import TYPE_CHECKING, List, Dict, Any, Optional
+from fioneer.embeddings.backends import BACKENDS, EmbeddingBackend, OpenAIBackend, create_backend
+from fioneer.embeddings.hedging import HedgingPolicy
+from fioneer.hub.manifest import file_sha256
+from fioneer.metrics import counter, histogram, profile_memory, timer, write_run_summary
+from fioneer import serialization
 import asyncio
+import argparse
 from pathlib import Path
 from concurrent.futures import ThreadPoolExecutor
-from tqdm import tqdm
+
+# numpy, tqdm and the store are imported on first use to keep imports cheap
+if TYPE_CHECKING:
+    import numpy as np
+    from fioneer.embeddings.store import EmbeddingStore
+
+BATCH_SECONDS = histogram("embedding_batch_seconds", "Latency of embedding batches")
+ITEMS_TOTAL = counter("embedding_items_total", "Texts embedded, by outcome")
+HEDGE_CALLS_TOTAL = counter("embedding_hedge_calls_total", "Query embedding calls, by hedging outcome")
+HEDGE_SAVED_SECONDS = counter("embedding_hedge_saved_seconds_total", "Latency saved by backups that beat the primary")
 
 class EmbeddingGenerator:
-    def __init__(self, model: str = "text-embedding-ada-002", batch_size: int = 20):
-        self.model = model
+    def __init__(
+        self,
+        model: str = "text-embedding-ada-002",
+        batch_size: int = 20,
+        hedging: Optional[HedgingPolicy] = None,
+        backend: Optional[EmbeddingBackend] = None,
+    ):
+        # model picks the OpenAI model when no backend is given
+        self.backend = backend or OpenAIBackend(model)
+        self.model = self.backend.model
         self.batch_size = batch_size
+        # Opt-in: query embeddings send a backup request when the primary is slow.
+        # Only remote backends are hedged; a backup local call just competes for the same CPU
+        self.hedging = hedging if self.backend.remote else None
+        self.abandoned = set()
     
     def format_text(self, text: Dict) -> str:
         """Format dictionary into a single string"""
@@ -31,22 +55,30 @@ Insight: {text['insight']}
 Reasoning Steps: {' '.join(text['reasoning_steps'])}
 """
 
-    async def generate_embeddings_batch(self, items: List[Dict]) -> np.ndarray:
+    async def generate_embeddings_batch(self, items: List[Dict]) -> "np.ndarray":
         """Generate embeddings for a batch of items"""
+        import numpy as np
+
         if not items:
             return np.array([])
             
         try:
             texts = [self.format_text(item) for item in items]
-            response = await create_embeddings(texts, self.model)
+            with timer(BATCH_SECONDS, kind="documents"):
+                response = await self.backend.embed(texts)
             embeddings = np.array(response, dtype=np.float32)
+            ITEMS_TOTAL.inc(len(items), kind="documents", status="ok")
             return embeddings
         except Exception as e:
+            ITEMS_TOTAL.inc(len(items), kind="documents", status="error")
             print(f"Error generating embeddings for batch: {e}")
             return np.array([])
 
-    async def process_items(self, items: List[Dict], desc: str = "") -> np.ndarray:
+    async def process_items(self, items: List[Dict], desc: str = "") -> "np.ndarray":
         """Process items in batches"""
+        import numpy as np
+        from tqdm import tqdm
+
         if not items:
             raise ValueError("No items to process")
             
@@ -64,20 +96,95 @@ Reasoning Steps: {' '.join(text['reasoning_steps'])}
             
         return np.vstack(all_embeddings)
 
-    async def generate_embedding(self, text: str) -> np.ndarray:
-        """Generate embedding for a single text query"""
+    async def generate_embeddings(self, texts: List[str]) -> "np.ndarray":
+        """Generate embeddings for a batch of text queries in one backend call"""
+        import numpy as np
+
         try:
-            response = await create_embeddings([text], self.model)
+            with timer(BATCH_SECONDS, kind="queries"):
+                if self.hedging:
+                    response = await self.hedged_create_embeddings(texts)
+                else:
+                    response = await self.backend.embed(texts)
+            ITEMS_TOTAL.inc(len(texts), kind="queries", status="ok")
             return np.array(response, dtype=np.float32)
         except Exception as e:
-            print(f"Error generating embedding: {e}")
+            ITEMS_TOTAL.inc(len(texts), kind="queries", status="error")
+            print(f"Error generating embeddings: {e}")
             raise
 
-async def generate_and_save_embeddings():
-    # Get all JSON files from metadata directory
-    metadata_dir = Path("data/processed/metadata")
-    embeddings_dir = Path("data/embeddings")
-    embeddings_dir.mkdir(exist_ok=True)
+    async def hedged_create_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """
+        Call the embeddings API, sending a backup call if the primary is slow
+
+        Whichever call succeeds first wins. The loser is abandoned rather than
+        interrupted: the API call runs on a worker thread that cannot be
+        stopped, so it is left to finish and its completion time is used to
+        record how much latency the backup saved.
+        """
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        primary = asyncio.ensure_future(self.backend.embed(texts))
+        done, _ = await asyncio.wait({primary}, timeout=self.hedging.delay())
+        if done:
+            if primary.exception() is None:
+                self.hedging.observe(loop.time() - start)
+            HEDGE_CALLS_TOTAL.inc(outcome="unhedged")
+            return primary.result()
+
+        backup = asyncio.ensure_future(self.backend.embed(texts))
+        pending = {primary, backup}
+        winner = None
+        while pending and winner is None:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            # Prefer the primary if both finished; skip a call that failed while the other runs
+            for task in sorted(done, key=lambda t: t is not primary):
+                if task.exception() is None:
+                    winner = task
+                    break
+        won_at = loop.time()
+
+        def primary_finished(task: asyncio.Future) -> None:
+            self.abandoned.discard(task)
+            if not task.cancelled() and task.exception() is None:
+                self.hedging.observe(loop.time() - start)
+                HEDGE_SAVED_SECONDS.inc(loop.time() - won_at)
+
+        def backup_finished(task: asyncio.Future) -> None:
+            self.abandoned.discard(task)
+            # Retrieve a late failure so asyncio does not log it as never retrieved
+            if not task.cancelled():
+                task.exception()
+
+        for task in pending:
+            self.abandoned.add(task)
+            task.add_done_callback(primary_finished if task is primary else backup_finished)
+
+        if winner is None:
+            HEDGE_CALLS_TOTAL.inc(outcome="failed")
+            return primary.result()
+        if winner is primary:
+            self.hedging.observe(won_at - start)
+            HEDGE_CALLS_TOTAL.inc(outcome="primary_won")
+        else:
+            HEDGE_CALLS_TOTAL.inc(outcome="backup_won")
+        return winner.result()
+
+    async def generate_embedding(self, text: str) -> "np.ndarray":
+        """Generate embedding for a single text query"""
+        return await self.generate_embeddings([text])
+
+@profile_memory("embeddings")
+async def generate_and_save_embeddings(
+    dtype: Optional[str] = None,
+    metadata_dir: Path = Path("data/processed/metadata"),
+    embeddings_dir: Path = Path("data/embeddings"),
+    backend: Optional[EmbeddingBackend] = None,
+):
+    """Generate embeddings for changed metadata files and append them to the embedding store"""
+    from fioneer.embeddings.store import EmbeddingStore, migrate_legacy_files
+
+    embeddings_dir.mkdir(parents=True, exist_ok=True)
     
     # Get and sort JSON files
     json_files = sorted(metadata_dir.glob("*.json"))
@@ -86,43 +193,77 @@ async def generate_and_save_embeddings():
         print("No JSON files found in metadata directory")
         return
     
+    # Open the consolidated store, importing any legacy per-transcript files
+    migrated = migrate_legacy_files(embeddings_dir, metadata_dir, dtype=dtype)
+    if migrated:
+        print(f"Imported {migrated} legacy embedding files into the store")
+    store = EmbeddingStore(embeddings_dir, dtype=dtype)
+    
     # Initialize embedding generator
-    generator = EmbeddingGenerator()
+    generator = EmbeddingGenerator(backend=backend)
+    store.set_embedding(generator.backend.spec())
     
     # Process each file sequentially with batch processing
     for json_path in json_files:
-        output_path = embeddings_dir / f"{json_path.stem}.npy"
+        await embed_metadata_file(generator, store, json_path)
+
+async def embed_metadata_file(generator: EmbeddingGenerator, store: "EmbeddingStore", json_path: Path) -> bool:
+    """Embed one metadata file into the store unless it is unchanged; returns True if it was appended"""
+    content_hash = file_sha256(json_path)
+    
+    if store.content_hash(json_path.stem) == content_hash:
+        print(f"Skipping {json_path.name} - embeddings are up to date")
+        return False
         
-        if output_path.exists():
-            print(f"Skipping {json_path.name} - embeddings already exist")
-            continue
-            
-        print(f"\nProcessing {json_path.name}...")
+    print(f"\nProcessing {json_path.name}...")
+    
+    try:
+        # Load JSON data
+        metadata = serialization.load(json_path)
         
-        try:
-            # Load JSON data
-            with open(json_path, "r") as f:
-                metadata = json.load(f)
-            
-            if not metadata:
-                print(f"Skipping {json_path.name} - empty file")
-                continue
-            
-            # Process items in batches
-            embeddings = await generator.process_items(
-                metadata,
-                desc=f"Generating embeddings for {json_path.name}"
-            )
-            
-            # Save embeddings
-            np.save(output_path, embeddings)
-            
-            print(f"Embeddings saved to {output_path}")
-            print(f"Embeddings shape: {embeddings.shape}")
-            
-        except Exception as e:
-            print(f"Error processing {json_path.name}: {e}")
-            continue
+        if not metadata:
+            print(f"Skipping {json_path.name} - empty file")
+            return False
+        
+        # Process items in batches
+        embeddings = await generator.process_items(
+            metadata,
+            desc=f"Generating embeddings for {json_path.name}"
+        )
+        
+        # Rows must line up with metadata entries when the index is built
+        if len(embeddings) != len(metadata):
+            print(f"Skipping {json_path.name} - got {len(embeddings)} embeddings for {len(metadata)} entries")
+            return False
+        
+        # Save embeddings
+        store.append(json_path.stem, embeddings, content_hash)
+        
+        print(f"Embeddings appended to {store.manifest_path}")
+        print(f"Embeddings shape: {embeddings.shape}")
+        return True
+        
+    except Exception as e:
+        print(f"Error processing {json_path.name}: {e}")
+        return False
 
 if __name__ == "__main__":
-    asyncio.run(generate_and_save_embeddings())
+    from fioneer.embeddings.quantization import STORAGE_DTYPES
+
+    parser = argparse.ArgumentParser(description="Generate embeddings for metadata files")
+    parser.add_argument("--dtype", choices=STORAGE_DTYPES, default=None,
+                        help="Storage precision of a new embedding store (default: float32)")
+    parser.add_argument("--backend", choices=list(BACKENDS), default="openai", help="Embedding backend")
+    parser.add_argument("--model", default=None,
+                        help="Model name, or for the local backend a sentence-transformers model path")
+    parser.add_argument("--runtime", choices=["torch", "onnx"], default="torch", help="Runtime of the local backend")
+    parser.add_argument("--workers", type=int, default=1, help="Inference threads of the local backend")
+    args = parser.parse_args()
+    if args.backend == "local" and not args.model:
+        parser.error("--model is required with --backend local (a sentence-transformers model path or name)")
+    spec = {"backend": args.backend}
+    if args.model:
+        spec["model"] = args.model
+    options = {"runtime": args.runtime, "workers": args.workers} if args.backend == "local" else {}
+    asyncio.run(generate_and_save_embeddings(dtype=args.dtype, backend=create_backend(spec, **options)))
+    print(f"Run summary saved to {write_run_summary('embeddings')}")
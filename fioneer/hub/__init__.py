@@ -0,0 +1,14 @@
+from .backends import HubBackend, LocalDirBackend, HfHubBackend
+from .manifest import build_manifest, collect_files, diff_manifests, file_sha256
+from .sync import sync_to_hub
+
+__all__ = [
+    "HubBackend",
+    "LocalDirBackend",
+    "HfHubBackend",
+    "build_manifest",
+    "collect_files",
+    "diff_manifests",
+    "file_sha256",
+    "sync_to_hub",
+]
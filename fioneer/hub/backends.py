@@ -0,0 +1,95 @@
+import json
+import os
+import shutil
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+REMOTE_MANIFEST = "manifest.json"
+
+class HubBackend:
+    """Remote file store that delta sync pushes to"""
+
+    def read_manifest(self) -> Dict[str, Dict]:
+        """Return the remote manifest, or an empty dict if there is none"""
+        raise NotImplementedError
+
+    def write_manifest(self, manifest: Dict[str, Dict]) -> None:
+        """Replace the remote manifest"""
+        raise NotImplementedError
+
+    def upload_files(self, files: List[Tuple[Path, str]]) -> None:
+        """Upload one chunk of (local_file, repo_path) pairs"""
+        raise NotImplementedError
+
+class LocalDirBackend(HubBackend):
+    """Stand-in hub that mirrors the repository into a local directory"""
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def read_manifest(self) -> Dict[str, Dict]:
+        manifest_path = self.root / REMOTE_MANIFEST
+        if not manifest_path.exists():
+            return {}
+        with open(manifest_path, "r") as f:
+            return json.load(f)
+
+    def write_manifest(self, manifest: Dict[str, Dict]) -> None:
+        tmp_path = self.root / (REMOTE_MANIFEST + ".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(manifest, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.root / REMOTE_MANIFEST)
+
+    def upload_files(self, files: List[Tuple[Path, str]]) -> None:
+        for local_path, repo_path in files:
+            target = self.root / repo_path
+            target.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = target.with_name(target.name + ".tmp")
+            shutil.copyfile(local_path, tmp_path)
+            os.replace(tmp_path, target)
+
+class HfHubBackend(HubBackend):
+    """Hugging Face Hub repository, one commit per uploaded chunk"""
+
+    def __init__(self, repo_id: str, token: str, repo_type: str = "dataset", private: bool = False):
+        from huggingface_hub import HfApi
+
+        self.api = HfApi(token=token)
+        self.repo_id = repo_id
+        self.repo_type = repo_type
+        self.api.create_repo(repo_id=repo_id, repo_type=repo_type, private=private, exist_ok=True)
+
+    def read_manifest(self) -> Dict[str, Dict]:
+        if not self.api.file_exists(self.repo_id, REMOTE_MANIFEST, repo_type=self.repo_type):
+            return {}
+        manifest_path = self.api.hf_hub_download(
+            repo_id=self.repo_id,
+            filename=REMOTE_MANIFEST,
+            repo_type=self.repo_type,
+        )
+        with open(manifest_path, "r") as f:
+            return json.load(f)
+
+    def write_manifest(self, manifest: Dict[str, Dict]) -> None:
+        self.api.upload_file(
+            path_or_fileobj=json.dumps(manifest, indent=2, sort_keys=True).encode("utf-8"),
+            path_in_repo=REMOTE_MANIFEST,
+            repo_id=self.repo_id,
+            repo_type=self.repo_type,
+            commit_message="Update sync manifest",
+        )
+
+    def upload_files(self, files: List[Tuple[Path, str]]) -> None:
+        from huggingface_hub import CommitOperationAdd
+
+        operations = [
+            CommitOperationAdd(path_in_repo=repo_path, path_or_fileobj=str(local_path))
+            for local_path, repo_path in files
+        ]
+        self.api.create_commit(
+            repo_id=self.repo_id,
+            repo_type=self.repo_type,
+            operations=operations,
+            commit_message=f"Sync {len(operations)} files",
+        )
@@ -0,0 +1,85 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+def file_sha256(path: Path, chunk_size: int = 1 << 20) -> str:
+    """Compute the SHA-256 hex digest of a file without loading it into memory"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(chunk_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def collect_files(paths_to_upload: List[Tuple[str, str]]) -> List[Tuple[Path, str]]:
+    """Expand (local_dir, repo_dir) pairs into (local_file, repo_path) pairs"""
+    files = []
+    for local_dir, repo_dir in paths_to_upload:
+        local_dir = Path(local_dir)
+        if not local_dir.exists():
+            continue
+        for path in sorted(local_dir.rglob("*")):
+            if path.is_file():
+                files.append((path, f"{repo_dir}/{path.relative_to(local_dir).as_posix()}"))
+    return files
+
+def build_manifest(files: List[Tuple[Path, str]], previous: Dict[str, Dict] = None) -> Dict[str, Dict]:
+    """
+    Build a manifest mapping repo paths to content hash and size
+
+    Files whose size and mtime match the previous manifest reuse the stored
+    hash, so only new or touched files are read from disk.
+    """
+    previous = previous or {}
+    manifest = {}
+    for path, repo_path in files:
+        stat = path.stat()
+        cached = previous.get(repo_path)
+        if cached and cached.get("size") == stat.st_size and cached.get("mtime_ns") == stat.st_mtime_ns:
+            sha256 = cached["sha256"]
+        else:
+            sha256 = file_sha256(path)
+        manifest[repo_path] = {
+            "sha256": sha256,
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+        }
+    return manifest
+
+def diff_manifests(local: Dict[str, Dict], remote: Dict[str, Dict]) -> List[str]:
+    """Return repo paths that are missing remotely or whose content differs"""
+    changed = []
+    for repo_path, entry in local.items():
+        remote_entry = remote.get(repo_path)
+        if (
+            remote_entry is None
+            or remote_entry.get("sha256") != entry["sha256"]
+            or remote_entry.get("size") != entry["size"]
+        ):
+            changed.append(repo_path)
+    return changed
+
+def strip_local_fields(manifest: Dict[str, Dict]) -> Dict[str, Dict]:
+    """Drop fields that only make sense on this machine (e.g. mtime)"""
+    return {
+        repo_path: {"sha256": entry["sha256"], "size": entry["size"]}
+        for repo_path, entry in manifest.items()
+    }
+
+def load_manifest(path: Path) -> Dict:
+    """Load a manifest file, returning an empty dict if it does not exist"""
+    path = Path(path)
+    if not path.exists():
+        return {}
+    with open(path, "r") as f:
+        return json.load(f)
+
+def save_manifest(manifest: Dict, path: Path) -> None:
+    """Save a manifest file by writing to a temp file and renaming it into place"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
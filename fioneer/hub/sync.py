@@ -0,0 +1,107 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from fioneer.hub.backends import HubBackend
+from fioneer.hub.manifest import (
+    build_manifest,
+    diff_manifests,
+    load_manifest,
+    save_manifest,
+    strip_local_fields,
+)
+
+logger = logging.getLogger(__name__)
+
+def sync_to_hub(
+    backend: HubBackend,
+    files: List[Tuple[Path, str]],
+    state_path: Path,
+    chunk_size: int = 50,
+    max_workers: int = 4,
+    upload_last: List[str] = None,
+) -> Dict[str, int]:
+    """
+    Upload only files whose content changed since the last sync
+
+    The local state file keeps a hash cache of local files and the entries of
+    chunks that finished uploading but are not yet in the remote manifest, so
+    an interrupted sync resumes without re-sending completed chunks.
+    Repo paths in `upload_last` (e.g. manifests that reference other files)
+    are only sent once every other chunk has been uploaded.
+    """
+    state_path = Path(state_path)
+    state = load_manifest(state_path)
+    uploaded = state.get("uploaded", {})
+
+    local = build_manifest(files, previous=state.get("local"))
+    state["local"] = local
+    save_manifest(state, state_path)
+
+    remote = backend.read_manifest()
+    remote.update(uploaded)
+
+    changed = set(diff_manifests(local, remote))
+    to_upload = [(path, repo_path) for path, repo_path in files if repo_path in changed]
+    summary = {
+        "files": len(files),
+        "skipped": len(files) - len(to_upload),
+        "uploaded": 0,
+        "bytes": 0,
+        "failed_chunks": 0,
+    }
+
+    if not to_upload:
+        logger.info("Remote is up to date")
+        if uploaded:
+            backend.write_manifest(remote)
+            state["uploaded"] = {}
+            save_manifest(state, state_path)
+        return summary
+
+    logger.info(f"Found {len(to_upload)} changed files out of {len(files)}")
+    upload_last = set(upload_last or [])
+    last_chunk = [item for item in to_upload if item[1] in upload_last]
+    to_upload = [item for item in to_upload if item[1] not in upload_last]
+    chunks = [to_upload[i:i + chunk_size] for i in range(0, len(to_upload), chunk_size)]
+    lock = threading.Lock()
+
+    def upload_chunk(chunk: List[Tuple[Path, str]]) -> None:
+        backend.upload_files(chunk)
+        entries = strip_local_fields({repo_path: local[repo_path] for _, repo_path in chunk})
+        # Record progress so a crash after this point does not re-upload the chunk
+        with lock:
+            uploaded.update(entries)
+            state["uploaded"] = uploaded
+            save_manifest(state, state_path)
+            summary["uploaded"] += len(chunk)
+            summary["bytes"] += sum(entry["size"] for entry in entries.values())
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(upload_chunk, chunk): i for i, chunk in enumerate(chunks, 1)}
+        for future in as_completed(futures):
+            chunk_idx = futures[future]
+            try:
+                future.result()
+                logger.info(f"Successfully uploaded chunk {chunk_idx}/{len(chunks)}")
+            except Exception as e:
+                summary["failed_chunks"] += 1
+                logger.error(f"Error uploading chunk {chunk_idx}/{len(chunks)}: {e}")
+
+    if last_chunk:
+        if summary["failed_chunks"]:
+            logger.warning(f"Holding back {len(last_chunk)} files until all other chunks are uploaded")
+        else:
+            try:
+                upload_chunk(last_chunk)
+            except Exception as e:
+                summary["failed_chunks"] += 1
+                logger.error(f"Error uploading final chunk: {e}")
+
+    remote.update(uploaded)
+    backend.write_manifest(remote)
+    state["uploaded"] = {}
+    save_manifest(state, state_path)
+    return summary
@@ -0,0 +1,35 @@
+from typing import Any, AsyncIterator, Dict, List
+from fioneer.llm.openai_client import ModelType, chat_completion_stream
+
+SYSTEM_PROMPT = """You are a financial analyst answering questions about company earnings calls.
+Answer using only the numbered earnings call excerpts provided. Cite excerpts by number, e.g. [2].
+If the excerpts do not contain the answer, say so."""
+
+def format_context(results: List[Dict[str, Any]]) -> str:
+    """Format retrieved Q&A entries as numbered excerpts"""
+    excerpts = []
+    for i, result in enumerate(results, 1):
+        metadata = result["metadata"]
+        excerpts.append(
+            f"[{i}] {metadata['company']} ({metadata['ticker']}) {metadata['year']} Q{metadata['q']}\n"
+            f"Question: {metadata['question_summary']}\n"
+            f"Answer: {metadata['answer_summary']}\n"
+            f"Insight: {metadata['insight']}"
+        )
+    return "\n\n".join(excerpts)
+
+def build_answer_messages(question: str, results: List[Dict[str, Any]]) -> List[Dict[str, str]]:
+    """Build the chat messages for answering a question from retrieved context"""
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": f"Excerpts:\n{format_context(results)}\n\nQuestion: {question}"},
+    ]
+
+async def stream_answer(
+    question: str,
+    results: List[Dict[str, Any]],
+    model: ModelType = "gpt-4o-mini",
+) -> AsyncIterator[str]:
+    """Stream an answer to the question grounded in the retrieved results"""
+    async for token in chat_completion_stream(build_answer_messages(question, results), model=model, temperature=0.2):
+        yield token
@@ -1,18 +1,143 @@
-from openai import OpenAI
-from fioneer.config import get_settings
+from fioneer.llm.rate_limiter import AdaptiveRateLimiter
+from fioneer.metrics import counter, histogram
 from functools import lru_cache
-from typing import Literal, List
+import asyncio
+import random
+import time
+from typing import TYPE_CHECKING, AsyncIterator, Callable, Literal, List, Optional
+
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI, OpenAI
 
 # Define allowed model types
 ModelType = Literal["gpt-3.5-turbo", "gpt-4o-mini"]
 
+# USD per 1M (input, output) tokens, used for cost accounting
+MODEL_PRICES = {
+    "gpt-3.5-turbo": (0.50, 1.50),
+    "gpt-4o-mini": (0.15, 0.60),
+    "text-embedding-ada-002": (0.10, 0.0),
+    "text-embedding-3-small": (0.02, 0.0),
+    "text-embedding-3-large": (0.13, 0.0),
+}
+
+REQUEST_SECONDS = histogram("openai_request_seconds", "Latency of OpenAI API calls")
+REQUESTS_TOTAL = counter("openai_requests_total", "OpenAI API calls by outcome")
+TOKENS_TOTAL = counter("openai_tokens_total", "Tokens billed by OpenAI")
+COST_TOTAL = counter("openai_cost_usd_total", "Estimated OpenAI spend in USD")
+FIRST_TOKEN_SECONDS = histogram("openai_first_token_seconds", "Time to first token of streamed completions")
+RATE_LIMIT_WAIT_SECONDS = histogram("openai_rate_limit_wait_seconds", "Time requests waited for rate-limit quota")
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token)"""
+    return max(1, len(text) // 4)
+
+def record_usage(endpoint: str, model: str, prompt_tokens: int, completion_tokens: int = 0) -> None:
+    """Record token counts and estimated cost of one API call"""
+    TOKENS_TOTAL.inc(prompt_tokens, endpoint=endpoint, model=model, kind="prompt")
+    if completion_tokens:
+        TOKENS_TOTAL.inc(completion_tokens, endpoint=endpoint, model=model, kind="completion")
+    input_price, output_price = MODEL_PRICES.get(model, (0.0, 0.0))
+    cost = (prompt_tokens * input_price + completion_tokens * output_price) / 1_000_000
+    COST_TOTAL.inc(cost, endpoint=endpoint, model=model)
+
+def record_request(endpoint: str, model: str, start: float, status: str) -> None:
+    """Record latency and outcome of one API call"""
+    REQUEST_SECONDS.observe(time.perf_counter() - start, endpoint=endpoint, model=model)
+    REQUESTS_TOTAL.inc(endpoint=endpoint, model=model, status=status)
+
+# The openai SDK and settings are imported on first use; importing openai alone takes ~1s
+
+# Attempts per call; 429s and transient errors are retried here, not by the SDK
+MAX_ATTEMPTS = 6
+
+# Completion tokens assumed when reserving quota for a chat call (settled with actual usage)
+EXPECTED_COMPLETION_TOKENS = 256
+
 @lru_cache()
-def get_openai_client() -> OpenAI:
+def get_openai_client() -> "OpenAI":
     """
     Returns cached OpenAI client instance
     """
+    from openai import OpenAI
+    from fioneer.config import get_settings
+
+    settings = get_settings()
+    return OpenAI(api_key=settings.require("openai_api_key"), max_retries=0)
+
+@lru_cache()
+def get_async_openai_client() -> "AsyncOpenAI":
+    """
+    Returns cached async OpenAI client instance (bound to the event loop that first uses it)
+    """
+    from openai import AsyncOpenAI
+    from fioneer.config import get_settings
+
+    settings = get_settings()
+    return AsyncOpenAI(api_key=settings.require("openai_api_key"), max_retries=0)
+
+@lru_cache()
+def get_rate_limiter() -> AdaptiveRateLimiter:
+    """
+    Returns the process-wide rate limiter shared by chat and embedding calls
+
+    OPENAI_RPM_LIMIT / OPENAI_TPM_LIMIT seed the quotas; otherwise they are
+    learned from the first response's headers.
+    """
+    from fioneer.config import get_settings
+
     settings = get_settings()
-    return OpenAI(api_key=settings.openai_api_key)
+    return AdaptiveRateLimiter(rpm=settings.openai_rpm_limit, tpm=settings.openai_tpm_limit)
+
+def retry_after_seconds(headers) -> Optional[float]:
+    """Server-suggested wait from retry-after-ms or retry-after headers"""
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        if headers.get("retry-after"):
+            return float(headers["retry-after"])
+    except ValueError:
+        pass
+    return None
+
+def _transient_delay(attempt: int) -> float:
+    return random.uniform(0, min(30.0, 0.5 * 2 ** attempt))
+
+def _call_with_limits(kind: str, endpoint: str, model: str, tokens: int, call: Callable):
+    """
+    Send one request under the shared rate limiter (blocking)
+
+    429s update the limiter from the response headers and pause all traffic
+    for the retry-after period; connection errors and 5xx are retried with
+    jittered backoff. Returns the parsed response.
+    """
+    import openai
+
+    limiter = get_rate_limiter()
+    for attempt in range(MAX_ATTEMPTS):
+        RATE_LIMIT_WAIT_SECONDS.observe(limiter.acquire(kind, tokens), kind=kind)
+        start = time.perf_counter()
+        try:
+            raw = call()
+        except openai.RateLimitError as e:
+            record_request(endpoint, model, start, "rate_limited")
+            limiter.update(e.response.headers)
+            limiter.backoff(attempt, retry_after_seconds(e.response.headers))
+            if attempt == MAX_ATTEMPTS - 1:
+                raise
+            continue
+        except (openai.APIConnectionError, openai.InternalServerError):
+            record_request(endpoint, model, start, "error")
+            if attempt == MAX_ATTEMPTS - 1:
+                raise
+            time.sleep(_transient_delay(attempt))
+            continue
+        except Exception:
+            record_request(endpoint, model, start, "error")
+            raise
+        record_request(endpoint, model, start, "ok")
+        limiter.update(raw.headers)
+        return raw.parse()
 
 async def chat_completion(
     messages: list[dict],
@@ -30,14 +155,100 @@ async def chat_completion(
     Returns:
         Generated response text
     """
-    client = get_openai_client()
-    response = client.chat.completions.create(
-        model=model,
-        messages=messages,
-        temperature=temperature,
+    estimated = sum(estimate_tokens(m.get("content") or "") for m in messages) + EXPECTED_COMPLETION_TOKENS
+    # Rate-limit waits, backoff and the blocking HTTP call run off the event loop, so gathered calls overlap
+    response = await asyncio.to_thread(
+        _call_with_limits,
+        "chat", "chat", model, estimated,
+        # The client is created on the worker too: the first call imports the SDK
+        lambda: get_openai_client().chat.completions.with_raw_response.create(
+            model=model,
+            messages=messages,
+            temperature=temperature,
+        ),
     )
+    if response.usage:
+        get_rate_limiter().settle(estimated, response.usage.total_tokens)
+        record_usage("chat", model, response.usage.prompt_tokens, response.usage.completion_tokens)
     return response.choices[0].message.content
 
+async def chat_completion_stream(
+    messages: list[dict],
+    model: ModelType = "gpt-3.5-turbo",
+    temperature: float = 0.7,
+) -> AsyncIterator[str]:
+    """
+    Streams a chat completion from OpenAI, yielding text deltas as they arrive
+    
+    Closing the iterator early (e.g. the client disconnected) closes the HTTP
+    stream. Usage is recorded like the blocking path; for cancelled streams
+    the completion tokens are estimated from the text received so far.
+    
+    Args:
+        messages: List of message dictionaries
+        model: OpenAI model to use (either "gpt-3.5-turbo" or "gpt-4o-mini")
+        temperature: Sampling temperature
+    
+    Yields:
+        Generated text deltas
+    """
+    import openai
+
+    client = get_async_openai_client()
+    limiter = get_rate_limiter()
+    prompt_tokens = sum(estimate_tokens(m.get("content") or "") for m in messages)
+    estimated = prompt_tokens + EXPECTED_COMPLETION_TOKENS
+    status = "error"
+    usage = None
+    streamed = []
+    start = time.perf_counter()
+    try:
+        # Retry 429s only before the stream opens; nothing has been yielded yet
+        for attempt in range(MAX_ATTEMPTS):
+            RATE_LIMIT_WAIT_SECONDS.observe(await asyncio.to_thread(limiter.acquire, "chat", estimated), kind="chat")
+            start = time.perf_counter()
+            try:
+                raw = await client.chat.completions.with_raw_response.create(
+                    model=model,
+                    messages=messages,
+                    temperature=temperature,
+                    stream=True,
+                    stream_options={"include_usage": True},
+                )
+                break
+            except openai.RateLimitError as e:
+                limiter.update(e.response.headers)
+                limiter.backoff(attempt, retry_after_seconds(e.response.headers))
+                if attempt == MAX_ATTEMPTS - 1:
+                    raise
+                record_request("chat_stream", model, start, "rate_limited")
+        limiter.update(raw.headers)
+        stream = raw.parse()
+        try:
+            async for chunk in stream:
+                if chunk.usage:
+                    usage = chunk.usage
+                if chunk.choices and chunk.choices[0].delta.content:
+                    if not streamed:
+                        FIRST_TOKEN_SECONDS.observe(time.perf_counter() - start, model=model)
+                    streamed.append(chunk.choices[0].delta.content)
+                    yield chunk.choices[0].delta.content
+            status = "ok"
+        finally:
+            await stream.close()
+    except (asyncio.CancelledError, GeneratorExit):
+        status = "cancelled"
+        raise
+    finally:
+        record_request("chat_stream", model, start, status)
+        if usage:
+            limiter.settle(estimated, usage.total_tokens)
+            record_usage("chat_stream", model, usage.prompt_tokens, usage.completion_tokens)
+        elif streamed:
+            completion_tokens = estimate_tokens("".join(streamed))
+            limiter.settle(estimated, prompt_tokens + completion_tokens)
+            record_usage("chat_stream", model, prompt_tokens, completion_tokens)
+
 async def create_embeddings(
     texts: List[str],
     model: str = "text-embedding-ada-002"
@@ -52,9 +263,14 @@ async def create_embeddings(
     Returns:
         List of embedding vectors
     """
-    client = get_openai_client()
-    response = client.embeddings.create(
-        input=texts,
-        model=model
+    estimated = sum(estimate_tokens(text) for text in texts)
+    # Run the blocking HTTP call (and any rate-limit wait) off the event loop so concurrent callers overlap
+    response = await asyncio.to_thread(
+        _call_with_limits,
+        "embeddings", "embeddings", model, estimated,
+        lambda: get_openai_client().embeddings.with_raw_response.create(input=texts, model=model),
     )
+    if response.usage:
+        get_rate_limiter().settle(estimated, response.usage.total_tokens)
+        record_usage("embeddings", model, response.usage.prompt_tokens)
     return [data.embedding for data in response.data]
@@ -0,0 +1,197 @@
+import random
+import re
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Mapping, Optional
+
+_DURATION = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_UNITS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+def parse_duration(value: str) -> Optional[float]:
+    """Parse OpenAI reset durations such as '20ms', '1.5s' or '6m0s' into seconds"""
+    if value is None:
+        return None
+    value = value.strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _DURATION.findall(value)
+    if not parts:
+        return None
+    return sum(float(amount) * _UNITS[unit] for amount, unit in parts)
+
+class _Bucket:
+    """
+    Token bucket for one per-minute quota, corrected by server headers
+
+    The limit is unknown (unlimited) until a response reports it. Capacity is
+    a few seconds' worth of quota so traffic is paced rather than bursty.
+    """
+
+    def __init__(self, limit: Optional[float], burst_seconds: float):
+        self.burst_seconds = burst_seconds
+        self.limit = None
+        self.level = 0.0
+        self.full_at = None
+        self.updated = time.monotonic()
+        if limit:
+            self.set_limit(limit)
+            self.level = self.capacity
+
+    @property
+    def capacity(self) -> float:
+        return max(1.0, self.limit / 60 * self.burst_seconds)
+
+    def set_limit(self, limit: float) -> None:
+        first = self.limit is None
+        self.limit = float(limit)
+        if first:
+            self.level = self.capacity
+
+    def refill(self, now: float) -> None:
+        if self.limit is None:
+            return
+        if self.full_at is not None and now >= self.full_at:
+            self.level = self.capacity
+            self.full_at = None
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.limit / 60)
+        self.updated = now
+
+    def delay(self, amount: float, now: float) -> float:
+        """Seconds until amount can be taken (0 if it can be taken now)"""
+        if self.limit is None:
+            return 0.0
+        needed = min(amount, self.capacity)
+        if self.level >= needed:
+            return 0.0
+        wait = (needed - self.level) / (self.limit / 60)
+        if self.full_at is not None:
+            wait = min(wait, self.full_at - now)
+        return max(wait, 0.001)
+
+    def take(self, amount: float) -> None:
+        if self.limit is not None:
+            self.level -= min(amount, self.capacity)
+
+    def observe(self, limit: Optional[str], remaining: Optional[str], reset: Optional[str], now: float) -> None:
+        """Apply x-ratelimit-* header values from a response"""
+        if limit:
+            self.set_limit(float(limit))
+        if self.limit is None:
+            return
+        self.refill(now)
+        if remaining is not None:
+            self.level = min(self.level, float(remaining))
+        reset_seconds = parse_duration(reset)
+        if reset_seconds is not None:
+            self.full_at = now + reset_seconds
+
+class AdaptiveRateLimiter:
+    """
+    Process-wide limiter for requests and tokens per minute
+
+    Thread-safe and independent of any event loop, so the extractor's worker
+    threads (each running its own loop), asyncio.to_thread calls and the
+    async streaming client can share one instance. Callers wait in per-kind
+    queues that are served round-robin, so a flood of chat calls cannot
+    starve embeddings. Quotas are learned from x-ratelimit-* headers (or set
+    up front), token estimates are corrected with actual usage, and 429s
+    pause all traffic for the retry-after period.
+    """
+
+    def __init__(
+        self,
+        rpm: Optional[int] = None,
+        tpm: Optional[int] = None,
+        burst_seconds: float = 5.0,
+        base_backoff: float = 0.5,
+        max_backoff: float = 60.0,
+    ):
+        self.requests = _Bucket(rpm, burst_seconds)
+        self.tokens = _Bucket(tpm, burst_seconds)
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.paused_until = 0.0
+        self.condition = threading.Condition()
+        self.waiting: Dict[str, deque] = {}
+        self.kinds: List[str] = []
+        self.last_kind: Optional[str] = None
+
+    def _next_ticket(self):
+        """Head of the next kind with waiters, rotating after the last kind served"""
+        if not self.kinds:
+            return None
+        start = self.kinds.index(self.last_kind) + 1 if self.last_kind in self.kinds else 0
+        for i in range(len(self.kinds)):
+            queue = self.waiting[self.kinds[(start + i) % len(self.kinds)]]
+            if queue:
+                return queue[0]
+        return None
+
+    def acquire(self, kind: str, tokens: int) -> float:
+        """Block until a request of this kind may be sent; returns seconds waited"""
+        start = time.monotonic()
+        ticket = object()
+        with self.condition:
+            if kind not in self.waiting:
+                self.waiting[kind] = deque()
+                self.kinds.append(kind)
+            self.waiting[kind].append(ticket)
+            try:
+                while True:
+                    timeout = None
+                    if self._next_ticket() is ticket:
+                        now = time.monotonic()
+                        self.requests.refill(now)
+                        self.tokens.refill(now)
+                        timeout = max(
+                            self.paused_until - now,
+                            self.requests.delay(1, now),
+                            self.tokens.delay(tokens, now),
+                        )
+                        if timeout <= 0:
+                            self.requests.take(1)
+                            self.tokens.take(tokens)
+                            self.last_kind = kind
+                            return time.monotonic() - start
+                    self.condition.wait(timeout)
+            finally:
+                self.waiting[kind].remove(ticket)
+                self.condition.notify_all()
+
+    def update(self, headers: Mapping[str, str]) -> None:
+        """Correct the buckets from a response's rate-limit headers"""
+        now = time.monotonic()
+        with self.condition:
+            self.requests.observe(
+                headers.get("x-ratelimit-limit-requests"),
+                headers.get("x-ratelimit-remaining-requests"),
+                headers.get("x-ratelimit-reset-requests"),
+                now,
+            )
+            self.tokens.observe(
+                headers.get("x-ratelimit-limit-tokens"),
+                headers.get("x-ratelimit-remaining-tokens"),
+                headers.get("x-ratelimit-reset-tokens"),
+                now,
+            )
+            self.condition.notify_all()
+
+    def settle(self, estimated_tokens: int, actual_tokens: int) -> None:
+        """Return or charge the difference between estimated and billed tokens"""
+        with self.condition:
+            if self.tokens.limit is not None:
+                self.tokens.level = min(self.tokens.capacity, self.tokens.level + estimated_tokens - actual_tokens)
+            self.condition.notify_all()
+
+    def backoff(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """Pause all traffic after a 429 or transient error; returns the pause in seconds"""
+        if retry_after is None:
+            # Exponential backoff with full jitter
+            retry_after = random.uniform(0, min(self.max_backoff, self.base_backoff * 2 ** attempt))
+        with self.condition:
+            self.paused_until = max(self.paused_until, time.monotonic() + retry_after)
+            self.condition.notify_all()
+        return retry_after
@@ -0,0 +1,24 @@
+from .registry import (
+    REGISTRY,
+    Counter,
+    Histogram,
+    MetricsRegistry,
+    counter,
+    histogram,
+    timer,
+    write_run_summary,
+)
+from .memory import MemoryProfile, profile_memory
+
+__all__ = [
+    "REGISTRY",
+    "Counter",
+    "Histogram",
+    "MemoryProfile",
+    "MetricsRegistry",
+    "counter",
+    "histogram",
+    "profile_memory",
+    "timer",
+    "write_run_summary",
+]
@@ -0,0 +1,158 @@
+import functools
+import inspect
+import os
+import threading
+import time
+import tracemalloc
+from typing import Dict, List, Optional
+from .registry import histogram
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Byte buckets from 1 MB to 64 GB
+PEAK_GROWTH_BYTES = histogram(
+    "memory_peak_growth_bytes",
+    "Peak RSS growth while an operation ran",
+    buckets=tuple(float(2 ** i) for i in range(20, 37)),
+)
+
+# Most recent profile per operation, for reports
+PROFILES: Dict[str, "MemoryProfile"] = {}
+
+_ACTIVE: List["MemoryProfile"] = []
+_ACTIVE_LOCK = threading.Lock()
+
+def current_rss() -> int:
+    """Resident set size of this process in bytes"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return max_rss()
+
+def max_rss() -> int:
+    """Highest RSS this process has ever had, in bytes (0 where unavailable)"""
+    if resource is None:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak if os.uname().sysname == "Darwin" else peak * 1024
+
+class MemoryProfile:
+    """
+    Peak RSS and Python allocations while a block runs
+
+    RSS is sampled on a background thread; if the block sets a new
+    process-wide high, the kernel's exact peak is used instead. When
+    tracemalloc is tracing (python -X tracemalloc, or the memory report),
+    the Python allocation peak and the lines holding the most new memory
+    at exit are recorded too. Profiles may nest.
+    """
+
+    def __init__(self, operation: str, interval: float = 0.005, top: int = 10):
+        self.operation = operation
+        self.interval = interval
+        self.top = top
+        self.rss_before = self.rss_after = self.rss_peak = 0
+        self.traced_before = self.traced_peak = 0
+        self.top_allocations: List[Dict] = []
+        self.seconds = 0.0
+        self._snapshot = None
+        self._stop = threading.Event()
+        self._sampler: Optional[threading.Thread] = None
+
+    def _sample(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.rss_peak = max(self.rss_peak, current_rss())
+
+    def __enter__(self) -> "MemoryProfile":
+        self.tracing = tracemalloc.is_tracing()
+        if self.tracing:
+            self._snapshot = tracemalloc.take_snapshot()
+            current, peak = tracemalloc.get_traced_memory()
+            with _ACTIVE_LOCK:
+                # Resetting the peak would hide it from enclosing profiles, so hand it to them first
+                for profile in _ACTIVE:
+                    profile.traced_peak = max(profile.traced_peak, peak)
+                _ACTIVE.append(self)
+            tracemalloc.reset_peak()
+            self.traced_before = self.traced_peak = current
+        self.max_rss_before = max_rss()
+        self.rss_before = self.rss_peak = current_rss()
+        self._sampler = threading.Thread(target=self._sample, name="memory-profile", daemon=True)
+        self._sampler.start()
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.seconds = time.perf_counter() - self._start
+        self._stop.set()
+        self._sampler.join()
+        self.rss_after = current_rss()
+        self.rss_peak = max(self.rss_peak, self.rss_after)
+        if max_rss() > self.max_rss_before:
+            self.rss_peak = max(self.rss_peak, max_rss())
+        if self.tracing and tracemalloc.is_tracing():
+            self.traced_peak = max(self.traced_peak, tracemalloc.get_traced_memory()[1])
+            stats = tracemalloc.take_snapshot().compare_to(self._snapshot, "lineno")
+            self.top_allocations = [
+                {"location": str(stat.traceback), "bytes": stat.size_diff}
+                for stat in stats[:self.top] if stat.size_diff > 0
+            ]
+            self._snapshot = None
+        if self.tracing:
+            with _ACTIVE_LOCK:
+                if self in _ACTIVE:
+                    _ACTIVE.remove(self)
+                for profile in _ACTIVE:
+                    profile.traced_peak = max(profile.traced_peak, self.traced_peak)
+        PEAK_GROWTH_BYTES.observe(self.peak_growth, operation=self.operation)
+        PROFILES[self.operation] = self
+
+    @property
+    def peak_growth(self) -> int:
+        """Bytes the RSS peaked above where it started"""
+        return max(0, self.rss_peak - self.rss_before)
+
+    @property
+    def retained(self) -> int:
+        """Bytes the RSS stayed above where it started"""
+        return self.rss_after - self.rss_before
+
+    @property
+    def traced_growth(self) -> int:
+        """Peak Python allocations above where they started (0 unless tracing)"""
+        return max(0, self.traced_peak - self.traced_before)
+
+    def summary(self) -> Dict:
+        return {
+            "operation": self.operation,
+            "seconds": self.seconds,
+            "rss_before": self.rss_before,
+            "rss_peak": self.rss_peak,
+            "rss_after": self.rss_after,
+            "peak_growth": self.peak_growth,
+            "retained": self.retained,
+            "traced_growth": self.traced_growth,
+            "top_allocations": self.top_allocations,
+        }
+
+def profile_memory(operation: str):
+    """Decorator recording a MemoryProfile of every call of a function or coroutine function"""
+    def decorate(func):
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with MemoryProfile(operation):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with MemoryProfile(operation):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
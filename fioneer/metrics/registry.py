@@ -0,0 +1,218 @@
+import json
+import math
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+# Latency buckets in seconds, from sub-millisecond index searches to slow LLM calls
+DEFAULT_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0
+)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+def _label_key(labels: Dict[str, str]) -> LabelKey:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+def _format_labels(key: LabelKey, extra: Dict[str, str] = None) -> str:
+    items = list(key) + list((extra or {}).items())
+    if not items:
+        return ""
+    escaped = (f'{name}="{value}"'.replace("\n", "\\n") for name, value in items)
+    return "{" + ",".join(escaped) + "}"
+
+class Counter:
+    """Monotonically increasing value per label set"""
+
+    type_name = "counter"
+
+    def __init__(self, name: str, help: str):
+        self.name = name
+        self.help = help
+        self.values: Dict[LabelKey, float] = {}
+        self.lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = _label_key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self.values.get(_label_key(labels), 0.0)
+
+    def prometheus_lines(self) -> List[str]:
+        with self.lock:
+            return [f"{self.name}{_format_labels(key)} {value:g}" for key, value in sorted(self.values.items())]
+
+    def summary(self) -> List[Dict]:
+        with self.lock:
+            return [{"labels": dict(key), "value": value} for key, value in sorted(self.values.items())]
+
+class Histogram:
+    """Bucketed distribution per label set, plus recent samples for percentiles"""
+
+    type_name = "histogram"
+
+    def __init__(self, name: str, help: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS, max_samples: int = 10000):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(sorted(buckets))
+        self.max_samples = max_samples
+        self.series: Dict[LabelKey, Dict] = {}
+        self.lock = threading.Lock()
+
+    def observe(self, value: float, **labels) -> None:
+        key = _label_key(labels)
+        with self.lock:
+            series = self.series.get(key)
+            if series is None:
+                series = {
+                    "counts": [0] * len(self.buckets),
+                    "count": 0,
+                    "sum": 0.0,
+                    "samples": deque(maxlen=self.max_samples),
+                }
+                self.series[key] = series
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series["counts"][i] += 1
+                    break
+            series["count"] += 1
+            series["sum"] += value
+            series["samples"].append(value)
+
+    def count(self, **labels) -> int:
+        series = self.series.get(_label_key(labels))
+        return series["count"] if series else 0
+
+    def percentile(self, q: float, **labels) -> float:
+        """q-th percentile (0-100) of the recent samples of a label set"""
+        series = self.series.get(_label_key(labels))
+        if not series or not series["samples"]:
+            return math.nan
+        with self.lock:
+            samples = sorted(series["samples"])
+        return samples[min(len(samples) - 1, int(round(q / 100 * (len(samples) - 1))))]
+
+    def prometheus_lines(self) -> List[str]:
+        lines = []
+        with self.lock:
+            for key, series in sorted(self.series.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets, series["counts"]):
+                    cumulative += count
+                    lines.append(f"{self.name}_bucket{_format_labels(key, {'le': f'{bound:g}'})} {cumulative}")
+                lines.append(f"{self.name}_bucket{_format_labels(key, {'le': '+Inf'})} {series['count']}")
+                lines.append(f"{self.name}_sum{_format_labels(key)} {series['sum']:g}")
+                lines.append(f"{self.name}_count{_format_labels(key)} {series['count']}")
+        return lines
+
+    def summary(self) -> List[Dict]:
+        with self.lock:
+            keys = sorted(self.series)
+        result = []
+        for key in keys:
+            series = self.series[key]
+            labels = dict(key)
+            result.append({
+                "labels": labels,
+                "count": series["count"],
+                "sum": series["sum"],
+                "mean": series["sum"] / series["count"],
+                "p50": self.percentile(50, **labels),
+                "p95": self.percentile(95, **labels),
+                "p99": self.percentile(99, **labels),
+            })
+        return result
+
+class MetricsRegistry:
+    """Process-wide collection of named counters and histograms"""
+
+    def __init__(self):
+        self.metrics: Dict[str, object] = {}
+        self.lock = threading.Lock()
+        self.started_at = time.time()
+
+    def _get_or_create(self, cls, name: str, help: str, **kwargs):
+        with self.lock:
+            metric = self.metrics.get(name)
+            if metric is None:
+                metric = cls(name, help, **kwargs)
+                self.metrics[name] = metric
+            elif not isinstance(metric, cls):
+                raise ValueError(f"Metric {name} is already registered as a {metric.type_name}")
+            return metric
+
+    def counter(self, name: str, help: str = "") -> Counter:
+        return self._get_or_create(Counter, name, help)
+
+    def histogram(self, name: str, help: str = "", buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        return self._get_or_create(Histogram, name, help, buckets=buckets)
+
+    def reset(self) -> None:
+        """Clear all recorded values (registered metrics stay registered)"""
+        with self.lock:
+            for metric in self.metrics.values():
+                with metric.lock:
+                    if isinstance(metric, Counter):
+                        metric.values.clear()
+                    else:
+                        metric.series.clear()
+            self.started_at = time.time()
+
+    def to_prometheus(self) -> str:
+        """Render all metrics in the Prometheus text exposition format"""
+        lines = []
+        for name, metric in sorted(self.metrics.items()):
+            lines.append(f"# HELP {name} {metric.help}")
+            lines.append(f"# TYPE {name} {metric.type_name}")
+            lines.extend(metric.prometheus_lines())
+        return "\n".join(lines) + "\n"
+
+    def summary(self) -> Dict:
+        """JSON-friendly snapshot of all metrics"""
+        return {
+            "started_at": self.started_at,
+            "duration_seconds": time.time() - self.started_at,
+            "counters": {
+                name: metric.summary() for name, metric in sorted(self.metrics.items()) if isinstance(metric, Counter)
+            },
+            "histograms": {
+                name: metric.summary() for name, metric in sorted(self.metrics.items()) if isinstance(metric, Histogram)
+            },
+        }
+
+    def write_summary(self, path: Path) -> Path:
+        """Write the JSON run summary, creating parent directories"""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(self.summary(), f, indent=2)
+        return path
+
+REGISTRY = MetricsRegistry()
+
+def counter(name: str, help: str = "") -> Counter:
+    """Get or register a counter in the default registry"""
+    return REGISTRY.counter(name, help)
+
+def histogram(name: str, help: str = "", buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+    """Get or register a histogram in the default registry"""
+    return REGISTRY.histogram(name, help, buckets)
+
+@contextmanager
+def timer(metric: Histogram, **labels):
+    """Observe the wall time of the block into a histogram"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        metric.observe(time.perf_counter() - start, **labels)
+
+def write_run_summary(name: str, directory: Path = Path("data/metrics")) -> Path:
+    """Write the default registry's summary to data/metrics/{name}_{timestamp}.json"""
+    timestamp = time.strftime("%Y%m%d-%H%M%S")
+    return REGISTRY.write_summary(Path(directory) / f"{name}_{timestamp}.json")
@@ -1,14 +1,17 @@
 import requests
+import time
 from fioneer.config import get_settings
+from fioneer.metrics import counter, histogram
+
+REQUEST_SECONDS = histogram("ninjas_request_seconds", "Latency of API Ninjas calls")
+REQUESTS_TOTAL = counter("ninjas_requests_total", "API Ninjas calls by outcome")
 
 class NinjasClient:
     BASE_URL = "https://api.api-ninjas.com/v1"
 
     def __init__(self):
         settings = get_settings()
-        self.ninja_api_key = settings.ninja_api_key
-        if not self.ninja_api_key:
-            raise ValueError("Ninja API Key is not set")
+        self.ninja_api_key = settings.require("ninja_api_key")
 
     def get_earnings_transcript(self, symbol: str, year: int, quarter: int):
         url = f"{self.BASE_URL}/earningstranscript"
@@ -21,6 +24,14 @@ class NinjasClient:
             "X-Api-Key": self.ninja_api_key
         }
         
-        response = requests.get(url, params=params, headers=headers)
-        response.raise_for_status()
+        start = time.perf_counter()
+        try:
+            response = requests.get(url, params=params, headers=headers)
+            response.raise_for_status()
+        except Exception:
+            REQUESTS_TOTAL.inc(endpoint="earningstranscript", status="error")
+            raise
+        finally:
+            REQUEST_SECONDS.observe(time.perf_counter() - start, endpoint="earningstranscript")
+        REQUESTS_TOTAL.inc(endpoint="earningstranscript", status="ok")
         return response.json()
\ No newline at end of file
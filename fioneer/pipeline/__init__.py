@@ -0,0 +1,4 @@
+from .dag import Pipeline, Stage
+from .stages import STAGES, build_pipeline
+
+__all__ = ["Pipeline", "Stage", "STAGES", "build_pipeline"]
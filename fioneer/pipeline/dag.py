@@ -0,0 +1,259 @@
+import hashlib
+import importlib.util
+import json
+import os
+import subprocess
+import sys
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from fnmatch import fnmatch
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+from fioneer.hub.manifest import build_manifest, load_manifest, save_manifest
+
+class Stage:
+    """
+    One pipeline step: a command with declared input and output file patterns
+
+    Patterns are globs relative to the pipeline root. A stage with an item
+    pattern processes those inputs independently: when only some items
+    changed, their paths are appended to the command; when a shared input
+    changed, the command gets the full-rerun flag instead. item_inputs(root,
+    items) narrows that: it returns, per item, the part of the shared inputs
+    the item is built from (e.g. its row of a lookup table), and a shared
+    input change then only reruns items whose part changed. A stage whose
+    required modules (e.g. from an optional extra) are not installed is
+    skipped, and runs once they are.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        command: List[str],
+        inputs: List[str] = (),
+        outputs: List[str] = (),
+        items: Optional[str] = None,
+        item_output: Optional[Callable[[Path], Path]] = None,
+        full_rerun_args: List[str] = (),
+        item_inputs: Optional[Callable[[Path, List[Path]], List]] = None,
+        requires: List[str] = (),
+        manual: bool = False,
+    ):
+        self.name = name
+        self.command = list(command)
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.items = items
+        self.item_output = item_output
+        self.full_rerun_args = list(full_rerun_args)
+        self.item_inputs = item_inputs
+        self.requires = list(requires)
+        self.manual = manual
+
+    def __repr__(self) -> str:
+        return f"Stage({self.name!r})"
+
+    def missing_requirements(self) -> List[str]:
+        """Required modules that are not installed"""
+        return [module for module in self.requires if importlib.util.find_spec(module) is None]
+
+def _overlaps(pattern_a: str, pattern_b: str) -> bool:
+    return pattern_a == pattern_b or fnmatch(pattern_a, pattern_b) or fnmatch(pattern_b, pattern_a)
+
+def expand(root: Path, patterns: List[str]) -> List[Path]:
+    """Files under root matching any of the patterns, sorted and de-duplicated"""
+    files = set()
+    for pattern in patterns:
+        files.update(path for path in root.glob(pattern) if path.is_file())
+    return sorted(files)
+
+class Pipeline:
+    """
+    DAG of stages that reruns only what changed
+
+    Dependencies follow from the declared patterns: a stage depends on every
+    stage whose outputs overlap its inputs. The state file records content
+    hashes of each stage's inputs and outputs from its last successful run;
+    a stage is skipped when both still match. Independent stages run in
+    parallel.
+    """
+
+    def __init__(self, stages: List[Stage], root: Path = Path("."), state_path: Path = None):
+        self.stages = {stage.name: stage for stage in stages}
+        self.root = Path(root)
+        self.state_path = Path(state_path) if state_path else self.root / "data/.pipeline_state.json"
+        self.state = load_manifest(self.state_path)
+        self.dependencies = {
+            stage.name: [
+                other.name for other in stages
+                if other is not stage and any(_overlaps(i, o) for i in stage.inputs for o in other.outputs)
+            ]
+            for stage in stages
+        }
+
+    def _hashes(self, patterns: List[str], previous: Dict[str, Dict]) -> Dict[str, Dict]:
+        files = [(path, path.relative_to(self.root).as_posix()) for path in expand(self.root, patterns)]
+        return build_manifest(files, previous)
+
+    def _item_hashes(self, stage: Stage, inputs: Dict[str, Dict]) -> Dict[str, str]:
+        """Hash of the part of the shared inputs each item is built from"""
+        items = [path for path in inputs if fnmatch(path, stage.items)]
+        values = stage.item_inputs(self.root, [Path(path) for path in items])
+        return {
+            path: hashlib.sha256(json.dumps(value, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+            for path, value in zip(items, values)
+        }
+
+    def plan(self, stage: Stage, force: bool = False) -> Optional[List[str]]:
+        """
+        Extra command arguments if the stage must run, None if it is up to date
+
+        For item stages this is the list of stale item paths, or the full-rerun
+        arguments when a shared input changed.
+        """
+        record = self.state.get(stage.name)
+        if force:
+            return list(stage.full_rerun_args)
+        if record is None:
+            # First run: adopt outputs that already exist (use force to rebuild them)
+            if stage.items and stage.item_output:
+                missing = [
+                    path.relative_to(self.root).as_posix()
+                    for path in expand(self.root, [stage.items])
+                    if not (self.root / stage.item_output(path.relative_to(self.root))).exists()
+                ]
+                return missing or None
+            if stage.outputs and all(expand(self.root, [pattern]) for pattern in stage.outputs):
+                return None
+            return [] if stage.items else list(stage.full_rerun_args)
+
+        inputs = self._hashes(stage.inputs, record["inputs"])
+        outputs = self._hashes(stage.outputs, record["outputs"])
+        changed = {p for p in inputs if record["inputs"].get(p, {}).get("sha256") != inputs[p]["sha256"]}
+        removed = set(record["inputs"]) - set(inputs)
+        outputs_changed = {p: e["sha256"] for p, e in outputs.items()} != {
+            p: e["sha256"] for p, e in record["outputs"].items()
+        }
+
+        if stage.items is None:
+            # Stages without inputs (e.g. fetched from the network) rerun only when outputs change
+            return list(stage.full_rerun_args) if changed or removed or outputs_changed else None
+
+        shared_changed = any(not fnmatch(p, stage.items) for p in changed | removed)
+        if shared_changed and not stage.item_inputs:
+            # A shared input changed, so every item is stale
+            return list(stage.full_rerun_args)
+        stale = {p for p in changed if fnmatch(p, stage.items)}
+        if shared_changed:
+            # Only items whose part of the shared inputs changed are stale
+            recorded = record.get("items", {})
+            stale.update(p for p, digest in self._item_hashes(stage, inputs).items() if recorded.get(p) != digest)
+        if stage.item_output:
+            # Items whose output went missing or was edited are stale too
+            for path in inputs:
+                output = stage.item_output(Path(path)).as_posix()
+                if not fnmatch(path, stage.items):
+                    continue
+                if output not in outputs or record["outputs"].get(output, {}).get("sha256") != outputs[output]["sha256"]:
+                    stale.add(path)
+        elif outputs_changed:
+            return list(stage.full_rerun_args)
+        return sorted(stale) or None
+
+    def _record(self, stage: Stage) -> None:
+        previous = self.state.get(stage.name, {"inputs": {}, "outputs": {}})
+        inputs = self._hashes(stage.inputs, previous["inputs"])
+        if stage.items and stage.item_output:
+            # Items whose output is missing failed inside the stage; keep them stale so they are retried
+            for path in list(inputs):
+                if fnmatch(path, stage.items) and not (self.root / stage.item_output(Path(path))).exists():
+                    del inputs[path]
+        self.state[stage.name] = {"inputs": inputs, "outputs": self._hashes(stage.outputs, previous["outputs"])}
+        if stage.items and stage.item_inputs:
+            self.state[stage.name]["items"] = self._item_hashes(stage, inputs)
+        save_manifest(self.state, self.state_path)
+
+    def _execute(self, stage: Stage, args: List[str]) -> int:
+        env = dict(os.environ)
+        env["PYTHONPATH"] = os.pathsep.join(filter(None, [str(self.root.resolve()), env.get("PYTHONPATH")]))
+        command = [sys.executable if part == "python" else part for part in stage.command] + args
+        try:
+            return subprocess.run(command, cwd=self.root, env=env).returncode
+        except OSError as e:
+            print(f"[{stage.name}] could not start: {e}")
+            return 1
+
+    def selected(self, targets: List[str] = None) -> List[str]:
+        """Stage names to consider: the targets plus everything upstream of them"""
+        if not targets:
+            targets = [name for name, stage in self.stages.items() if not stage.manual]
+        unknown = [name for name in targets if name not in self.stages]
+        if unknown:
+            raise ValueError(f"Unknown stages: {', '.join(unknown)}")
+        selected, pending = set(), list(targets)
+        while pending:
+            name = pending.pop()
+            if name not in selected:
+                selected.add(name)
+                pending.extend(self.dependencies[name])
+        return [name for name in self.stages if name in selected]
+
+    def run(self, targets: List[str] = None, force: bool = False, dry_run: bool = False, jobs: int = 4) -> Dict[str, str]:
+        """Run stages in dependency order; returns each stage's outcome"""
+        names = self.selected(targets)
+        results: Dict[str, str] = {}
+        running = {}
+        with ThreadPoolExecutor(max_workers=jobs) as executor:
+            while len(results) < len(names):
+                for name in names:
+                    if name in results or name in running.values():
+                        continue
+                    dependencies = [d for d in self.dependencies[name] if d in names]
+                    if any(results.get(d) in ("failed", "blocked") for d in dependencies):
+                        results[name] = "blocked"
+                        print(f"[{name}] blocked by a failed dependency")
+                        continue
+                    if not all(d in results for d in dependencies):
+                        continue
+                    # Hash inputs only now, after upstream stages have written them
+                    stage = self.stages[name]
+                    missing = stage.missing_requirements()
+                    if missing:
+                        # Not recorded, so the stage runs once the modules are installed
+                        results[name] = "skipped"
+                        print(f"[{name}] skipped: {', '.join(missing)} not installed")
+                        continue
+                    upstream_pending = any(results[d] == "would run" for d in dependencies)
+                    args = self.plan(stage, force=force)
+                    if upstream_pending and args is None:
+                        # Dry run: upstream outputs are not written yet, so the stage runs on whatever they change.
+                        # Item stages pick up new items without arguments
+                        args = [] if stage.items else list(stage.full_rerun_args)
+                    if args is None:
+                        results[name] = "skipped"
+                        print(f"[{name}] up to date")
+                        if name not in self.state and not dry_run:
+                            self._record(stage)
+                    elif dry_run:
+                        results[name] = "would run"
+                        after = " after upstream stages" if upstream_pending else ""
+                        print(f"[{name}] would run{after} {' '.join(stage.command + args)}")
+                    else:
+                        print(f"[{name}] running {' '.join(stage.command + args)}")
+                        running[executor.submit(self._execute, stage, args)] = name
+
+                if not running:
+                    if len(results) < len(names) and not any(
+                        all(d in results for d in self.dependencies[n] if d in names) for n in names if n not in results
+                    ):
+                        raise ValueError("Pipeline stages form a cycle")
+                    continue
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    if future.result() == 0:
+                        self._record(self.stages[name])
+                        results[name] = "ran"
+                    else:
+                        results[name] = "failed"
+                    print(f"[{name}] {results[name]}")
+        return results
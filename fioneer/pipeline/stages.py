@@ -0,0 +1,95 @@
+import csv
+from pathlib import Path
+from typing import Dict, List
+from fioneer import serialization
+from .dag import Pipeline, Stage
+
+def metadata_for_transcript(path: Path) -> Path:
+    """data/processed/transcripts/aapl_2024_Q1.csv -> data/processed/metadata/AAPL_2024_Q1.json"""
+    ticker, year, quarter = path.stem.split("_")
+    return Path("data/processed/metadata") / f"{ticker.upper()}_{year}_{quarter}.json"
+
+def transcript_context(root: Path, transcripts: List[Path]) -> List[Dict]:
+    """The company_info row and earnings date each transcript's metadata is built from"""
+    companies, earnings_dates = {}, {}
+    company_info_path = root / "data/processed/company_info.csv"
+    if company_info_path.exists():
+        with open(company_info_path, newline="") as f:
+            companies = {row["Ticker"]: row for row in csv.DictReader(f)}
+    earnings_dates_path = root / "data/processed/earnings_dates.json"
+    if earnings_dates_path.exists():
+        earnings_dates = serialization.load(earnings_dates_path)
+    contexts = []
+    for path in transcripts:
+        ticker, year, quarter = path.stem.split("_")
+        contexts.append({
+            "company": companies.get(ticker.upper()),
+            "earnings_date": earnings_dates.get(f"{ticker.lower()}_{year}_{quarter}"),
+        })
+    return contexts
+
+STAGES = [
+    Stage(
+        "tickers",
+        ["python", "scripts/ticker_fetcher.py"],
+        outputs=["data/processed/ticker_list.json"],
+    ),
+    Stage(
+        "company_info",
+        ["python", "scripts/fetch_company_info.py"],
+        inputs=["data/processed/ticker_list.json"],
+        outputs=["data/processed/company_info.csv"],
+    ),
+    Stage(
+        "transcripts",
+        ["python", "scripts/earnings_to_csv.py"],
+        inputs=["data/processed/ticker_list.json"],
+        outputs=["data/processed/transcripts/*.csv", "data/processed/earnings_dates.json"],
+    ),
+    Stage(
+        "metadata",
+        ["python", "scripts/metadata_extractor.py"],
+        inputs=[
+            "data/processed/transcripts/*.csv",
+            "data/processed/company_info.csv",
+            "data/processed/earnings_dates.json",
+        ],
+        outputs=["data/processed/metadata/*.json"],
+        items="data/processed/transcripts/*.csv",
+        item_output=metadata_for_transcript,
+        # A new quarter rewrites earnings_dates.json; only transcripts whose own entries changed rerun
+        item_inputs=transcript_context,
+        full_rerun_args=["--overwrite"],
+    ),
+    Stage(
+        # The vectorizer skips transcripts whose metadata hash is already in the store
+        "embeddings",
+        ["python", "-m", "fioneer.embeddings.vectorizer"],
+        inputs=["data/processed/metadata/*.json"],
+        outputs=["data/embeddings/*"],
+    ),
+    Stage(
+        "index",
+        ["python", "scripts/create_index.py"],
+        inputs=["data/processed/metadata/*.json", "data/embeddings/*"],
+        outputs=["data/index/**/*"],
+    ),
+    Stage(
+        "parquet",
+        ["python", "scripts/export_parquet.py"],
+        inputs=["data/processed/metadata/*.json"],
+        outputs=["data/parquet/**/*.parquet"],
+        # pip install "fioneer[parquet]"
+        requires=["pyarrow"],
+    ),
+    Stage(
+        "upload",
+        ["python", "scripts/upload_to_hf.py"],
+        inputs=["data/processed/metadata/*.json", "data/embeddings/*", "data/index/**/*"],
+        manual=True,
+    ),
+]
+
+def build_pipeline(root: Path = Path(".")) -> Pipeline:
+    """The fioneer data pipeline rooted at the repository checkout"""
+    return Pipeline(STAGES, root=root)
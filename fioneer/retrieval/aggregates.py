@@ -0,0 +1,259 @@
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional, Tuple
+from fioneer import serialization
+
+# faiss and numpy are imported on first use; only building and searching centroids needs them
+if TYPE_CHECKING:
+    import numpy as np
+
+AGGREGATES_FILE = "aggregates.json"
+TICKERS_INDEX = "tickers.index"
+QUARTERS_INDEX = "quarters.index"
+
+def group_sums(embeddings: "np.ndarray", codes: "np.ndarray", n_groups: int) -> "np.ndarray":
+    """
+    Sum of the vectors per group code (rows with code -1 are skipped)
+
+    Metadata is ordered by transcript, so groups come in contiguous runs;
+    each run is summed as a slice, without copying rows. Unordered codes
+    still work, just with more, shorter runs.
+    """
+    import numpy as np
+
+    sums = np.zeros((n_groups, embeddings.shape[1]), dtype=np.float32)
+    starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]]) if len(codes) else np.array([], dtype=np.int64)
+    ends = np.r_[starts[1:], len(codes)]
+    for start, end in zip(starts.tolist(), ends.tolist()):
+        code = codes[start]
+        if code >= 0:
+            sums[code] += embeddings[start:end].sum(axis=0)
+    return sums
+
+def centroids(embeddings: "np.ndarray", codes: "np.ndarray", n_groups: int) -> "np.ndarray":
+    """Normalized mean vector per group code (rows with code -1 are skipped)"""
+    import faiss
+
+    sums = group_sums(embeddings, codes, n_groups)
+    faiss.normalize_L2(sums)
+    return sums
+
+class GroupSums:
+    """
+    Running vector sums per ticker and per ticker-quarter
+
+    A centroid is its group's sum normalized, and aggregates.json records
+    each sum's norm, so a saved bundle gives back the exact sums. Appending
+    a transcript then updates only the groups it touches, without reading
+    the Q&A vectors of the index.
+    """
+
+    def __init__(self, dimension: int):
+        import numpy as np
+
+        self.dimension = dimension
+        # Group descriptions in first-seen order; a group's position is its row in the centroid index
+        self.tickers: Dict[str, Dict] = {}
+        self.quarters: Dict[Tuple[str, int, int], Dict] = {}
+        self.ticker_sums = np.zeros((0, dimension), dtype=np.float32)
+        self.quarter_sums = np.zeros((0, dimension), dtype=np.float32)
+
+    @classmethod
+    def load(cls, directory: Path, entry: Dict[str, str]) -> Optional["GroupSums"]:
+        """Sums of a saved bundle; None for bundles from before norms were recorded"""
+        import faiss
+        import numpy as np
+
+        groups = serialization.load(directory / entry["file"])
+        if "norms" not in groups:
+            return None
+        tickers = faiss.read_index(str(directory / entry["tickers"]))
+        quarters = faiss.read_index(str(directory / entry["quarters"]))
+        sums = cls(tickers.d)
+        sums.tickers = {group["ticker"]: group for group in groups["tickers"]}
+        sums.quarters = {(group["ticker"], group["year"], group["q"]): group for group in groups["quarters"]}
+        norms = groups["norms"]
+        sums.ticker_sums = tickers.reconstruct_n(0, tickers.ntotal) * np.float32(norms["tickers"])[:, None]
+        sums.quarter_sums = quarters.reconstruct_n(0, quarters.ntotal) * np.float32(norms["quarters"])[:, None]
+        return sums
+
+    def add(self, embeddings: "np.ndarray", metadata: List[Dict]) -> None:
+        """Add normalized embeddings, row-aligned with their metadata, to their groups"""
+        import numpy as np
+
+        ticker_rows = {ticker: row for row, ticker in enumerate(self.tickers)}
+        quarter_rows = {key: row for row, key in enumerate(self.quarters)}
+        ticker_codes = np.full(len(metadata), -1, dtype=np.int64)
+        quarter_codes = np.full(len(metadata), -1, dtype=np.int64)
+        for row, entry in enumerate(metadata):
+            ticker = entry.get("ticker")
+            if not ticker:
+                continue
+            if ticker not in self.tickers:
+                self.tickers[ticker] = {"ticker": ticker, "company": entry.get("company"), "entries": 0}
+                ticker_rows[ticker] = len(ticker_rows)
+            self.tickers[ticker]["entries"] += 1
+            ticker_codes[row] = ticker_rows[ticker]
+            try:
+                key = (ticker, int(entry["year"]), int(entry["q"]))
+            except (KeyError, TypeError, ValueError):
+                continue
+            if key not in self.quarters:
+                self.quarters[key] = {"ticker": ticker, "company": entry.get("company"), "year": key[1], "q": key[2],
+                                      "entries": 0}
+                quarter_rows[key] = len(quarter_rows)
+            self.quarters[key]["entries"] += 1
+            quarter_codes[row] = quarter_rows[key]
+
+        self.ticker_sums = np.vstack([
+            self.ticker_sums, np.zeros((len(self.tickers) - len(self.ticker_sums), self.dimension), dtype=np.float32)
+        ]) + group_sums(embeddings, ticker_codes, len(self.tickers))
+        self.quarter_sums = np.vstack([
+            self.quarter_sums, np.zeros((len(self.quarters) - len(self.quarter_sums), self.dimension), dtype=np.float32)
+        ]) + group_sums(embeddings, quarter_codes, len(self.quarters))
+
+    def remove_quarters(self, keys: Iterable[Tuple[str, int, int]]) -> None:
+        """Drop whole ticker-quarters, taking their vectors out of their company's sum too"""
+        import numpy as np
+
+        quarter_rows = {key: row for row, key in enumerate(self.quarters)}
+        ticker_rows = {ticker: row for row, ticker in enumerate(self.tickers)}
+        dropped = [key for key in set(keys) if key in self.quarters]
+        for key in dropped:
+            group = self.quarters[key]
+            self.ticker_sums[ticker_rows[key[0]]] -= self.quarter_sums[quarter_rows[key]]
+            self.tickers[key[0]]["entries"] -= group["entries"]
+        keep_quarters = [row for key, row in quarter_rows.items() if key not in dropped]
+        keep_tickers = [row for ticker, row in ticker_rows.items() if self.tickers[ticker]["entries"] > 0]
+        self.quarters = {key: group for key, group in self.quarters.items() if key not in dropped}
+        self.tickers = {ticker: group for ticker, group in self.tickers.items() if group["entries"] > 0}
+        self.quarter_sums = self.quarter_sums[np.array(keep_quarters, dtype=np.int64)]
+        self.ticker_sums = self.ticker_sums[np.array(keep_tickers, dtype=np.int64)]
+
+    def save(self, output_dir: Path) -> Dict[str, Any]:
+        """Write the centroid indexes and group descriptions; returns the manifest entry"""
+        import faiss
+        import numpy as np
+
+        norms = {}
+        for name, key, sums in ((TICKERS_INDEX, "tickers", self.ticker_sums), (QUARTERS_INDEX, "quarters", self.quarter_sums)):
+            vectors = np.array(sums, dtype=np.float32)
+            norms[key] = np.linalg.norm(vectors, axis=1).tolist()
+            faiss.normalize_L2(vectors)
+            index = faiss.IndexFlatIP(self.dimension)
+            if len(vectors):
+                index.add(vectors)
+            faiss.write_index(index, str(output_dir / name))
+        serialization.save(
+            {"tickers": list(self.tickers.values()), "quarters": list(self.quarters.values()), "norms": norms},
+            output_dir / AGGREGATES_FILE,
+        )
+        return {"file": AGGREGATES_FILE, "tickers": TICKERS_INDEX, "quarters": QUARTERS_INDEX}
+
+def save_aggregates(embeddings: "np.ndarray", metadata: List[Dict], output_dir: Path) -> Dict[str, Any]:
+    """
+    Write centroid indexes per ticker and per ticker-quarter; returns the manifest entry
+
+    embeddings must be normalized and row-aligned with metadata.
+    """
+    sums = GroupSums(embeddings.shape[1])
+    sums.add(embeddings, metadata)
+    return sums.save(output_dir)
+
+class AggregateIndex:
+    """
+    Company- and quarter-level centroid indexes for peer and trend lookups
+
+    Each ticker and each ticker-quarter is one normalized mean of its Q&A
+    vectors, so "who sounds like NVDA" is a single search over a few
+    thousand vectors instead of many Q&A-level searches plus aggregation.
+    """
+
+    def __init__(self, tickers, quarters, ticker_groups: List[Dict], quarter_groups: List[Dict]):
+        import numpy as np
+
+        self.tickers = tickers
+        self.quarters = quarters
+        self.ticker_groups = ticker_groups
+        self.quarter_groups = quarter_groups
+        self.ticker_rows = {group["ticker"]: row for row, group in enumerate(ticker_groups)}
+        self.quarter_rows = {
+            (group["ticker"], group["year"], group["q"]): row for row, group in enumerate(quarter_groups)
+        }
+        periods: Dict[Tuple[int, int], List[int]] = {}
+        history: Dict[str, List[int]] = {}
+        for row, group in enumerate(quarter_groups):
+            periods.setdefault((group["year"], group["q"]), []).append(row)
+            history.setdefault(group["ticker"], []).append(row)
+        self.period_rows = {period: np.array(rows, dtype=np.int64) for period, rows in periods.items()}
+        # Each company's quarter rows in chronological order
+        self.history = {
+            ticker: sorted(rows, key=lambda row: (quarter_groups[row]["year"], quarter_groups[row]["q"]))
+            for ticker, rows in history.items()
+        }
+
+    @classmethod
+    def load(cls, directory: Path, entry: Dict[str, str]) -> "AggregateIndex":
+        """Load the aggregate indexes listed in a manifest's "aggregates" entry"""
+        import faiss
+
+        groups = serialization.load(directory / entry["file"])
+        return cls(
+            faiss.read_index(str(directory / entry["tickers"])),
+            faiss.read_index(str(directory / entry["quarters"])),
+            groups["tickers"],
+            groups["quarters"],
+        )
+
+    def latest_quarter(self, ticker: str) -> Optional[Tuple[int, int]]:
+        """Most recent (year, quarter) indexed for a ticker"""
+        rows = self.history.get(ticker)
+        if not rows:
+            return None
+        group = self.quarter_groups[rows[-1]]
+        return group["year"], group["q"]
+
+    def peers(self, ticker: str, k: int = 5, year: Optional[int] = None, q: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Companies whose Q&A is most similar to the ticker's
+
+        Without a period the comparison is over each company's whole history;
+        with year and q it compares what companies said in that quarter.
+        """
+        import faiss
+
+        if (year is None) != (q is None):
+            raise ValueError("Give both year and q to compare a quarter, or neither for whole histories")
+        if year is None:
+            if ticker not in self.ticker_rows:
+                raise ValueError(f"Unknown ticker: {ticker}")
+            query = self.tickers.reconstruct(self.ticker_rows[ticker]).reshape(1, -1)
+            distances, rows = self.tickers.search(query, min(k + 1, self.tickers.ntotal))
+            groups = self.ticker_groups
+        else:
+            if (ticker, year, q) not in self.quarter_rows:
+                raise ValueError(f"No {ticker} entries for {year} Q{q}")
+            query = self.quarters.reconstruct(self.quarter_rows[(ticker, year, q)]).reshape(1, -1)
+            candidates = self.period_rows[(year, q)]
+            params = faiss.SearchParameters(sel=faiss.IDSelectorBatch(candidates))
+            distances, rows = self.quarters.search(query, min(k + 1, len(candidates)), params=params)
+            groups = self.quarter_groups
+
+        return [
+            {**groups[row], "similarity": float(distance)}
+            for row, distance in zip(rows[0], distances[0])
+            if row != -1 and groups[row]["ticker"] != ticker
+        ][:k]
+
+    def quarter_trend(self, ticker: str) -> List[Dict[str, Any]]:
+        """A company's quarters in order, each with its similarity to the previous quarter"""
+        import numpy as np
+
+        rows = self.history.get(ticker)
+        if not rows:
+            raise ValueError(f"Unknown ticker: {ticker}")
+        vectors = self.quarters.reconstruct_batch(np.array(rows, dtype=np.int64))
+        similarities = [None] + [float(score) for score in np.einsum("ij,ij->i", vectors[1:], vectors[:-1])]
+        return [
+            {**self.quarter_groups[row], "similarity_to_previous": similarity}
+            for row, similarity in zip(rows, similarities)
+        ]
@@ -0,0 +1,81 @@
+import shutil
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, Optional
+from fioneer import serialization
+from fioneer.hub.manifest import file_sha256
+
+# Layout: <root>/versions/<version>/{earnings.index, metadata.json, manifest.json, ...}
+# and <root>/CURRENT naming the published version
+CURRENT_FILE = "CURRENT"
+VERSIONS_DIR = "versions"
+MANIFEST_FILE = "manifest.json"
+
+def current_version(index_root: Path) -> Optional[str]:
+    """Published version, or None for an unversioned index directory"""
+    try:
+        return (Path(index_root) / CURRENT_FILE).read_text().strip() or None
+    except FileNotFoundError:
+        return None
+
+def bundle_dir(index_root: Path, version: Optional[str] = None) -> Path:
+    """Directory holding a version's files; an unversioned index lives in index_root itself"""
+    version = version or current_version(index_root)
+    return Path(index_root) / VERSIONS_DIR / version if version else Path(index_root)
+
+def checksum_files(directory: Path) -> Dict[str, str]:
+    """SHA-256 of every file in a bundle except its manifest"""
+    return {
+        path.relative_to(directory).as_posix(): file_sha256(path)
+        for path in sorted(directory.rglob("*"))
+        if path.is_file() and path.name != MANIFEST_FILE
+    }
+
+def verify_bundle(directory: Path, manifest: Dict) -> None:
+    """Raise ValueError if a file listed in the manifest is missing or changed"""
+    for name, expected in manifest.get("checksums", {}).items():
+        path = directory / name
+        if not path.exists():
+            raise ValueError(f"Index bundle {directory} is missing {name}")
+        if file_sha256(path) != expected:
+            raise ValueError(f"Index bundle {directory} has a corrupt {name}")
+
+def publish_bundle(index_root: Path, build: Callable[[Path], None], keep: int = 3) -> str:
+    """
+    Build a new index version and make it current atomically
+
+    build writes the index files and manifest.json into the directory it is
+    given, which is only renamed into versions/ once complete and
+    checksummed. CURRENT is then replaced in one rename, so readers see
+    either the old version or the new one, never a partial write. The
+    newest keep versions are retained. Returns the new version.
+    """
+    index_root = Path(index_root)
+    versions = index_root / VERSIONS_DIR
+    versions.mkdir(parents=True, exist_ok=True)
+    version = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%fZ")
+    staging = versions / f".{version}.tmp"
+    try:
+        staging.mkdir()
+        build(staging)
+        manifest = serialization.load(staging / MANIFEST_FILE)
+        manifest["version"] = version
+        manifest["checksums"] = checksum_files(staging)
+        serialization.save(manifest, staging / MANIFEST_FILE)
+        staging.rename(versions / version)
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+    serialization.atomic_write(index_root / CURRENT_FILE, f"{version}\n".encode("utf-8"))
+    prune_versions(index_root, keep)
+    return version
+
+def prune_versions(index_root: Path, keep: int = 3) -> None:
+    """Delete all but the newest keep versions, never the current one"""
+    versions = Path(index_root) / VERSIONS_DIR
+    current = current_version(index_root)
+    published = sorted(path for path in versions.iterdir() if path.is_dir() and not path.name.startswith("."))
+    for path in published[:-keep] if keep > 0 else published:
+        if path.name != current:
+            shutil.rmtree(path, ignore_errors=True)
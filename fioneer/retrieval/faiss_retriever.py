@@ -1,55 +1,371 @@
-import faiss
-import numpy as np
-import json
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import TYPE_CHECKING, List, Dict, Any, Optional
+from fioneer.embeddings.backends import EmbeddingBackend, OpenAIBackend, create_backend
+from fioneer.embeddings.hedging import HedgingPolicy
 from fioneer.embeddings.vectorizer import EmbeddingGenerator
+from fioneer.retrieval.aggregates import AggregateIndex
+from fioneer.retrieval.bundles import bundle_dir, current_version, verify_bundle
+from fioneer.retrieval.router import EntityRouter, RowIndex
+from fioneer.metrics import counter, histogram, profile_memory, timer
+from fioneer import serialization
 from pprint import pprint
 
+# faiss and numpy are imported on first use so importing the retriever stays cheap
+if TYPE_CHECKING:
+    import numpy as np
+
+STAGE_SECONDS = histogram("retrieval_stage_seconds", "Latency of each retrieval stage")
+QUERIES_TOTAL = counter("retrieval_queries_total", "Queries answered by the retriever")
+LOAD_SECONDS = histogram("index_load_seconds", "Time to load the index and metadata")
+ROUTED_TOTAL = counter("retrieval_routed_queries_total", "Queries by entity routing outcome")
+RELOADS_TOTAL = counter("index_reloads_total", "Index versions swapped in while serving, by outcome")
+
+class IndexState:
+    """Everything loaded from one index version; a reload swaps in a new one as a unit"""
+
+    def __init__(
+        self,
+        index=None,
+        metadata: Optional[List[Dict[str, Any]]] = None,
+        shards: Optional[List] = None,
+        full_vectors: Optional["np.ndarray"] = None,
+        rerank_factor: int = 1,
+        router: Optional[EntityRouter] = None,
+        row_index: Optional[RowIndex] = None,
+        aggregates: Optional[AggregateIndex] = None,
+        embedding_generator: Optional[EmbeddingGenerator] = None,
+        version: Optional[str] = None,
+    ):
+        self.index = index
+        self.metadata = metadata
+        self.shards = shards or []
+        # Full-precision vectors when the index is dimension-reduced
+        self.full_vectors = full_vectors
+        self.rerank_factor = rerank_factor
+        self.router = router
+        self.row_index = row_index
+        self.aggregates = aggregates
+        # Embeds queries with the backend the index was built with
+        self.embedding_generator = embedding_generator
+        self.version = version
+
+def _state_attribute(name: str) -> property:
+    """Expose a field of the live IndexState as a retriever attribute"""
+    return property(
+        lambda self: getattr(self.state, name),
+        lambda self, value: setattr(self.state, name, value),
+    )
+
 class FaissRetriever:
-    def __init__(self):
-        self.index = None
-        self.metadata = None
-        self.embedding_generator = EmbeddingGenerator()
-        
+    index = _state_attribute("index")
+    metadata = _state_attribute("metadata")
+    shards = _state_attribute("shards")
+    full_vectors = _state_attribute("full_vectors")
+    rerank_factor = _state_attribute("rerank_factor")
+    router = _state_attribute("router")
+    row_index = _state_attribute("row_index")
+    aggregates = _state_attribute("aggregates")
+    embedding_generator = _state_attribute("embedding_generator")
+    version = _state_attribute("version")
+
+    def __init__(
+        self,
+        search_threads: int = 1,
+        omp_threads: Optional[int] = None,
+        hedging: Optional[HedgingPolicy] = None,
+        routing: bool = False,
+        aliases: Optional[Dict[str, List[str]]] = None,
+        verify: bool = True,
+        backend: Optional[EmbeddingBackend] = None,
+        embedding_workers: int = 1,
+    ):
+        """
+        Args:
+            search_threads: Threads that run index searches, off the event loop
+            omp_threads: OpenMP threads FAISS may use per search (process-wide;
+                None keeps the FAISS default of one per core)
+            hedging: Send a backup query embedding call when the first is slow
+            routing: Restrict each query to the companies and quarters it names
+            aliases: Extra names per ticker for routing, e.g. {"GOOGL": ["Google"]}
+            verify: Check bundle checksums before a version is used
+            backend: Embed queries with this backend instead of the one
+                recorded in the index manifest
+            embedding_workers: Inference threads of a local embedding backend
+        """
+        self.hedging = hedging
+        self.backend = backend
+        self.embedding_workers = embedding_workers
+        self.state = IndexState(embedding_generator=EmbeddingGenerator(hedging=hedging, backend=backend))
+        self.search_executor = ThreadPoolExecutor(max_workers=search_threads, thread_name_prefix="faiss-search")
+        self.omp_threads = omp_threads
+        self.routing = routing
+        self.aliases = aliases
+        self.verify = verify
+        self.failed_version = None
+        # Held while an index version is read, so a reload never loads a second copy alongside it
+        self.load_lock = threading.Lock()
+
     def load_index(self, index_dir: Path) -> None:
-        """Load pre-built FAISS index and metadata"""
+        """Load the current index version (or an unversioned index directory) and swap it in"""
+        with self.load_lock:
+            state = self.read_index(Path(index_dir))
+            self.swap_state(state)
+        print(f"Loaded index with {state.index.ntotal} vectors" + (f" in {len(state.shards)} shards" if state.shards else "")
+              + (f" (version {state.version})" if state.version else ""))
+        print(f"Loaded {len(state.metadata)} documents")
+
+    @profile_memory("load_index")
+    def read_index(self, index_dir: Path) -> IndexState:
+        """Load index, metadata and routing tables of the current version, without touching the live state"""
+        import faiss
+
+        if self.omp_threads:
+            faiss.omp_set_num_threads(self.omp_threads)
+
+        version = current_version(index_dir)
+        directory = bundle_dir(index_dir, version)
+        manifest_path = directory / "manifest.json"
+        manifest = serialization.load(manifest_path) if manifest_path.exists() else {}
+        if self.verify and manifest.get("checksums"):
+            with timer(LOAD_SECONDS, part="verify"):
+                verify_bundle(directory, manifest)
+        state = IndexState(version=version)
+
         # Load FAISS index
-        index_path = index_dir / "earnings.index"
-        self.index = faiss.read_index(str(index_path))
+        with timer(LOAD_SECONDS, part="index"):
+            if manifest.get("shards"):
+                state.index, state.shards = self.load_shards(directory, manifest["shards"])
+            else:
+                state.index = faiss.read_index(str(directory / "earnings.index"))
+
+        # Memory-mapped, so only the rows that get reranked are paged in
+        if manifest.get("vectors_file"):
+            import numpy as np
+
+            with timer(LOAD_SECONDS, part="vectors"):
+                state.full_vectors = np.load(directory / manifest["vectors_file"], mmap_mode="r")
+            state.rerank_factor = manifest.get("rerank_factor", 4)
         
         # Load metadata
-        metadata_path = index_dir / "metadata.json"
-        with open(metadata_path, 'r') as f:
-            self.metadata = json.load(f)
-            
-        print(f"Loaded index with {self.index.ntotal} vectors")
-        print(f"Loaded {len(self.metadata)} documents")
+        metadata_path = directory / manifest.get("metadata_file", "metadata.json")
+        with timer(LOAD_SECONDS, part="metadata"):
+            state.metadata = serialization.load(metadata_path)
+        if self.routing:
+            with timer(LOAD_SECONDS, part="router"):
+                state.router = EntityRouter.from_metadata(state.metadata, self.aliases)
+                state.row_index = RowIndex(state.metadata)
+        if manifest.get("aggregates"):
+            with timer(LOAD_SECONDS, part="aggregates"):
+                state.aggregates = AggregateIndex.load(directory, manifest["aggregates"])
+        # Last, so a version that fails to load never leaves a query model behind
+        state.embedding_generator = self.query_embedder(manifest.get("embedding"))
+        return state
+
+    def swap_state(self, state: IndexState) -> None:
+        """Make state the live one, closing the query backend it replaces"""
+        previous = self.state
+        # A single assignment: searches already running finish on the state they started with
+        self.state = state
+        if previous.embedding_generator is not state.embedding_generator:
+            # Searches on the old state have already submitted their embedding calls, which still complete
+            previous.embedding_generator.backend.close()
+
+    def query_embedder(self, spec: Optional[Dict[str, Any]]) -> EmbeddingGenerator:
+        """Query embedder for an index built by the given backend spec, reusing the current one when it matches"""
+        current = self.state.embedding_generator
+        # Indexes from before backends were recorded hold OpenAI embeddings
+        spec = spec or OpenAIBackend().spec()
+        if self.backend is not None or current.backend.spec() == spec:
+            return current
+        options = {"workers": self.embedding_workers} if spec["backend"] == "local" else {}
+        backend = create_backend(spec, **options)
+        with timer(LOAD_SECONDS, part="embedding_model"):
+            # Load a local model now rather than on the first query
+            try:
+                backend.warm()
+            except BaseException:
+                backend.close()
+                raise
+        return EmbeddingGenerator(hedging=self.hedging, backend=backend)
+
+    async def reload_if_changed(self, index_dir: Path) -> bool:
+        """Load a newly published version in the background and swap it in; returns True if swapped"""
+        version = current_version(index_dir)
+        if version is None or version in (self.state.version, self.failed_version):
+            return False
+        # Another load (e.g. the startup load of a large index) is in flight; check again on the next poll
+        if not self.load_lock.acquire(blocking=False):
+            return False
+        try:
+            state = await asyncio.to_thread(self.read_index, Path(index_dir))
+        except Exception as e:
+            # Keep serving the old version; retry only once another version is published
+            self.failed_version = version
+            RELOADS_TOTAL.inc(status="error")
+            print(f"Keeping index version {self.state.version}: could not load {version}: {e}")
+            return False
+        finally:
+            self.load_lock.release()
+        self.swap_state(state)
+        RELOADS_TOTAL.inc(status="ok")
+        print(f"Swapped in index version {state.version} ({state.index.ntotal} vectors)")
+        return True
+
+    async def watch_index(self, index_dir: Path, interval: float = 10.0) -> None:
+        """Poll for newly published index versions until cancelled"""
+        while True:
+            await asyncio.sleep(interval)
+            await self.reload_if_changed(index_dir)
+
+    @staticmethod
+    def load_shards(index_dir: Path, shards: List[Dict[str, Any]]):
+        """
+        Combine shard files into one index that searches them in parallel
+
+        IndexShards runs each shard's search on its own thread (FAISS releases
+        the GIL) and merges the per-shard top-k; shard ids are global metadata rows.
+        """
+        import faiss
+
+        shard_indexes = [faiss.read_index(str(index_dir / shard["file"])) for shard in shards]
+        index = faiss.IndexShards(shard_indexes[0].d, True, False)
+        for shard_index in shard_indexes:
+            index.add_shard(shard_index)
+        # Keep the Python objects alive for as long as the combined index
+        return index, shard_indexes
     
     async def search_similar(self, query: str, k: int = 5) -> List[Dict[str, Any]]:
         """Search for similar documents given a query"""
-        # Generate query embedding
-        query_embedding = await self.embedding_generator.generate_embedding(query)
-        query_embedding = query_embedding.reshape(1, -1)
+        results = await self.search_batch([query], k)
+        return results[0]
+
+    async def search_batch(self, queries: List[str], k: int = 5) -> List[List[Dict[str, Any]]]:
+        """Search for several queries with one embedding call and one index search"""
+        # Embed, route and search against one index version even if a reload lands meanwhile
+        state = self.state
+        with timer(STAGE_SECONDS, stage="embed"):
+            query_embeddings = await state.embedding_generator.generate_embeddings(queries)
+        subsets = self.route_queries(queries, state) if state.router else None
+        return await self.search_vectors(query_embeddings, k, subsets, state)
+
+    def route_queries(self, queries: List[str], state: Optional[IndexState] = None) -> List[Optional["np.ndarray"]]:
+        """Metadata rows each query should be searched in (None searches everything)"""
+        state = state or self.state
+        with timer(STAGE_SECONDS, stage="route"):
+            subsets = [state.row_index.rows(state.router.route(query)) for query in queries]
+        for rows in subsets:
+            ROUTED_TOTAL.inc(outcome="unfiltered" if rows is None else "filtered")
+        return subsets
+
+    async def search_vectors(
+        self,
+        query_embeddings: "np.ndarray",
+        k: int = 5,
+        subsets: Optional[List[Optional["np.ndarray"]]] = None,
+        state: Optional[IndexState] = None,
+    ) -> List[List[Dict[str, Any]]]:
+        """Run search_by_vectors on the search executor so the event loop keeps serving"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self.search_executor, self.search_by_vectors, query_embeddings, k, subsets, state
+        )
+
+    def search_by_vectors(
+        self,
+        query_embeddings: "np.ndarray",
+        k: int = 5,
+        subsets: Optional[List[Optional["np.ndarray"]]] = None,
+        state: Optional[IndexState] = None,
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Search the index with a matrix of query embeddings
+
+        subsets optionally gives, per query, the metadata rows to search;
+        queries sharing a subset are searched together with an ID selector.
+        A dimension-reduced index returns k * rerank_factor candidates,
+        which are reranked with exact inner products on the full vectors.
+        """
+        import faiss
+        import numpy as np
+
+        state = state or self.state
+        index = state.index
+        query_embeddings = np.ascontiguousarray(query_embeddings, dtype=np.float32).reshape(-1, index.d)
         
-        # Normalize query vector (since we're using IndexFlatIP)
-        faiss.normalize_L2(query_embedding)
+        # Normalize query vectors (since we're using inner product similarity)
+        faiss.normalize_L2(query_embeddings)
         
         # Search in Faiss index
-        distances, indices = self.index.search(query_embedding, k)
+        search_k = k * state.rerank_factor if state.full_vectors is not None else k
+        with timer(STAGE_SECONDS, stage="search"):
+            if subsets is None or all(rows is None for rows in subsets):
+                distances, indices = index.search(query_embeddings, search_k)
+            else:
+                distances = np.zeros((len(query_embeddings), search_k), dtype=np.float32)
+                indices = np.full((len(query_embeddings), search_k), -1, dtype=np.int64)
+                groups: Dict[int, Any] = {}
+                for i, rows in enumerate(subsets):
+                    groups.setdefault(id(rows), (rows, []))[1].append(i)
+                for rows, members in groups.values():
+                    params = None if rows is None else faiss.SearchParameters(sel=faiss.IDSelectorBatch(rows))
+                    distances[members], indices[members] = index.search(query_embeddings[members], search_k, params=params)
+
+        if state.full_vectors is not None:
+            with timer(STAGE_SECONDS, stage="rerank"):
+                distances, indices = self.rerank(query_embeddings, indices, k, state.full_vectors)
         
         # Get corresponding metadata
-        results = []
-        for idx, distance in zip(indices[0], distances[0]):
-            if idx != -1:  # FAISS returns -1 for not found
-                result = {
-                    "metadata": self.metadata[idx],
-                    "similarity": float(distance)  # Using dot product similarity as distance
-                }
-                results.append(result)
+        all_results = []
+        with timer(STAGE_SECONDS, stage="metadata"):
+            for row_indices, row_distances in zip(indices, distances):
+                results = []
+                for idx, distance in zip(row_indices, row_distances):
+                    if idx != -1:  # FAISS returns -1 for not found
+                        result = {
+                            "metadata": state.metadata[idx],
+                            "similarity": float(distance)  # Using dot product similarity as distance
+                        }
+                        results.append(result)
+                all_results.append(results)
+        QUERIES_TOTAL.inc(len(all_results))
             
-        return results
+        return all_results
     
+    @staticmethod
+    def rerank(query_embeddings: "np.ndarray", candidates: "np.ndarray", k: int, full_vectors: "np.ndarray"):
+        """Exact top-k among each query's candidate rows, as (distances, indices) padded with -1"""
+        import numpy as np
+
+        distances = np.zeros((len(candidates), k), dtype=np.float32)
+        indices = np.full((len(candidates), k), -1, dtype=np.int64)
+        for i, (query, rows) in enumerate(zip(query_embeddings, candidates)):
+            # Sorted rows read the memory map in file order
+            rows = np.unique(rows[rows >= 0])
+            scores = np.asarray(full_vectors[rows], dtype=np.float32) @ query
+            top = np.argsort(-scores)[:k]
+            distances[i, :len(top)] = scores[top]
+            indices[i, :len(top)] = rows[top]
+        return distances, indices
+
+    def peers(self, ticker: str, k: int = 5, year: Optional[int] = None, q: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Companies most similar to the ticker overall, or in one quarter when year and q are given"""
+        aggregates = self.state.aggregates
+        if aggregates is None:
+            raise ValueError("The index was built without aggregates; rebuild it with create_index.py")
+        with timer(STAGE_SECONDS, stage="aggregates"):
+            return aggregates.peers(ticker, k, year, q)
+
+    def quarter_trend(self, ticker: str) -> List[Dict[str, Any]]:
+        """The ticker's quarters in order with quarter-over-quarter similarity"""
+        aggregates = self.state.aggregates
+        if aggregates is None:
+            raise ValueError("The index was built without aggregates; rebuild it with create_index.py")
+        with timer(STAGE_SECONDS, stage="aggregates"):
+            return aggregates.quarter_trend(ticker)
+
     def get_document_by_index(self, idx: int) -> Dict[str, Any]:
         """Get document metadata by index"""
         if idx < 0 or idx >= len(self.metadata):
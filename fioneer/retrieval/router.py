@@ -0,0 +1,256 @@
+import re
+from collections import deque
+from typing import TYPE_CHECKING, Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+if TYPE_CHECKING:
+    import numpy as np
+
+# Corporate suffixes dropped to get the name people actually type ("Apple Inc." -> "Apple")
+_SUFFIX = re.compile(
+    r"(?:,?\s+(?:inc|incorporated|corp|corporation|co|company|ltd|limited|plc|holdings?|group|n\.?v|s\.?a|ag|se)\.?)+$",
+    re.IGNORECASE,
+)
+# Uppercase words common in finance questions that are also tickers; these need a $ prefix
+AMBIGUOUS_TICKERS = {
+    "AI", "ALL", "ARE", "CEO", "EPS", "EV", "FY", "GDP", "IR", "IT", "NOW", "ON", "ONE", "PM", "US", "USA",
+}
+
+_TICKER_TOKEN = re.compile(r"(?<![\w$])(\$?)([A-Z][A-Z0-9]*(?:[.\-][A-Z])?)(?![\w])")
+_ORDINALS = {"first": 1, "second": 2, "third": 3, "fourth": 4, "1st": 1, "2nd": 2, "3rd": 3, "4th": 4}
+_QUARTER_YEAR = re.compile(r"\bq([1-4])\s*(?:fy\s*)?(?:'|’)?(\d{4}|\d{2})?\b")
+_YEAR_QUARTER = re.compile(r"\b(?:fy\s*)?(20\d{2})\s*q([1-4])\b")
+_ORDINAL_QUARTER = re.compile(
+    r"\b(first|second|third|fourth|1st|2nd|3rd|4th)\s+quarter(?:\s+of)?(?:\s+(?:fiscal|fy))?(?:\s+(?:year\s+)?(\d{4}))?\b"
+)
+_YEAR = re.compile(r"\b(?:fy\s*)?(20\d{2})\b")
+
+class AhoCorasick:
+    """
+    Multi-pattern matcher built once over many keys
+
+    Finds every occurrence of every key in a single pass over the text, so
+    matching cost depends on the query length, not the number of companies.
+    """
+
+    def __init__(self, patterns: Dict[str, object]):
+        self.goto: List[Dict[str, int]] = [{}]
+        self.fail: List[int] = [0]
+        self.out: List[List[Tuple[int, object]]] = [[]]
+        for key, value in patterns.items():
+            state = 0
+            for char in key:
+                if char not in self.goto[state]:
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.out.append([])
+                    self.goto[state][char] = len(self.goto) - 1
+                state = self.goto[state][char]
+            self.out[state].append((len(key), value))
+
+        # Breadth-first failure links; each state also reports the keys of its fallback states
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, child in self.goto[state].items():
+                queue.append(child)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[child] = self.goto[fallback].get(char, 0)
+                self.out[child] = self.out[child] + self.out[self.fail[child]]
+
+    def find(self, text: str) -> List[Tuple[int, int, object]]:
+        """(start, end, value) for every key occurring in text"""
+        matches = []
+        state = 0
+        for end, char in enumerate(text, 1):
+            while state and char not in self.goto[state]:
+                state = self.fail[state]
+            state = self.goto[state].get(char, 0)
+            for length, value in self.out[state]:
+                matches.append((end - length, end, value))
+        return matches
+
+def company_aliases(name: str) -> List[str]:
+    """
+    Names a company is referred to by: full name and name without suffix
+
+    Multi-word names are lowercased and matched in any case. A single-word
+    name keeps its capitalization, because many are also common words
+    ("Target", "Block", "Booking") and only the capitalized form is the company.
+    """
+    name = " ".join(name.split())
+    if not name or name.upper() == "N/A":
+        return []
+    aliases = {name}
+    short = _SUFFIX.sub("", name).strip(" ,.")
+    if short:
+        aliases.add(short)
+    return sorted(alias if " " not in alias else alias.lower() for alias in aliases)
+
+class Route:
+    """Entities and periods a query mentions"""
+
+    def __init__(self, tickers: FrozenSet[str] = frozenset(), periods: FrozenSet[Tuple[Optional[int], Optional[int]]] = frozenset()):
+        self.tickers = frozenset(tickers)
+        # (year, quarter) pairs; either may be None, e.g. (2024, None) is all of 2024
+        self.periods = frozenset(periods)
+
+    @property
+    def key(self) -> Tuple[FrozenSet[str], FrozenSet]:
+        return self.tickers, self.periods
+
+    def __bool__(self) -> bool:
+        return bool(self.tickers or self.periods)
+
+    def __repr__(self) -> str:
+        return f"Route(tickers={sorted(self.tickers)}, periods={sorted(self.periods, key=str)})"
+
+class EntityRouter:
+    """
+    Detect the companies and quarters a query mentions
+
+    Company names and aliases are matched on word boundaries with
+    Aho-Corasick passes: multi-word names and --aliases in any case,
+    single-word names only as capitalized in the company name. Tickers must
+    be written in uppercase (or with a $ prefix, required for single letters
+    and for tickers that are also common words, such as AI or IT).
+    """
+
+    def __init__(self, companies: Dict[str, Iterable[str]], aliases: Optional[Dict[str, Iterable[str]]] = None):
+        """
+        Args:
+            companies: ticker -> names of the company
+            aliases: ticker -> extra names, matched in any case
+        """
+        self.tickers = set(companies)
+        names: Dict[str, Set[str]] = {}
+        exact: Dict[str, Set[str]] = {}
+        for ticker, company_names in companies.items():
+            for name in company_names:
+                for alias in company_aliases(name):
+                    (names if " " in alias else exact).setdefault(alias, set()).add(ticker)
+        for ticker, extra in (aliases or {}).items():
+            for alias in extra:
+                alias = " ".join(alias.split()).lower()
+                if alias:
+                    names.setdefault(alias, set()).add(ticker)
+        # A name shared by several companies is ambiguous; drop it unless it is the full name of all of them
+        self.names = {alias: tickers for alias, tickers in names.items() if len(tickers) == 1 or " " in alias}
+        self.exact_names = {alias: tickers for alias, tickers in exact.items() if len(tickers) == 1}
+        self.matcher = AhoCorasick(self.names)
+        self.exact_matcher = AhoCorasick(self.exact_names)
+
+    @classmethod
+    def from_metadata(cls, metadata: List[Dict], aliases: Optional[Dict[str, List[str]]] = None) -> "EntityRouter":
+        """Router over the companies in an index's metadata, plus extra aliases per ticker"""
+        companies: Dict[str, Set[str]] = {}
+        for entry in metadata:
+            ticker = entry.get("ticker")
+            if ticker:
+                companies.setdefault(ticker, set()).add(entry.get("company") or "")
+        return cls(companies, {ticker: extra for ticker, extra in (aliases or {}).items() if ticker in companies})
+
+    @staticmethod
+    def _find_words(matcher: AhoCorasick, text: str) -> Set[str]:
+        """Tickers of the keys found in text as whole words"""
+        found = set()
+        for start, end, tickers in matcher.find(text):
+            before = text[start - 1] if start > 0 else " "
+            after = text[end] if end < len(text) else " "
+            if not before.isalnum() and not after.isalnum():
+                found.update(tickers)
+        return found
+
+    def entities(self, query: str) -> Set[str]:
+        """Tickers of the companies mentioned in the query"""
+        found = self._find_words(self.matcher, query.lower()) | self._find_words(self.exact_matcher, query)
+        for dollar, token in _TICKER_TOKEN.findall(query):
+            if token in self.tickers and (dollar or (len(token) > 1 and token not in AMBIGUOUS_TICKERS)):
+                found.add(token)
+        return found
+
+    @staticmethod
+    def periods(query: str) -> Set[Tuple[Optional[int], Optional[int]]]:
+        """(year, quarter) pairs mentioned in the query; a bare year or quarter leaves the other None"""
+        text = query.lower()
+        periods = set()
+        spans = []
+        for match in _YEAR_QUARTER.finditer(text):
+            periods.add((int(match.group(1)), int(match.group(2))))
+            spans.append(match.span())
+        for match in _QUARTER_YEAR.finditer(text):
+            if any(s <= match.start() < e for s, e in spans):
+                continue
+            year = match.group(2)
+            year = (2000 + int(year) if len(year) == 2 else int(year)) if year else None
+            periods.add((year, int(match.group(1))))
+            spans.append(match.span())
+        for match in _ORDINAL_QUARTER.finditer(text):
+            periods.add((int(match.group(2)) if match.group(2) else None, _ORDINALS[match.group(1)]))
+            spans.append(match.span())
+        for match in _YEAR.finditer(text):
+            if not any(s <= match.start() < e for s, e in spans):
+                periods.add((int(match.group(1)), None))
+        return periods
+
+    def route(self, query: str) -> Route:
+        return Route(self.entities(query), self.periods(query))
+
+class RowIndex:
+    """
+    Index rows per ticker and per period, for turning a route into a search subset
+
+    Subsets are cached per route so repeated routes reuse one array, which
+    also lets a batch group queries that share a subset.
+    """
+
+    def __init__(self, metadata: List[Dict]):
+        import numpy as np
+
+        tickers: Dict[str, List[int]] = {}
+        periods: Dict[Tuple[int, int], List[int]] = {}
+        for row, entry in enumerate(metadata):
+            tickers.setdefault(entry.get("ticker"), []).append(row)
+            try:
+                periods.setdefault((int(entry["year"]), int(entry["q"])), []).append(row)
+            except (KeyError, TypeError, ValueError):
+                pass
+        self.tickers = {ticker: np.array(rows, dtype=np.int64) for ticker, rows in tickers.items()}
+        self.periods = {period: np.array(rows, dtype=np.int64) for period, rows in periods.items()}
+        self.cache: Dict[Tuple, Optional["np.ndarray"]] = {}
+
+    def _period_rows(self, periods: FrozenSet) -> Optional["np.ndarray"]:
+        import numpy as np
+
+        matching = [
+            rows for (year, q), rows in self.periods.items()
+            if any((y is None or y == year) and (p is None or p == q) for y, p in periods)
+        ]
+        return np.unique(np.concatenate(matching)) if matching else None
+
+    def rows(self, route: Route) -> Optional["np.ndarray"]:
+        """
+        Sorted rows matching the route, or None to search everything
+
+        A period filter that matches none of the company's rows is dropped
+        rather than returning nothing, and an unknown entity means no filter.
+        """
+        import numpy as np
+
+        if route.key in self.cache:
+            return self.cache[route.key]
+        rows = None
+        ticker_rows = [self.tickers[t] for t in route.tickers if t in self.tickers]
+        if ticker_rows:
+            rows = np.unique(np.concatenate(ticker_rows))
+        if route.periods:
+            period_rows = self._period_rows(route.periods)
+            if period_rows is not None:
+                narrowed = period_rows if rows is None else np.intersect1d(rows, period_rows, assume_unique=True)
+                if len(narrowed):
+                    rows = narrowed
+        if len(self.cache) > 4096:
+            self.cache.clear()
+        self.cache[route.key] = rows
+        return rows
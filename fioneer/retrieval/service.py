@@ -0,0 +1,221 @@
+import argparse
+import asyncio
+from collections import deque
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from pydantic import BaseModel, Field
+from fioneer import serialization
+from fioneer.embeddings.hedging import HedgingPolicy
+from fioneer.llm.answer import stream_answer
+from fioneer.metrics import REGISTRY, histogram
+from fioneer.retrieval.faiss_retriever import FaissRetriever
+
+BATCH_SIZE = histogram("retrieval_batch_size", "Queries per micro-batch", buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256))
+
+class QueryBatcher:
+    """
+    Coalesce concurrent queries into micro-batches
+
+    The first query of a batch opens a short window; every query that arrives
+    before it closes (or until max_batch_size) shares one embedding call and
+    one index search.
+    """
+
+    def __init__(self, retriever: FaissRetriever, window_ms: float = 5.0, max_batch_size: int = 64):
+        self.retriever = retriever
+        self.window = window_ms / 1000
+        self.max_batch_size = max_batch_size
+        self.queue: asyncio.Queue = None
+        self.worker: asyncio.Task = None
+        self.batch_sizes = deque(maxlen=1000)
+        self.pending = set()
+
+    def start(self) -> None:
+        self.queue = asyncio.Queue()
+        self.worker = asyncio.create_task(self._collect())
+
+    async def stop(self) -> None:
+        if self.worker:
+            self.worker.cancel()
+            try:
+                await self.worker
+            except asyncio.CancelledError:
+                pass
+
+    async def search(self, query: str, k: int = 5) -> List[Dict[str, Any]]:
+        """Queue a query and wait for the result of its batch"""
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((query, k, future))
+        return await future
+
+    async def _collect(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.window
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            # Process in the background so the next window starts collecting immediately
+            task = asyncio.create_task(self._process(batch))
+            self.pending.add(task)
+            task.add_done_callback(self.pending.discard)
+
+    async def _process(self, batch: List[Tuple[str, int, asyncio.Future]]) -> None:
+        self.batch_sizes.append(len(batch))
+        BATCH_SIZE.observe(len(batch))
+        queries = [query for query, _, _ in batch]
+        max_k = max(k for _, k, _ in batch)
+        try:
+            results = await self.retriever.search_batch(queries, max_k)
+        except Exception as e:
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, k, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result[:k])
+
+class SearchRequest(BaseModel):
+    query: str = Field(..., min_length=1)
+    k: int = Field(5, ge=1, le=100)
+
+def create_app(
+    index_dir: Path = Path("data/index"),
+    window_ms: float = 5.0,
+    max_batch_size: int = 64,
+    retriever: FaissRetriever = None,
+    search_threads: int = 1,
+    omp_threads: int = None,
+    hedge_percentile: float = None,
+    route_entities: bool = False,
+    aliases: Dict[str, List[str]] = None,
+    reload_interval: float = 10.0,
+    embedding_workers: int = 1,
+) -> FastAPI:
+    """Create the retrieval service; the index is loaded in the background at startup"""
+    hedging = HedgingPolicy(percentile=hedge_percentile) if hedge_percentile else None
+    retriever = retriever or FaissRetriever(
+        search_threads=search_threads,
+        omp_threads=omp_threads,
+        hedging=hedging,
+        routing=route_entities,
+        aliases=aliases,
+        embedding_workers=embedding_workers,
+    )
+    batcher = QueryBatcher(retriever, window_ms=window_ms, max_batch_size=max_batch_size)
+
+    async def load_index():
+        try:
+            await asyncio.to_thread(retriever.load_index, Path(index_dir))
+        except Exception as e:
+            print(f"Error loading index from {index_dir}: {e}")
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        batcher.start()
+        loader = None
+        if retriever.index is None:
+            loader = asyncio.create_task(load_index())
+        watcher = None
+        if reload_interval:
+            watcher = asyncio.create_task(retriever.watch_index(Path(index_dir), reload_interval))
+        yield
+        for task in (loader, watcher):
+            if task:
+                task.cancel()
+        await batcher.stop()
+
+    app = FastAPI(title="fioneer retrieval", lifespan=lifespan)
+    app.state.retriever = retriever
+    app.state.batcher = batcher
+
+    @app.get("/health")
+    async def health():
+        """Liveness: the process is up and serving requests"""
+        return {"status": "ok"}
+
+    @app.get("/ready")
+    async def ready():
+        """Readiness: the index is loaded and queries can be answered"""
+        if retriever.index is None:
+            return JSONResponse({"status": "loading"}, status_code=503)
+        status = {"status": "ready", "vectors": retriever.index.ntotal}
+        if retriever.version:
+            status["version"] = retriever.version
+        return status
+
+    @app.get("/metrics")
+    async def metrics():
+        """Prometheus scrape endpoint"""
+        return PlainTextResponse(REGISTRY.to_prometheus(), media_type="text/plain; version=0.0.4")
+
+    @app.post("/search")
+    async def search(request: SearchRequest):
+        if retriever.index is None:
+            return JSONResponse({"detail": "Index is not loaded yet"}, status_code=503)
+        results = await batcher.search(request.query, request.k)
+        return {"query": request.query, "results": results}
+
+    @app.post("/answer")
+    async def answer(request: SearchRequest):
+        """Stream an LLM answer grounded in the top-k results as plain text"""
+        if retriever.index is None:
+            return JSONResponse({"detail": "Index is not loaded yet"}, status_code=503)
+        results = await batcher.search(request.query, request.k)
+        # Starlette cancels the generator when the client disconnects, which closes the upstream stream
+        return StreamingResponse(stream_answer(request.query, results), media_type="text/plain; charset=utf-8")
+
+    return app
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Serve FAISS retrieval over HTTP")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--index-dir", type=Path, default=Path("data/index"))
+    parser.add_argument("--window-ms", type=float, default=5.0,
+                        help="How long to collect concurrent queries into one batch")
+    parser.add_argument("--max-batch-size", type=int, default=64)
+    parser.add_argument("--search-threads", type=int, default=1,
+                        help="Threads running index searches off the event loop")
+    parser.add_argument("--omp-threads", type=int, default=None,
+                        help="OpenMP threads per search; with several workers, keep workers x threads <= cores")
+    parser.add_argument("--hedge-percentile", type=float, default=None,
+                        help="Send a backup query embedding call once the first exceeds this latency percentile (e.g. 95)")
+    parser.add_argument("--route-entities", action="store_true",
+                        help="Search only the companies and quarters a query names")
+    parser.add_argument("--aliases", type=Path, default=None,
+                        help='JSON file of extra company names per ticker, e.g. {"GOOGL": ["Google"]}')
+    parser.add_argument("--reload-interval", type=float, default=10.0,
+                        help="Seconds between checks for a newly published index version (0 disables reloading)")
+    parser.add_argument("--embedding-workers", type=int, default=1,
+                        help="Inference threads when the index uses a local embedding model")
+    args = parser.parse_args()
+
+    app = create_app(
+        args.index_dir,
+        window_ms=args.window_ms,
+        max_batch_size=args.max_batch_size,
+        search_threads=args.search_threads,
+        omp_threads=args.omp_threads,
+        hedge_percentile=args.hedge_percentile,
+        route_entities=args.route_entities,
+        aliases=serialization.load(args.aliases) if args.aliases else None,
+        reload_interval=args.reload_interval,
+        embedding_workers=args.embedding_workers,
+    )
+    uvicorn.run(app, host=args.host, port=args.port)
+
+if __name__ == "__main__":
+    main()
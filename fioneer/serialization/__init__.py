@@ -0,0 +1,11 @@
+from .codecs import FORMATS, atomic_write, dumps, format_of, load, loads, save
+
+__all__ = [
+    "FORMATS",
+    "atomic_write",
+    "dumps",
+    "format_of",
+    "load",
+    "loads",
+    "save",
+]
@@ -0,0 +1,109 @@
+import gc
+import gzip
+import json
+import os
+import tempfile
+from pathlib import Path
+from typing import Any
+
+# Format name -> file suffix. JSON stays the default so files remain readable;
+# msgpack is smaller and faster to parse, and either can be gzip-compressed.
+FORMATS = {
+    "json": ".json",
+    "json.gz": ".json.gz",
+    "msgpack": ".msgpack",
+    "msgpack.gz": ".msgpack.gz",
+}
+
+def format_of(path: Path) -> str:
+    """Serialization format implied by a file name, e.g. data.msgpack.gz -> msgpack.gz"""
+    name = Path(path).name
+    for fmt, suffix in sorted(FORMATS.items(), key=lambda item: -len(item[1])):
+        if name.endswith(suffix):
+            return fmt
+    raise ValueError(f"Unknown serialization format for {name}; expected one of {', '.join(FORMATS.values())}")
+
+def _msgpack():
+    try:
+        import msgpack
+    except ImportError:
+        raise ImportError("msgpack formats need the msgpack package: pip install msgpack") from None
+    return msgpack
+
+def dumps(obj: Any, fmt: str = "json", indent: bool = True) -> bytes:
+    """
+    Serialize obj; JSON uses orjson when it is installed
+
+    Either way non-string keys are written as strings. NaN is written as
+    null by orjson and as NaN by the json module; loads() reads both.
+    """
+    base = fmt[:-3] if fmt.endswith(".gz") else fmt
+    if base == "msgpack":
+        data = _msgpack().packb(obj, use_bin_type=True)
+    elif base == "json":
+        try:
+            import orjson
+            option = orjson.OPT_NON_STR_KEYS | (orjson.OPT_INDENT_2 if indent else 0)
+            data = orjson.dumps(obj, option=option)
+        except ImportError:
+            data = json.dumps(obj, indent=2 if indent else None, ensure_ascii=False).encode("utf-8")
+    else:
+        raise ValueError(f"Unknown serialization format: {fmt}")
+    return gzip.compress(data, compresslevel=1) if fmt.endswith(".gz") else data
+
+def _decode(data: bytes, fmt: str) -> Any:
+    if fmt == "msgpack":
+        return _msgpack().unpackb(data, raw=False)
+    if fmt == "json":
+        try:
+            import orjson
+        except ImportError:
+            return json.loads(data)
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            # NaN and Infinity, written by the json module, are not valid JSON for orjson
+            return json.loads(data)
+    raise ValueError(f"Unknown serialization format: {fmt}")
+
+def loads(data: bytes, fmt: str = "json") -> Any:
+    """Inverse of dumps"""
+    if fmt.endswith(".gz"):
+        data = gzip.decompress(data)
+        fmt = fmt[:-3]
+    # Decoding allocates millions of objects that cannot form cycles; pausing
+    # the cyclic collector avoids repeated full passes over them
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        return _decode(data, fmt)
+    finally:
+        if enabled:
+            gc.enable()
+
+def atomic_write(path: Path, data: bytes) -> None:
+    """Write via a temp file and rename so readers never see a partial file"""
+    path = Path(path)
+    # A unique temp name per write, so concurrent writers of one path never share a temp file
+    f = tempfile.NamedTemporaryFile(dir=path.parent, prefix=path.name + ".", suffix=".tmp", delete=False)
+    try:
+        with f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        # Temp files are created owner-only; published files must stay readable by serving processes
+        os.chmod(f.name, 0o644)
+        os.replace(f.name, path)
+    except BaseException:
+        Path(f.name).unlink(missing_ok=True)
+        raise
+
+def load(path: Path) -> Any:
+    """Load a file in the format given by its suffix"""
+    with open(path, "rb") as f:
+        return loads(f.read(), format_of(path))
+
+def save(obj: Any, path: Path, indent: bool = True) -> Path:
+    """Atomically save obj in the format given by the path's suffix"""
+    atomic_write(path, dumps(obj, format_of(path), indent=indent))
+    return Path(path)
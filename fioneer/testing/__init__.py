@@ -0,0 +1,3 @@
+from .mock_openai import MockOpenAIServer
+
+__all__ = ["MockOpenAIServer"]
@@ -0,0 +1,324 @@
+"""
+Local stand-in for the OpenAI chat completions and embeddings endpoints
+
+Responses are deterministic functions of the request, so pipeline runs and
+benchmarks are reproducible without API keys or spend. Latency, rate limits
+and error rates are configurable to exercise the client-side behaviour.
+"""
+import argparse
+import base64
+import hashlib
+import json
+import random
+import re
+import socket
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token)"""
+    return max(1, len(text) // 4)
+
+def mock_embedding(text: str, dimension: int) -> np.ndarray:
+    """Deterministic unit vector seeded by the text"""
+    seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+    vector = np.random.default_rng(seed).standard_normal(dimension).astype(np.float32)
+    return vector / np.linalg.norm(vector)
+
+def _sentences(text: str, count: int) -> List[str]:
+    sentences = [s.strip() for s in re.split(r"(?<=[.!?])\s+", text) if s.strip()]
+    return sentences[:count] or [text.strip()[:200]]
+
+def mock_chat_content(messages: List[Dict]) -> str:
+    """Deterministic reply shaped like what the extraction prompts ask for"""
+    system = " ".join(m["content"] for m in messages if m["role"] == "system")
+    user = "\n".join(m["content"] for m in messages if m["role"] == "user")
+
+    if "qa_pairs" in system:
+        turns = []
+        for line in user.splitlines():
+            speaker, _, content = line.partition(":")
+            if content and speaker.strip() != "Operator":
+                turns.append((speaker.strip(), content.strip()))
+        if len(turns) < 2:
+            return "NO_QA"
+        (q_speaker, question), (a_speaker, answer) = turns[0], turns[1]
+        return json.dumps({"qa_pairs": [{
+            "question": question,
+            "answer": answer,
+            "q_speaker": q_speaker,
+            "a_speaker": a_speaker,
+        }]})
+
+    if "reasoning_steps" in system:
+        answer = user.split("Answer:", 1)[-1]
+        steps = [f"{i}. {sentence}" for i, sentence in enumerate(_sentences(answer, 3), 1)]
+        return json.dumps({"reasoning_steps": steps, "insight": _sentences(answer, 1)[0]})
+
+    return " ".join(_sentences(user, 2))
+
+class RateLimiter:
+    """Sliding window (one minute by default) over requests and tokens"""
+
+    def __init__(self, rpm: Optional[int], tpm: Optional[int], window_seconds: float = 60.0):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.window = window_seconds
+        self.events = deque()
+        self.lock = threading.Lock()
+
+    def check(self, tokens: int) -> Tuple[bool, Dict[str, str]]:
+        """Record a request if it fits in the window; return (allowed, rate-limit headers)"""
+        with self.lock:
+            now = time.monotonic()
+            while self.events and now - self.events[0][0] >= self.window:
+                self.events.popleft()
+            used_requests = len(self.events)
+            used_tokens = sum(t for _, t in self.events)
+            allowed = (
+                (self.rpm is None or used_requests + 1 <= self.rpm)
+                and (self.tpm is None or used_tokens + tokens <= self.tpm)
+            )
+            if allowed:
+                self.events.append((now, tokens))
+                used_requests += 1
+                used_tokens += tokens
+            reset = f"{self.window - (now - self.events[0][0]):.3f}s" if self.events else "0s"
+
+        headers = {}
+        if self.rpm is not None:
+            headers["x-ratelimit-limit-requests"] = str(self.rpm)
+            headers["x-ratelimit-remaining-requests"] = str(max(0, self.rpm - used_requests))
+            headers["x-ratelimit-reset-requests"] = reset
+        if self.tpm is not None:
+            headers["x-ratelimit-limit-tokens"] = str(self.tpm)
+            headers["x-ratelimit-remaining-tokens"] = str(max(0, self.tpm - used_tokens))
+            headers["x-ratelimit-reset-tokens"] = reset
+        if not allowed:
+            headers["retry-after"] = reset.rstrip("s")
+        return allowed, headers
+
+class MockOpenAIServer:
+    """Threaded HTTP server speaking enough of the OpenAI API for this project"""
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency_ms: float = 0.0,
+        latency_jitter_ms: float = 0.0,
+        rpm_limit: Optional[int] = None,
+        tpm_limit: Optional[int] = None,
+        error_rate: float = 0.0,
+        embedding_dimension: int = 1536,
+        stream_token_interval_ms: float = 0.0,
+        rate_limit_window_seconds: float = 60.0,
+        seed: int = 0,
+    ):
+        self.latency_ms = latency_ms
+        self.latency_jitter_ms = latency_jitter_ms
+        self.stream_token_interval = stream_token_interval_ms / 1000
+        self.error_rate = error_rate
+        self.embedding_dimension = embedding_dimension
+        self.rate_limiter = RateLimiter(rpm_limit, tpm_limit, rate_limit_window_seconds)
+        self.random = random.Random(seed)
+        self.random_lock = threading.Lock()
+        self.stats = {"requests": 0, "chat": 0, "embeddings": 0, "rate_limited": 0, "errors": 0}
+        self.stats_lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self.httpd.daemon_threads = True
+        self.thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self) -> "MockOpenAIServer":
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self) -> "MockOpenAIServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def _count(self, key: str) -> None:
+        with self.stats_lock:
+            self.stats[key] += 1
+
+    def _simulate(self) -> Tuple[float, bool]:
+        """Draw a latency and whether this request fails"""
+        with self.random_lock:
+            jitter = self.random.uniform(-self.latency_jitter_ms, self.latency_jitter_ms)
+            failed = self.random.random() < self.error_rate
+        return max(0.0, self.latency_ms + jitter) / 1000, failed
+
+    def handle(self, path: str, body: Dict) -> Tuple[int, Dict, Dict[str, str]]:
+        """Return (status, JSON payload, extra headers) for a request"""
+        self._count("requests")
+        if path.endswith("/chat/completions"):
+            self._count("chat")
+            prompt_tokens = sum(estimate_tokens(m.get("content") or "") for m in body.get("messages", []))
+        elif path.endswith("/embeddings"):
+            self._count("embeddings")
+            inputs = body.get("input", [])
+            inputs = [inputs] if isinstance(inputs, str) else inputs
+            prompt_tokens = sum(estimate_tokens(text) for text in inputs)
+        else:
+            return 404, {"error": {"message": f"Unknown path {path}", "type": "invalid_request_error"}}, {}
+
+        allowed, headers = self.rate_limiter.check(prompt_tokens)
+        if not allowed:
+            self._count("rate_limited")
+            return 429, {"error": {
+                "message": "Rate limit reached",
+                "type": "requests",
+                "code": "rate_limit_exceeded",
+            }}, headers
+
+        latency, failed = self._simulate()
+        time.sleep(latency)
+        if failed:
+            self._count("errors")
+            return 500, {"error": {"message": "Injected server error", "type": "server_error"}}, headers
+
+        model = body.get("model", "mock")
+        if path.endswith("/chat/completions"):
+            content = mock_chat_content(body.get("messages", []))
+            completion_tokens = estimate_tokens(content)
+            return 200, {
+                "id": f"chatcmpl-mock-{self.stats['requests']}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": content},
+                    "finish_reason": "stop",
+                }],
+                "usage": {
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": completion_tokens,
+                    "total_tokens": prompt_tokens + completion_tokens,
+                },
+            }, headers
+
+        data = []
+        for i, text in enumerate(inputs):
+            vector = mock_embedding(text, self.embedding_dimension)
+            if body.get("encoding_format") == "base64":
+                embedding = base64.b64encode(vector.astype("<f4").tobytes()).decode("ascii")
+            else:
+                embedding = vector.tolist()
+            data.append({"object": "embedding", "index": i, "embedding": embedding})
+        return 200, {
+            "object": "list",
+            "data": data,
+            "model": model,
+            "usage": {"prompt_tokens": prompt_tokens, "total_tokens": prompt_tokens},
+        }, headers
+
+    def stream_events(self, payload: Dict, include_usage: bool):
+        """Split a chat completion into server-sent event chunks, one per word"""
+        content = payload["choices"][0]["message"]["content"]
+        words = re.findall(r"\S+\s*", content) or [""]
+        base = {key: payload[key] for key in ("id", "created", "model")}
+        base["object"] = "chat.completion.chunk"
+        for i, word in enumerate(words):
+            delta = {"content": word}
+            if i == 0:
+                delta["role"] = "assistant"
+            yield {**base, "choices": [{"index": 0, "delta": delta, "finish_reason": None}]}
+        yield {**base, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]}
+        if include_usage:
+            yield {**base, "choices": [], "usage": payload["usage"]}
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def setup(self):
+                super().setup()
+                # Headers and body go out in separate writes; with Nagle's algorithm the body
+                # waits for the client's delayed ACK, adding ~40 ms to every keep-alive request
+                self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                body = json.loads(self.rfile.read(length) or b"{}")
+                status, payload, headers = server.handle(self.path, body)
+                if status == 200 and body.get("stream"):
+                    self._send_stream(payload, headers, body)
+                    return
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _send_stream(self, payload, headers, body):
+                include_usage = (body.get("stream_options") or {}).get("include_usage", False)
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Connection", "close")
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.close_connection = True
+                try:
+                    for i, event in enumerate(server.stream_events(payload, include_usage)):
+                        if i and server.stream_token_interval:
+                            time.sleep(server.stream_token_interval)
+                        self.wfile.write(f"data: {json.dumps(event)}\n\n".encode("utf-8"))
+                        self.wfile.flush()
+                    self.wfile.write(b"data: [DONE]\n\n")
+                    self.wfile.flush()
+                except (BrokenPipeError, ConnectionResetError):
+                    # Client went away mid-stream
+                    pass
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a local mock of the OpenAI API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--latency-jitter-ms", type=float, default=0.0)
+    parser.add_argument("--rpm-limit", type=int, default=None)
+    parser.add_argument("--tpm-limit", type=int, default=None)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--embedding-dimension", type=int, default=1536)
+    parser.add_argument("--stream-token-interval-ms", type=float, default=0.0)
+    parser.add_argument("--rate-limit-window-seconds", type=float, default=60.0,
+                        help="Shorten the rate-limit window to exercise 429 handling quickly")
+    args = parser.parse_args()
+
+    server = MockOpenAIServer(**vars(args))
+    print(f"Mock OpenAI API listening on {server.base_url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
+
+if __name__ == "__main__":
+    main()
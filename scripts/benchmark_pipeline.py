@@ -0,0 +1,158 @@
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import tempfile
+import time
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from fioneer.metrics import REGISTRY
+from fioneer.testing import MockOpenAIServer
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+def write_synthetic_corpus(workspace: Path, n_transcripts: int, n_questions: int) -> None:
+    """Create transcripts, company info and earnings dates for the extractor"""
+    processed_dir = workspace / "data/processed"
+    transcripts_dir = processed_dir / "transcripts"
+    transcripts_dir.mkdir(parents=True)
+
+    company_info = pd.read_csv(REPO_ROOT / "data/processed/company_info.csv")
+    company_info.to_csv(processed_dir / "company_info.csv", index=False)
+
+    earnings_dates = {}
+    tickers = company_info["Ticker"].tolist()
+    for i in range(n_transcripts):
+        ticker = tickers[i // 4 % len(tickers)]
+        quarter = i % 4 + 1
+        key = f"{ticker.lower()}_2024_Q{quarter}"
+        earnings_dates[key] = f"2024-{quarter * 3:02d}-15"
+
+        rows = [{"speaker": "Operator", "content": "Good day and welcome to the earnings call."},
+                {"speaker": "Chief Executive", "content": f"{ticker} delivered record revenue this quarter."}]
+        for q in range(n_questions):
+            rows += [
+                {"speaker": "Operator", "content": f"Our next question comes from Analyst {q}."},
+                {"speaker": f"Analyst {q}", "content": f"How should we think about {ticker} margins and demand in segment {q}?"},
+                {"speaker": "Chief Financial Officer", "content": (
+                    f"Demand in segment {q} grew {q + 3}% year over year. "
+                    f"Gross margin expanded by {q % 5 + 1} points on pricing and mix. "
+                    "We expect similar trends next quarter."
+                )},
+            ]
+        pd.DataFrame(rows).to_csv(transcripts_dir / f"{key}.csv", index=False)
+
+    with open(processed_dir / "earnings_dates.json", "w") as f:
+        json.dump(earnings_dates, f, indent=4)
+
+def report(stage: str, seconds: float, items: int, unit: str) -> dict:
+    print(f"{stage:<12}{seconds:>10.2f}s{items:>10} {unit:<10}{items / seconds if seconds else 0:>10.1f}/s"
+          f"{1000 * seconds / items if items else 0:>12.1f} ms/item")
+    return {"stage": stage, "seconds": seconds, "items": items, "unit": unit}
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the full pipeline offline against a mock OpenAI API")
+    parser.add_argument("--transcripts", type=int, default=8)
+    parser.add_argument("--questions", type=int, default=10, help="Q&A sections per transcript")
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    parser.add_argument("--latency-jitter-ms", type=float, default=20.0)
+    parser.add_argument("--rpm-limit", type=int, default=None)
+    parser.add_argument("--tpm-limit", type=int, default=None)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--embedding-dimension", type=int, default=1536)
+    parser.add_argument("--index-type", default="flat")
+    parser.add_argument("--shards", type=int, default=1)
+    parser.add_argument("--partition", default="hash")
+    parser.add_argument("--stream", action="store_true",
+                        help="Overlap extraction, embedding and indexing instead of running them one after another")
+    parser.add_argument("--keep", action="store_true", help="Keep the temporary workspace")
+    parser.add_argument("--output", type=Path, help="Write the stage summary as JSON")
+    args = parser.parse_args()
+
+    server = MockOpenAIServer(
+        latency_ms=args.latency_ms,
+        latency_jitter_ms=args.latency_jitter_ms,
+        rpm_limit=args.rpm_limit,
+        tpm_limit=args.tpm_limit,
+        error_rate=args.error_rate,
+        embedding_dimension=args.embedding_dimension,
+    ).start()
+
+    # Point every client at the mock before anything creates one
+    os.environ["OPENAI_BASE_URL"] = server.base_url
+    for key in ("OPENAI_API_KEY", "NINJA_API_KEY", "HF_WRITE_TOKEN", "HF_READ_TOKEN"):
+        os.environ.setdefault(key, "mock")
+
+    from metadata_extractor import MetadataExtractor
+    from create_index import load_metadata_and_embeddings, publish_index
+    from stream_pipeline import run_streaming
+    from fioneer.embeddings.vectorizer import generate_and_save_embeddings
+    from fioneer.retrieval.faiss_retriever import FaissRetriever
+
+    workspace = Path(tempfile.mkdtemp(prefix="fioneer-bench-"))
+    cwd = os.getcwd()
+    results = []
+    try:
+        write_synthetic_corpus(workspace, args.transcripts, args.questions)
+        os.chdir(workspace)
+        print(f"Workspace: {workspace}")
+        print(f"Mock API: {server.base_url}\n")
+        print(f"{'stage':<12}{'wall':>11}{'items':>10} {'':<10}{'throughput':>12}{'latency':>15}")
+
+        if args.stream:
+            start = time.perf_counter()
+            indexed = asyncio.run(run_streaming())
+            results.append(report("stream", time.perf_counter() - start, indexed, "files"))
+        else:
+            start = time.perf_counter()
+            entries = asyncio.run(MetadataExtractor().extract_metadata())
+            results.append(report("metadata", time.perf_counter() - start, entries, "entries"))
+
+            start = time.perf_counter()
+            asyncio.run(generate_and_save_embeddings())
+            metadata, embeddings = load_metadata_and_embeddings(Path("data/processed/metadata"), Path("data/embeddings"))
+            results.append(report("embeddings", time.perf_counter() - start, len(embeddings), "vectors"))
+
+            start = time.perf_counter()
+            publish_index(
+                embeddings, metadata, Path("data/index"),
+                index_type=args.index_type,
+                n_shards=args.shards,
+                partition=args.partition,
+            )
+            results.append(report("index", time.perf_counter() - start, len(embeddings), "vectors"))
+
+        retriever = FaissRetriever()
+        retriever.load_index(Path("data/index"))
+        queries = [f"What did {m['ticker']} say about margins?" for m in retriever.metadata[:args.queries]]
+
+        async def run_queries():
+            latencies = []
+            for query in queries:
+                query_start = time.perf_counter()
+                await retriever.search_similar(query, k=5)
+                latencies.append(time.perf_counter() - query_start)
+            return latencies
+
+        start = time.perf_counter()
+        latencies = asyncio.run(run_queries())
+        results.append(report("query", time.perf_counter() - start, len(latencies), "queries"))
+        if latencies:
+            p50, p95, p99 = np.percentile(np.array(latencies) * 1000, [50, 95, 99])
+            print(f"\nquery latency p50 {p50:.1f} ms, p95 {p95:.1f} ms, p99 {p99:.1f} ms")
+    finally:
+        os.chdir(cwd)
+        server.stop()
+        if not args.keep:
+            shutil.rmtree(workspace, ignore_errors=True)
+
+    print(f"mock API calls: {server.stats}")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"stages": results, "mock_api": server.stats, "metrics": REGISTRY.summary()}, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -1,68 +1,461 @@
 import faiss
 import numpy as np
 from pathlib import Path
-import json
-from typing import List, Dict
+import argparse
+import zlib
+from typing import List, Dict, Optional, Tuple
+from fioneer.embeddings.backends import OpenAIBackend
+from fioneer.embeddings.store import EmbeddingStore
+from fioneer.hub.manifest import file_sha256
+from fioneer.metrics import histogram, profile_memory, timer, write_run_summary
+from fioneer import serialization
+from fioneer.retrieval.aggregates import AGGREGATES_FILE, QUARTERS_INDEX, TICKERS_INDEX, GroupSums, save_aggregates
+from fioneer.retrieval.bundles import bundle_dir, publish_bundle
+
+BUILD_SECONDS = histogram("index_build_seconds", "Time spent in each index build step")
+
+# Supported index types: exact float32, or FAISS scalar quantizers
+INDEX_TYPES = {
+    "flat": None,
+    "sq16": faiss.ScalarQuantizer.QT_fp16,
+    "sq8": faiss.ScalarQuantizer.QT_8bit,
+}
+
+# Learned transforms for --reduce-dim: PCA, or OPQ (rotation tuned for quantization, then projection)
+TRANSFORMS = ("pca", "opq")
+
+# Shard assignment keys: "hash" spreads calls evenly, sector/year keep groups together
+PARTITIONS = {
+    "hash": lambda entry: f"{entry['ticker']}_{entry['year']}_Q{entry['q']}",
+    "sector": lambda entry: entry.get("sector") or "Unknown",
+    "year": lambda entry: str(entry["year"]),
+}
 
 def load_metadata_and_embeddings(metadata_dir: Path, embeddings_dir: Path):
     """Load metadata and embeddings"""
     all_metadata = []
-    all_embeddings = []
-    
-    # Process all metadata files
+    sources = []
+    store = EmbeddingStore(embeddings_dir)
+
+    # Process all metadata files that have embeddings in the store
     for metadata_file in sorted(metadata_dir.glob("*.json")):
+        if metadata_file.stem not in store:
+            continue
+        # Embeddings of an older version of the file would pair vectors with the wrong entries
+        if store.content_hash(metadata_file.stem) != file_sha256(metadata_file):
+            print(f"Warning: skipping {metadata_file.name}: its embeddings are out of date; re-run the vectorizer")
+            continue
+
         # Load metadata
-        with open(metadata_file, "r") as f:
-            metadata = json.load(f)
-            all_metadata.extend(metadata)
-        
-        # Find corresponding embedding file
-        embedding_file = embeddings_dir / f"{metadata_file.stem}.npy"
-        if embedding_file.exists():
-            embeddings = np.load(str(embedding_file))
-            all_embeddings.append(embeddings)
-    
-    # Combine all embeddings
-    final_embeddings = np.vstack(all_embeddings)
+        metadata = serialization.load(metadata_file)
+        if len(metadata) != store.row_count(metadata_file.stem):
+            print(f"Warning: skipping {metadata_file.name}: {len(metadata)} entries but "
+                  f"{store.row_count(metadata_file.stem)} embeddings")
+            continue
+        all_metadata.extend(metadata)
+        sources.append(metadata_file.stem)
+
+    # Combine all embeddings, read straight from the memory-mapped shards
+    final_embeddings = store.load(sources)
+    if len(all_metadata) != len(final_embeddings):
+        raise ValueError(f"{len(all_metadata)} metadata entries but {len(final_embeddings)} embeddings")
     return all_metadata, final_embeddings
 
-def create_and_save_index(embeddings: np.ndarray, metadata: List[Dict], output_dir: Path):
-    """Create and save FAISS index"""
-    # Check embedding dimension
-    dimension = embeddings.shape[1]
-    
-    # Create IndexFlatIP for L2 normalized inner product similarity
+def build_index(
+    embeddings: np.ndarray,
+    index_type: str = "flat",
+    reduce_dim: Optional[int] = None,
+    transform: str = "pca",
+) -> faiss.Index:
+    """Build an inner product index of the given type from normalized embeddings"""
+    index = train_index(embeddings, index_type, reduce_dim, transform)
+    index.add(embeddings)
+    return index
+
+def train_index(
+    embeddings: np.ndarray,
+    index_type: str = "flat",
+    reduce_dim: Optional[int] = None,
+    transform: str = "pca",
+) -> faiss.Index:
+    """
+    Create an empty inner product index, trained on the embeddings if it needs it
+
+    With reduce_dim, vectors pass through a learned PCA/OPQ projection to
+    that many dimensions before being stored, so the index is smaller and
+    faster to scan; the retriever reranks its candidates at full precision.
+    """
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unsupported index type: {index_type}")
+
+    dimension = reduce_dim or embeddings.shape[1]
+    if index_type == "flat":
+        # IndexFlatIP for L2 normalized inner product similarity
+        index = faiss.IndexFlatIP(dimension)
+    else:
+        index = faiss.IndexScalarQuantizer(dimension, INDEX_TYPES[index_type], faiss.METRIC_INNER_PRODUCT)
+
+    if reduce_dim:
+        index = faiss.IndexPreTransform(make_transform(embeddings.shape[1], reduce_dim, transform), index)
+    if not index.is_trained:
+        # Trains the transform first, then the quantizer on transformed vectors
+        index.train(embeddings)
+    return index
+
+def make_transform(dimension: int, reduce_dim: int, transform: str = "pca") -> faiss.VectorTransform:
+    """Untrained dimension-reducing transform"""
+    if transform not in TRANSFORMS:
+        raise ValueError(f"Unsupported transform: {transform}")
+    if not 0 < reduce_dim < dimension:
+        raise ValueError(f"reduce_dim must be between 1 and {dimension - 1}, got {reduce_dim}")
+    if transform == "opq":
+        # 8 dimensions per subquantizer; OPQ needs the output dimension to divide evenly
+        if reduce_dim % 8:
+            raise ValueError("OPQ needs reduce_dim to be a multiple of 8")
+        return faiss.OPQMatrix(dimension, reduce_dim // 8, reduce_dim)
+    return faiss.PCAMatrix(dimension, reduce_dim)
+
+def collapse_near_duplicates(
+    embeddings: np.ndarray,
+    metadata: List[Dict],
+    threshold: float,
+    batch_size: int = 1024,
+) -> Tuple[np.ndarray, List[Dict]]:
+    """
+    Keep one canonical vector per cluster of near-identical entries
+
+    Entries are visited in order; each unassigned entry becomes canonical and
+    claims every unassigned entry whose cosine similarity to it exceeds the
+    threshold (found with a FAISS range search over normalized embeddings).
+    Canonical metadata records its members under "duplicates".
+    """
+    n, dimension = embeddings.shape
     index = faiss.IndexFlatIP(dimension)
-    
+    index.add(embeddings)
+
+    canonical_of = np.full(n, -1, dtype=np.int64)
+    members = {}
+    for start in range(0, n, batch_size):
+        lims, similarities, neighbors = index.range_search(embeddings[start:start + batch_size], threshold)
+        for offset in range(min(batch_size, n - start)):
+            row = start + offset
+            if canonical_of[row] != -1:
+                continue
+            canonical_of[row] = row
+            cluster = []
+            for neighbor, similarity in zip(neighbors[lims[offset]:lims[offset + 1]], similarities[lims[offset]:lims[offset + 1]]):
+                if canonical_of[neighbor] == -1:
+                    canonical_of[neighbor] = row
+                    cluster.append((int(neighbor), float(similarity)))
+            members[row] = cluster
+
+    canonical_rows = np.flatnonzero(canonical_of == np.arange(n))
+    canonical_metadata = []
+    for row in canonical_rows:
+        entry = dict(metadata[row])
+        if members[row]:
+            entry["duplicates"] = [
+                {
+                    "ticker": metadata[member]["ticker"],
+                    "year": metadata[member]["year"],
+                    "q": metadata[member]["q"],
+                    "date": metadata[member]["date"],
+                    "question_summary": metadata[member]["question_summary"],
+                    "similarity": round(similarity, 4),
+                }
+                for member, similarity in sorted(members[row])
+            ]
+        canonical_metadata.append(entry)
+
+    return np.ascontiguousarray(embeddings[canonical_rows]), canonical_metadata
+
+def partition_rows(metadata: List[Dict], n_shards: int, partition: str = "hash") -> List[np.ndarray]:
+    """Assign metadata rows to shards; returns the global row ids of each shard"""
+    if partition not in PARTITIONS:
+        raise ValueError(f"Unsupported partition: {partition}")
+
+    key = PARTITIONS[partition]
+    if partition == "hash":
+        # crc32 is stable across processes, unlike hash()
+        assignment = [zlib.crc32(key(entry).encode("utf-8")) % n_shards for entry in metadata]
+    else:
+        # Whole groups go to the currently smallest shard, largest group first
+        groups: Dict[str, List[int]] = {}
+        for row, entry in enumerate(metadata):
+            groups.setdefault(key(entry), []).append(row)
+        sizes = [0] * n_shards
+        assignment = [0] * len(metadata)
+        for group in sorted(groups.values(), key=len, reverse=True):
+            shard = sizes.index(min(sizes))
+            sizes[shard] += len(group)
+            for row in group:
+                assignment[row] = shard
+
+    assignment = np.array(assignment, dtype=np.int64)
+    return [np.flatnonzero(assignment == shard) for shard in range(n_shards)]
+
+@profile_memory("create_index")
+def create_and_save_index(
+    embeddings: np.ndarray,
+    metadata: List[Dict],
+    output_dir: Path,
+    index_type: str = "flat",
+    dedup_threshold: Optional[float] = None,
+    n_shards: int = 1,
+    partition: str = "hash",
+    metadata_format: str = "json",
+    reduce_dim: Optional[int] = None,
+    transform: str = "pca",
+    rerank_factor: int = 4,
+    aggregates: bool = True,
+    embedding: Optional[Dict] = None,
+):
+    """
+    Create and save FAISS index, optionally split into shards
+
+    With reduce_dim the index stores projected vectors, and the normalized
+    full vectors are saved alongside as vectors.npy for reranking the
+    top k * rerank_factor candidates. With aggregates, centroid indexes per
+    ticker and per ticker-quarter are saved for peer and trend lookups.
+    embedding is the spec of the backend the embeddings came from; the
+    retriever embeds queries with the same backend.
+    """
+    embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+
     # Normalize embeddings
     faiss.normalize_L2(embeddings)
-    
-    # Add vectors to index
-    index.add(embeddings)
-    
+    source_embeddings, source_metadata = embeddings, metadata
+
+    # Collapse near-duplicate entries into one canonical vector each
+    source_count = len(metadata)
+    if dedup_threshold is not None:
+        embeddings, metadata = collapse_near_duplicates(embeddings, metadata, dedup_threshold)
+
     # Create output directory
     output_dir.mkdir(parents=True, exist_ok=True)
-    
-    # Save FAISS index
-    faiss.write_index(index, str(output_dir / "earnings.index"))
-    
-    # Save metadata
-    with open(output_dir / "metadata.json", "w") as f:
-        json.dump(metadata, f, indent=2)
+
+    # Centroids over every source entry, so duplicates still weigh in
+    aggregates_entry = None
+    if aggregates:
+        with timer(BUILD_SECONDS, step="aggregates"):
+            aggregates_entry = save_aggregates(source_embeddings, source_metadata, output_dir)
+    else:
+        for name in (AGGREGATES_FILE, TICKERS_INDEX, QUARTERS_INDEX):
+            if (output_dir / name).exists():
+                (output_dir / name).unlink()
+
+    shards = []
+    if n_shards > 1:
+        # Train once so every shard quantizes alike and scores stay comparable when merged
+        trained = train_index(embeddings, index_type, reduce_dim, transform)
+        # Each shard maps its vectors back to global metadata row ids
+        for shard, rows in enumerate(partition_rows(metadata, n_shards, partition)):
+            index = faiss.IndexIDMap(faiss.clone_index(trained))
+            index.add_with_ids(embeddings[rows], rows)
+            shard_file = f"shard-{shard:02d}.index"
+            faiss.write_index(index, str(output_dir / shard_file))
+            shards.append({"file": shard_file, "ntotal": int(index.ntotal)})
+    else:
+        # Build index of the requested type
+        index = build_index(embeddings, index_type, reduce_dim, transform)
+
+        # Save FAISS index
+        faiss.write_index(index, str(output_dir / "earnings.index"))
+
+    # Full-precision vectors for reranking, memory-mapped by the retriever
+    vectors_path = output_dir / "vectors.npy"
+    if reduce_dim:
+        np.save(vectors_path, embeddings)
+    elif vectors_path.exists():
+        vectors_path.unlink()
+
+    # Save metadata in the requested format, removing copies in other formats
+    metadata_file = save_index_metadata(metadata, output_dir, metadata_format)
+
+    # Save index manifest
+    manifest = {
+        "index_type": index_type,
+        "dimension": embeddings.shape[1],
+        "ntotal": len(metadata),
+        "source_entries": source_count,
+        "dedup_threshold": dedup_threshold,
+        "metadata_file": metadata_file,
+    }
+    if shards:
+        manifest["partition"] = partition
+        manifest["shards"] = shards
+    if reduce_dim:
+        manifest.update({
+            "reduce_dim": reduce_dim,
+            "transform": transform,
+            "vectors_file": vectors_path.name,
+            "rerank_factor": rerank_factor,
+        })
+    if aggregates_entry:
+        manifest["aggregates"] = aggregates_entry
+    if embedding:
+        manifest["embedding"] = embedding
+    serialization.save(manifest, output_dir / "manifest.json")
+
+def save_index_metadata(metadata: List[Dict], output_dir: Path, metadata_format: str = "json") -> str:
+    """Save index metadata as metadata.<format>; returns the file name for the manifest"""
+    if metadata_format not in serialization.FORMATS:
+        raise ValueError(f"Unsupported metadata format: {metadata_format}")
+    metadata_file = "metadata" + serialization.FORMATS[metadata_format]
+    serialization.save(metadata, output_dir / metadata_file)
+    for suffix in serialization.FORMATS.values():
+        stale = output_dir / f"metadata{suffix}"
+        if stale.name != metadata_file and stale.exists():
+            stale.unlink()
+    return metadata_file
+
+def source_key(entry: Dict) -> str:
+    """Metadata file stem an index entry came from, e.g. AAPL_2024_Q2"""
+    return f"{entry['ticker']}_{entry['year']}_Q{entry['q']}"
+
+def publish_index(embeddings: np.ndarray, metadata: List[Dict], index_root: Path, keep: int = 3, **options) -> str:
+    """Build the index as a new checksummed version under index_root and publish it; returns the version"""
+    return publish_bundle(
+        index_root,
+        lambda bundle: create_and_save_index(embeddings, metadata, bundle, **options),
+        keep=keep,
+    )
+
+def append_to_index(
+    output_dir: Path,
+    batches: List[Tuple[str, np.ndarray, List[Dict]]],
+    index_type: str = "flat",
+    embedding: Optional[Dict] = None,
+) -> int:
+    """
+    Append transcripts to a saved index without rebuilding it
+
+    batches holds (source, embeddings, metadata) per transcript. A source
+    that is already indexed has its old rows removed first. Sharded,
+    deduplicated or reduced indexes cannot be appended to and raise ValueError,
+    as do embeddings from a backend (spec) other than the index's own.
+    The result is published as a new version of output_dir (an unversioned
+    index is read and republished as the first version). Returns the new
+    number of vectors.
+    """
+    source_dir = bundle_dir(output_dir)
+    manifest_path = source_dir / "manifest.json"
+    if manifest_path.exists():
+        manifest = serialization.load(manifest_path)
+        if manifest.get("shards") or manifest.get("dedup_threshold") is not None or manifest.get("reduce_dim"):
+            raise ValueError("Sharded, deduplicated or reduced indexes must be rebuilt with create_index.py")
+        index = faiss.read_index(str(source_dir / "earnings.index"))
+        metadata = serialization.load(source_dir / manifest.get("metadata_file", "metadata.json"))
+        # Recomputed when the new version is published
+        manifest.pop("version", None)
+        manifest.pop("checksums", None)
+        with_aggregates = "aggregates" in manifest
+        sums = GroupSums.load(source_dir, manifest["aggregates"]) if with_aggregates else None
+    else:
+        if index_type != "flat":
+            raise ValueError("A new index can only be started as flat; build quantized indexes with create_index.py")
+        manifest = {"index_type": index_type, "dedup_threshold": None}
+        index, metadata = None, []
+        with_aggregates = True
+        sums = None
+
+    if embedding:
+        if metadata and manifest.get("embedding", embedding) != embedding:
+            raise ValueError(f"Index holds embeddings from {manifest['embedding']}, not {embedding}")
+        manifest["embedding"] = embedding
+
+    # Drop rows of transcripts that are being replaced; remove_ids keeps the remaining order
+    sources = {source for source, _, _ in batches}
+    stale_rows = [row for row, entry in enumerate(metadata) if source_key(entry) in sources]
+    if stale_rows:
+        index.remove_ids(faiss.IDSelectorBatch(np.array(stale_rows, dtype=np.int64)))
+        stale = set(stale_rows)
+        if sums is not None:
+            # The stale rows are exactly the ticker-quarters being replaced
+            sums.remove_quarters({(metadata[row]["ticker"], int(metadata[row]["year"]), int(metadata[row]["q"]))
+                                  for row in stale_rows})
+        metadata = [entry for row, entry in enumerate(metadata) if row not in stale]
+
+    for source, embeddings, entries in batches:
+        embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+        faiss.normalize_L2(embeddings)
+        if index is None:
+            index = faiss.IndexFlatIP(embeddings.shape[1])
+            sums = GroupSums(index.d)
+        index.add(embeddings)
+        if sums is not None:
+            sums.add(embeddings, entries)
+        metadata.extend(entries)
+
+    def write(bundle: Path) -> None:
+        faiss.write_index(index, str(bundle / "earnings.index"))
+        metadata_format = serialization.format_of(manifest.get("metadata_file", "metadata.json"))
+        manifest["metadata_file"] = save_index_metadata(metadata, bundle, metadata_format)
+        manifest.update({"dimension": index.d, "ntotal": index.ntotal, "source_entries": len(metadata)})
+        if sums is not None:
+            manifest["aggregates"] = sums.save(bundle)
+        elif with_aggregates:
+            # Bundles from before group norms were recorded: rebuild the centroids from the index's vectors
+            manifest["aggregates"] = save_aggregates(index.reconstruct_n(0, index.ntotal), metadata, bundle)
+        serialization.save(manifest, bundle / "manifest.json")
+
+    publish_bundle(output_dir, write)
+    return index.ntotal
 
 def main():
+    parser = argparse.ArgumentParser(description="Build the FAISS index from metadata and embeddings")
+    parser.add_argument("--index-type", choices=list(INDEX_TYPES), default="flat",
+                        help="flat keeps float32 vectors, sq16/sq8 store 2/1 bytes per dimension")
+    parser.add_argument("--dedup-threshold", type=float, default=None,
+                        help="Collapse entries whose cosine similarity exceeds this value (e.g. 0.97)")
+    parser.add_argument("--shards", type=int, default=1,
+                        help="Split the index into this many shards searched in parallel")
+    parser.add_argument("--partition", choices=list(PARTITIONS), default="hash",
+                        help="How entries are assigned to shards")
+    parser.add_argument("--reduce-dim", type=int, default=None,
+                        help="Project vectors to this many dimensions and rerank candidates at full precision")
+    parser.add_argument("--transform", choices=TRANSFORMS, default="pca",
+                        help="Projection learned for --reduce-dim")
+    parser.add_argument("--rerank-factor", type=int, default=4,
+                        help="Candidates reranked per result (k * factor) with --reduce-dim")
+    parser.add_argument("--no-aggregates", dest="aggregates", action="store_false",
+                        help="Skip the per-ticker and per-quarter centroid indexes used for peer lookups")
+    parser.add_argument("--keep-versions", type=int, default=3,
+                        help="Published index versions kept on disk (older ones are deleted)")
+    parser.add_argument("--metadata-format", choices=list(serialization.FORMATS), default="json",
+                        help="Format of the index metadata; msgpack loads faster, json stays readable")
+    args = parser.parse_args()
+
     # 디렉토리 설정
     metadata_dir = Path("data/processed/metadata")
     embeddings_dir = Path("data/embeddings")
     output_dir = Path("data/index")
-    
+
     print("Loading metadata and embeddings...")
-    metadata, embeddings = load_metadata_and_embeddings(metadata_dir, embeddings_dir)
-    
-    print(f"Creating index with {len(metadata)} documents...")
-    create_and_save_index(embeddings, metadata, output_dir)
-    
+    with timer(BUILD_SECONDS, step="load"):
+        metadata, embeddings = load_metadata_and_embeddings(metadata_dir, embeddings_dir)
+    embedding = EmbeddingStore(embeddings_dir).embedding or OpenAIBackend().spec()
+
+    print(f"Creating {args.index_type} index with {len(metadata)} documents embedded by {embedding['backend']}/{embedding['model']}...")
+    with timer(BUILD_SECONDS, step="build"):
+        version = publish_index(
+            embeddings, metadata, output_dir,
+            keep=args.keep_versions,
+            index_type=args.index_type,
+            dedup_threshold=args.dedup_threshold,
+            n_shards=args.shards,
+            partition=args.partition,
+            metadata_format=args.metadata_format,
+            reduce_dim=args.reduce_dim,
+            transform=args.transform,
+            rerank_factor=args.rerank_factor,
+            aggregates=args.aggregates,
+            embedding=embedding,
+        )
+
+    print(f"Published index version {version}; serving processes pick it up on their next poll")
+    print(f"Run summary saved to {write_run_summary('create_index')}")
     print("Done!")
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
\ No newline at end of file
@@ -2,6 +2,8 @@ import pandas as pd
 from fioneer.ninjas.ninjas_client import NinjasClient
 import json
 import os
+from pathlib import Path
+from fioneer import serialization
 
 def parse_earnings_call(transcript):
     """
@@ -105,8 +107,7 @@ def process_all_tickers():
     
     # Save date information to JSON file
     dates_filename = 'data/processed/earnings_dates.json'
-    with open(dates_filename, 'w') as f:
-        json.dump(dates_dict, f, indent=4)
+    serialization.save(dates_dict, Path(dates_filename))
     print(f"\nSaved all dates to: {dates_filename}")
 
 if __name__ == "__main__":
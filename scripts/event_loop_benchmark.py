@@ -0,0 +1,70 @@
+import argparse
+import asyncio
+import time
+import faiss
+import numpy as np
+from fioneer.retrieval.faiss_retriever import FaissRetriever
+
+def build_retriever(n: int, dimension: int, search_threads: int, omp_threads: int) -> FaissRetriever:
+    """Retriever over a random flat index, queried by vector so no API is involved"""
+    vectors = np.random.default_rng(0).standard_normal((n, dimension)).astype(np.float32)
+    faiss.normalize_L2(vectors)
+    retriever = FaissRetriever(search_threads=search_threads, omp_threads=omp_threads)
+    if omp_threads:
+        faiss.omp_set_num_threads(omp_threads)
+    retriever.index = faiss.IndexFlatIP(dimension)
+    retriever.index.add(vectors)
+    retriever.metadata = [{"row": i} for i in range(n)]
+    return retriever
+
+async def run(retriever: FaissRetriever, mode: str, clients: int, seconds: float, interval: float, k: int):
+    """Concurrent searchers plus a heartbeat that measures how late the event loop wakes it"""
+    rng = np.random.default_rng(1)
+    queries = rng.standard_normal((256, retriever.index.d)).astype(np.float32)
+    deadline = time.perf_counter() + seconds
+    lags, searches = [], 0
+
+    async def heartbeat():
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            await asyncio.sleep(interval)
+            lags.append(time.perf_counter() - start - interval)
+
+    async def client(i: int):
+        nonlocal searches
+        while time.perf_counter() < deadline:
+            query = queries[(i + searches) % len(queries)]
+            if mode == "inline":
+                # What the retriever did before: search on the event loop thread
+                retriever.search_by_vectors(query, k)
+                await asyncio.sleep(0)
+            else:
+                await retriever.search_vectors(query, k)
+            searches += 1
+
+    await asyncio.gather(heartbeat(), *(client(i) for i in range(clients)))
+    return np.array(lags) * 1000, searches / seconds
+
+def main():
+    parser = argparse.ArgumentParser(description="Event-loop latency while FAISS searches run under concurrent load")
+    parser.add_argument("--vectors", type=int, default=200_000)
+    parser.add_argument("--dimension", type=int, default=256)
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--interval-ms", type=float, default=5.0, help="Heartbeat period")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--search-threads", type=int, default=1)
+    parser.add_argument("--omp-threads", type=int, default=None)
+    args = parser.parse_args()
+
+    retriever = build_retriever(args.vectors, args.dimension, args.search_threads, args.omp_threads)
+    print(f"{args.vectors} x {args.dimension} flat index, {args.clients} clients, "
+          f"search threads {args.search_threads}, OpenMP threads {faiss.omp_get_max_threads()}\n")
+    print(f"{'mode':<10}{'searches/s':>12}{'lag p50':>10}{'lag p99':>10}{'lag max':>10}  (ms)")
+    for mode in ("inline", "executor"):
+        lags, qps = asyncio.run(run(retriever, mode, args.clients, args.seconds, args.interval_ms / 1000, args.k))
+        p50, p99 = np.percentile(lags, [50, 99]) if len(lags) else (float("nan"),) * 2
+        print(f"{mode:<10}{qps:>12.1f}{p50:>10.1f}{p99:>10.1f}{lags.max() if len(lags) else float('nan'):>10.1f}")
+
+if __name__ == "__main__":
+    main()
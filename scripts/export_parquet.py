@@ -0,0 +1,142 @@
+import argparse
+import shutil
+from pathlib import Path
+from typing import Iterator, Optional
+import numpy as np
+import pyarrow as pa
+import pyarrow.dataset as ds
+from fioneer.embeddings.store import EmbeddingStore
+from fioneer import serialization
+
+# Partition columns, outermost first: data/parquet/year=2024/q=3/sector=Technology/
+PARTITION_COLUMNS = ["year", "q", "sector"]
+
+def metadata_schema(embedding_dim: Optional[int] = None) -> pa.Schema:
+    """Columns of the exported dataset; embedding is a fixed-size float32 list when included"""
+    fields = [
+        ("source", pa.string()),
+        ("row", pa.int32()),
+        ("company", pa.string()),
+        ("country", pa.string()),
+        ("ticker", pa.string()),
+        ("date", pa.string()),
+        ("year", pa.int32()),
+        ("q", pa.int32()),
+        ("sector", pa.string()),
+        ("industry", pa.string()),
+        ("q_speaker", pa.string()),
+        ("a_speaker", pa.string()),
+        ("question_summary", pa.string()),
+        ("answer_summary", pa.string()),
+        ("insight", pa.string()),
+        ("reasoning_steps", pa.list_(pa.string())),
+    ]
+    if embedding_dim:
+        fields.append(("embedding", pa.list_(pa.float32(), embedding_dim)))
+    return pa.schema(fields)
+
+def record_batches(metadata_dir: Path, schema: pa.Schema, store: Optional[EmbeddingStore] = None) -> Iterator[pa.RecordBatch]:
+    """One record batch per metadata file, so the corpus is never held in memory at once"""
+    for metadata_file in sorted(metadata_dir.glob("*.json")):
+        entries = serialization.load(metadata_file)
+        if not entries:
+            continue
+        columns = {
+            name: [entry.get(name) for entry in entries]
+            for name in schema.names
+            if name not in ("source", "row", "embedding")
+        }
+        columns["source"] = [metadata_file.stem] * len(entries)
+        columns["row"] = list(range(len(entries)))
+        # Missing sector would otherwise become a null partition value
+        columns["sector"] = [sector or "Unknown" for sector in columns["sector"]]
+        arrays = [pa.array(columns[name], type=schema.field(name).type) for name in schema.names if name != "embedding"]
+
+        if "embedding" in schema.names:
+            embedding_type = schema.field("embedding").type
+            if metadata_file.stem in store:
+                vectors = np.ascontiguousarray(store.get(metadata_file.stem), dtype=np.float32)
+                if len(vectors) != len(entries):
+                    print(f"Skipping embeddings for {metadata_file.name}: {len(vectors)} vectors for {len(entries)} entries")
+                    arrays.append(pa.nulls(len(entries), embedding_type))
+                else:
+                    arrays.append(pa.FixedSizeListArray.from_arrays(pa.array(vectors.reshape(-1)), embedding_type.list_size))
+            else:
+                arrays.append(pa.nulls(len(entries), embedding_type))
+
+        yield pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+def export_parquet(
+    metadata_dir: Path = Path("data/processed/metadata"),
+    output_dir: Path = Path("data/parquet"),
+    embeddings_dir: Optional[Path] = None,
+    compression: str = "zstd",
+    max_rows_per_group: int = 64 * 1024,
+) -> int:
+    """
+    Write the metadata corpus as a hive-partitioned Parquet dataset
+
+    Files are partitioned by year, quarter and sector and carry column
+    statistics, so readers can skip partitions and row groups. With
+    embeddings_dir, each row also gets its embedding. The dataset is built
+    next to output_dir and swapped in when complete. Returns the row count.
+    """
+    store = EmbeddingStore(embeddings_dir) if embeddings_dir else None
+    schema = metadata_schema(store.dimension if store else None)
+
+    rows = 0
+    def counted() -> Iterator[pa.RecordBatch]:
+        nonlocal rows
+        for batch in record_batches(metadata_dir, schema, store):
+            rows += batch.num_rows
+            yield batch
+
+    tmp_dir = output_dir.with_name(output_dir.name + ".tmp")
+    if tmp_dir.exists():
+        shutil.rmtree(tmp_dir)
+    ds.write_dataset(
+        counted(),
+        tmp_dir,
+        schema=schema,
+        format="parquet",
+        partitioning=ds.partitioning(pa.schema([schema.field(name) for name in PARTITION_COLUMNS]), flavor="hive"),
+        file_options=ds.ParquetFileFormat().make_write_options(compression=compression, write_statistics=True),
+        basename_template="part-{i}.parquet",
+        max_rows_per_group=max_rows_per_group,
+        min_rows_per_group=min(max_rows_per_group, 1024),
+    )
+
+    if not tmp_dir.exists():
+        return rows
+    # Move the old dataset aside, swap in the new one, then delete the old one: readers only miss the
+    # directory between two renames instead of while the old dataset is deleted
+    old_dir = output_dir.with_name(output_dir.name + ".old")
+    if old_dir.exists():
+        shutil.rmtree(old_dir)
+    if output_dir.exists():
+        output_dir.rename(old_dir)
+    tmp_dir.rename(output_dir)
+    if old_dir.exists():
+        shutil.rmtree(old_dir)
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description="Export metadata as a Parquet dataset partitioned by year/quarter/sector")
+    parser.add_argument("--metadata-dir", type=Path, default=Path("data/processed/metadata"))
+    parser.add_argument("--output-dir", type=Path, default=Path("data/parquet"))
+    parser.add_argument("--with-embeddings", action="store_true",
+                        help="Add an embedding column read from the embedding store")
+    parser.add_argument("--embeddings-dir", type=Path, default=Path("data/embeddings"))
+    parser.add_argument("--compression", default="zstd", choices=["zstd", "snappy", "gzip", "none"])
+    args = parser.parse_args()
+
+    rows = export_parquet(
+        args.metadata_dir,
+        args.output_dir,
+        embeddings_dir=args.embeddings_dir if args.with_embeddings else None,
+        compression=args.compression,
+    )
+    print(f"Exported {rows} entries to {args.output_dir}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,326 @@
+import argparse
+import asyncio
+import json
+import math
+import random
+import re
+import time
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+import numpy as np
+from fioneer import serialization
+from fioneer.metrics import REGISTRY
+from fioneer.retrieval.bundles import bundle_dir
+from fioneer.retrieval.faiss_retriever import STAGE_SECONDS, FaissRetriever
+
+TOPICS = [
+    "revenue guidance", "gross margin", "capital expenditure", "AI demand", "pricing", "supply chain",
+    "share buybacks", "headcount", "China", "tariffs", "free cash flow", "inventory levels",
+]
+GENERIC_TEMPLATES = [
+    "Which companies raised {topic}?",
+    "What are management teams saying about {topic}?",
+    "Who mentioned {topic} as a risk?",
+]
+Bucket = Tuple[float, float]
+
+def load_query_log(path: Path, k: int = 5) -> List[Dict]:
+    """Queries from a text file (one per line) or JSON lines with "query" and optional "k" """
+    queries = []
+    for line in Path(path).read_text().splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        if line.startswith("{"):
+            entry = json.loads(line)
+            queries.append({"query": entry["query"], "k": int(entry.get("k", k))})
+        else:
+            queries.append({"query": line, "k": k})
+    return queries
+
+def synthetic_queries(n: int, metadata: Optional[List[Dict]] = None, k: int = 5, seed: int = 0) -> List[Dict]:
+    """Analyst-style questions; most name a company (and often a quarter) from the metadata"""
+    rng = random.Random(seed)
+    periods = sorted({
+        (entry["company"], entry.get("year"), entry.get("q")) for entry in metadata or [] if entry.get("company")
+    }, key=str)
+    queries = []
+    for _ in range(n):
+        topic = rng.choice(TOPICS)
+        if periods and rng.random() < 0.6:
+            company, year, q = rng.choice(periods)
+            if year and q and rng.random() < 0.5:
+                query = f"What did {company} say about {topic} in Q{q} {year}?"
+            else:
+                query = f"How is {company} thinking about {topic}?"
+        else:
+            query = rng.choice(GENERIC_TEMPLATES).format(topic=topic)
+        queries.append({"query": query, "k": k})
+    return queries
+
+def index_metadata(index_dir: Path) -> Optional[List[Dict]]:
+    """Metadata of the current index version, used to name real companies in synthetic queries"""
+    directory = bundle_dir(index_dir)
+    manifest_path = directory / "manifest.json"
+    if not manifest_path.exists():
+        return None
+    manifest = serialization.load(manifest_path)
+    return serialization.load(directory / manifest.get("metadata_file", "metadata.json"))
+
+def stub_embeddings(retriever: FaissRetriever, latency_ms: float = 0.0) -> None:
+    """Replace the embeddings API with deterministic vectors, optionally after a fixed delay"""
+    from fioneer.testing.mock_openai import mock_embedding
+
+    dimension = retriever.index.d
+
+    async def generate_embeddings(texts: List[str]) -> np.ndarray:
+        if latency_ms:
+            await asyncio.sleep(latency_ms / 1000)
+        return np.stack([mock_embedding(text, dimension) for text in texts])
+
+    retriever.embedding_generator.generate_embeddings = generate_embeddings
+
+def latency_summary(latencies: List[float]) -> Dict[str, float]:
+    """Mean and percentiles in milliseconds"""
+    if not latencies:
+        return {name: math.nan for name in ("mean", "p50", "p95", "p99", "max")}
+    values = np.array(latencies) * 1000
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {"mean": float(values.mean()), "p50": float(p50), "p95": float(p95), "p99": float(p99), "max": float(values.max())}
+
+async def run_load(
+    send: Callable[[Dict], Awaitable[object]],
+    queries: List[Dict],
+    duration: float,
+    concurrency: Optional[int] = None,
+    rate: Optional[float] = None,
+    seed: int = 0,
+) -> Dict:
+    """
+    Replay queries (cycling through the log) for duration seconds
+
+    With concurrency, that many clients each send their next query as soon
+    as the previous one returns (closed loop). With rate, queries arrive as
+    a Poisson process regardless of how fast they complete (open loop), and
+    latency counts from the scheduled arrival, so a backlog shows up in the
+    percentiles instead of silently lowering the offered load.
+    """
+    latencies: List[float] = []
+    errors: Dict[str, int] = {}
+    sent = 0
+
+    async def issue(query: Dict, scheduled: float) -> None:
+        try:
+            await send(query)
+            latencies.append(time.perf_counter() - scheduled)
+        except Exception as e:
+            status = getattr(getattr(e, "response", None), "status_code", None)
+            kind = f"HTTP {status}" if status else type(e).__name__
+            errors[kind] = errors.get(kind, 0) + 1
+
+    def next_query() -> Dict:
+        nonlocal sent
+        query = queries[sent % len(queries)]
+        sent += 1
+        return query
+
+    start = time.perf_counter()
+    deadline = start + duration
+    if rate:
+        rng = random.Random(seed)
+        scheduled = start
+        tasks = set()
+        while True:
+            scheduled += rng.expovariate(rate)
+            if scheduled >= deadline:
+                break
+            await asyncio.sleep(max(0.0, scheduled - time.perf_counter()))
+            task = asyncio.create_task(issue(next_query(), scheduled))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        if tasks:
+            await asyncio.wait(tasks)
+    else:
+        async def client() -> None:
+            while time.perf_counter() < deadline:
+                await issue(next_query(), time.perf_counter())
+
+        await asyncio.gather(*(client() for _ in range(concurrency or 1)))
+    elapsed = time.perf_counter() - start
+
+    failed = sum(errors.values())
+    return {
+        "requests": sent,
+        "completed": len(latencies),
+        "errors": errors,
+        "error_rate": failed / sent if sent else 0.0,
+        "duration_seconds": elapsed,
+        "qps": len(latencies) / elapsed,
+        "latency_ms": latency_summary(latencies),
+    }
+
+def stage_summary() -> Dict[str, Dict[str, float]]:
+    """Per-stage latency percentiles (ms) recorded by the in-process retriever"""
+    return {
+        entry["labels"].get("stage", ""): {
+            "count": entry["count"],
+            **{name: entry[name] * 1000 for name in ("p50", "p95", "p99")},
+        }
+        for entry in STAGE_SECONDS.summary()
+    }
+
+def parse_histogram(text: str, name: str) -> Dict[str, List[Bucket]]:
+    """Cumulative (upper bound, count) buckets per stage label from Prometheus text"""
+    pattern = re.compile(rf"^{name}_bucket\{{(.*)\}} (\S+)$")
+    series: Dict[str, List[Bucket]] = {}
+    for line in text.splitlines():
+        match = pattern.match(line)
+        if not match:
+            continue
+        labels = dict(re.findall(r'(\w+)="([^"]*)"', match.group(1)))
+        bound = math.inf if labels["le"] == "+Inf" else float(labels["le"])
+        series.setdefault(labels.get("stage", ""), []).append((bound, float(match.group(2))))
+    return series
+
+def bucket_quantile(q: float, buckets: List[Bucket]) -> float:
+    """Quantile (0-1) of cumulative buckets, interpolating linearly inside a bucket like Prometheus"""
+    total = buckets[-1][1] if buckets else 0
+    if not total:
+        return math.nan
+    rank = q * total
+    lower_bound, lower_count = 0.0, 0.0
+    for bound, count in buckets:
+        if count >= rank:
+            if math.isinf(bound):
+                return lower_bound
+            if count == lower_count:
+                return bound
+            return lower_bound + (bound - lower_bound) * (rank - lower_count) / (count - lower_count)
+        lower_bound, lower_count = bound, count
+    return lower_bound
+
+def bucket_stage_summary(before: str, after: str) -> Dict[str, Dict[str, float]]:
+    """Per-stage latency percentiles (ms) of the observations made between two /metrics scrapes"""
+    name = STAGE_SECONDS.name
+    start, end = parse_histogram(before, name), parse_histogram(after, name)
+    summary = {}
+    for stage, buckets in end.items():
+        previous = dict(start.get(stage, []))
+        delta = [(bound, count - previous.get(bound, 0.0)) for bound, count in buckets]
+        if delta and delta[-1][1]:
+            summary[stage] = {
+                "count": int(delta[-1][1]),
+                **{f"p{p}": bucket_quantile(p / 100, delta) * 1000 for p in (50, 95, 99)},
+            }
+    return summary
+
+def print_report(result: Dict, stages: Dict[str, Dict[str, float]]) -> None:
+    latency = result["latency_ms"]
+    print(f"\n{result['completed']}/{result['requests']} queries in {result['duration_seconds']:.1f}s: "
+          f"{result['qps']:.1f} QPS, error rate {result['error_rate']:.2%}")
+    for kind, count in sorted(result["errors"].items()):
+        print(f"  {kind}: {count}")
+    print(f"\n{'stage':<12}{'count':>8}{'p50':>10}{'p95':>10}{'p99':>10}  (ms)")
+    print(f"{'end-to-end':<12}{result['completed']:>8}{latency['p50']:>10.2f}{latency['p95']:>10.2f}{latency['p99']:>10.2f}")
+    for stage, row in stages.items():
+        print(f"{stage:<12}{row['count']:>8}{row['p50']:>10.2f}{row['p95']:>10.2f}{row['p99']:>10.2f}")
+
+async def run(args) -> Dict:
+    retriever = batcher = client = None
+    if args.url:
+        import httpx
+
+        client = httpx.AsyncClient(base_url=args.url, timeout=args.timeout)
+        metadata = index_metadata(args.index_dir) if args.index_dir.exists() else None
+
+        async def send(query: Dict):
+            response = await client.post("/search", json=query)
+            response.raise_for_status()
+            return response.json()
+    else:
+        from fioneer.retrieval.service import QueryBatcher
+
+        retriever = FaissRetriever(
+            search_threads=args.search_threads,
+            omp_threads=args.omp_threads,
+            routing=args.route_entities,
+        )
+        retriever.load_index(args.index_dir)
+        if args.stub_embeddings:
+            stub_embeddings(retriever, args.stub_latency_ms)
+        metadata = retriever.metadata
+        if args.window_ms:
+            # The service's micro-batching, so results are comparable with --url runs
+            batcher = QueryBatcher(retriever, window_ms=args.window_ms, max_batch_size=args.max_batch_size)
+            batcher.start()
+
+            async def send(query: Dict):
+                return await batcher.search(query["query"], query["k"])
+        else:
+            async def send(query: Dict):
+                return await retriever.search_similar(query["query"], query["k"])
+
+    queries = load_query_log(args.queries, args.k) if args.queries else synthetic_queries(args.synthetic, metadata, args.k)
+    mode = f"rate {args.rate}/s" if args.rate else f"concurrency {args.concurrency}"
+    print(f"{len(queries)} queries against {args.url or args.index_dir}, {mode}, {args.duration:.0f}s")
+
+    try:
+        if args.warmup:
+            await run_load(send, queries, args.warmup, args.concurrency, args.rate, seed=1)
+        if client:
+            before = (await client.get("/metrics")).text
+        REGISTRY.reset()
+        result = await run_load(send, queries, args.duration, args.concurrency, args.rate)
+        if client:
+            stages = bucket_stage_summary(before, (await client.get("/metrics")).text)
+        else:
+            stages = stage_summary()
+    finally:
+        if batcher:
+            await batcher.stop()
+        if client:
+            await client.aclose()
+    result["stages_ms"] = stages
+    result["config"] = {
+        name: str(value) if isinstance(value, Path) else value for name, value in vars(args).items() if name != "output"
+    }
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a query log against the retriever and report QPS and latency")
+    parser.add_argument("--url", default=None,
+                        help="Base URL of a running retrieval service; without it the index is searched in-process")
+    parser.add_argument("--index-dir", type=Path, default=Path("data/index"))
+    parser.add_argument("--queries", type=Path, default=None,
+                        help='Query log: one query per line, or JSON lines with "query" and optional "k"')
+    parser.add_argument("--synthetic", type=int, default=1000,
+                        help="Number of generated queries when no --queries log is given")
+    load = parser.add_mutually_exclusive_group()
+    load.add_argument("--concurrency", type=int, default=8, help="Clients sending back-to-back queries")
+    load.add_argument("--rate", type=float, default=None, help="Open-loop Poisson arrival rate in queries per second")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds of measured load")
+    parser.add_argument("--warmup", type=float, default=2.0, help="Seconds of unmeasured load first")
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--timeout", type=float, default=30.0, help="Per-request timeout with --url")
+    parser.add_argument("--stub-embeddings", action="store_true",
+                        help="In-process only: deterministic local vectors instead of the embeddings API "
+                             "(for --url, point the service at fioneer.testing.mock_openai)")
+    parser.add_argument("--stub-latency-ms", type=float, default=0.0, help="Simulated embedding latency with --stub-embeddings")
+    parser.add_argument("--window-ms", type=float, default=5.0, help="In-process micro-batching window (0 searches each query alone)")
+    parser.add_argument("--max-batch-size", type=int, default=64)
+    parser.add_argument("--search-threads", type=int, default=1)
+    parser.add_argument("--omp-threads", type=int, default=None)
+    parser.add_argument("--route-entities", action="store_true")
+    parser.add_argument("--output", type=Path, default=None, help="Write the report as JSON for comparing runs")
+    args = parser.parse_args()
+    if args.rate:
+        args.concurrency = None
+
+    result = asyncio.run(run(args))
+    print_report(result, result["stages_ms"])
+    if args.output:
+        serialization.save(result, args.output)
+        print(f"\nReport written to {args.output}")
+
+if __name__ == "__main__":
+    main()
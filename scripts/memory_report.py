@@ -0,0 +1,105 @@
+import argparse
+import asyncio
+import os
+import shutil
+import tempfile
+import tracemalloc
+from pathlib import Path
+from typing import Dict, List
+import numpy as np
+from fioneer import serialization
+from fioneer.metrics.memory import PROFILES, current_rss
+from fioneer.testing import MockOpenAIServer
+from create_index import create_and_save_index
+from serialization_benchmark import synthetic_corpus
+
+def synthetic_vectors(n: int, dimension: int) -> np.ndarray:
+    """Random float32 vectors, generated in chunks to avoid a float64 copy"""
+    rng = np.random.default_rng(0)
+    vectors = np.empty((n, dimension), dtype=np.float32)
+    for start in range(0, n, 100_000):
+        vectors[start:start + 100_000] = rng.standard_normal((min(100_000, n - start), dimension), dtype=np.float32)
+    return vectors
+
+def profile_embeddings(workspace: Path, n_files: int, entries_per_file: int, dimension: int) -> int:
+    """Embed synthetic metadata files against the mock API; returns the number of vectors"""
+    from fioneer.config import get_settings
+    from fioneer.embeddings.vectorizer import generate_and_save_embeddings
+    from fioneer.llm import openai_client
+
+    metadata_dir = workspace / "metadata"
+    metadata_dir.mkdir()
+    entries = synthetic_corpus(n_files * entries_per_file)
+    for i in range(n_files):
+        serialization.save(entries[i * entries_per_file:(i + 1) * entries_per_file], metadata_dir / f"T{i}_2024_Q1.json")
+
+    with MockOpenAIServer(embedding_dimension=dimension) as server:
+        os.environ["OPENAI_BASE_URL"] = server.base_url
+        os.environ.setdefault("OPENAI_API_KEY", "mock")
+        get_settings.cache_clear()
+        openai_client.get_async_openai_client.cache_clear()
+        # Load the SDK first so its import cost is not charged to the first profile
+        openai_client.get_async_openai_client()
+        asyncio.run(generate_and_save_embeddings(metadata_dir=metadata_dir, embeddings_dir=workspace / "embeddings"))
+    return len(entries)
+
+def print_report(rows: List[Dict], top: int) -> None:
+    mb = 1024 * 1024
+    print(f"\n{'operation':<14}{'items':>10}{'seconds':>9}{'peak +MB':>10}{'kept +MB':>10}{'python MB':>11}{'peak B/item':>13}")
+    for row in rows:
+        per_item = row["peak_growth"] / row["items"] if row["items"] else float("nan")
+        print(f"{row['operation']:<14}{row['items']:>10}{row['seconds']:>9.2f}{row['peak_growth'] / mb:>10.1f}"
+              f"{row['retained'] / mb:>10.1f}{row['traced_growth'] / mb:>11.1f}{per_item:>13.0f}")
+    for row in rows:
+        if row["top_allocations"]:
+            print(f"\n{row['operation']}: largest new Python allocations")
+            for allocation in row["top_allocations"][:top]:
+                print(f"  {allocation['bytes'] / mb:>8.1f} MB  {allocation['location']}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Peak memory of embedding, index build and index load on a synthetic corpus")
+    parser.add_argument("--vectors", type=int, default=100_000, help="Vectors in the index that is built and loaded")
+    parser.add_argument("--dimension", type=int, default=1536)
+    parser.add_argument("--index-type", default="flat")
+    parser.add_argument("--reduce-dim", type=int, default=None)
+    parser.add_argument("--embed-files", type=int, default=4, help="Metadata files embedded through the mock API (0 skips)")
+    parser.add_argument("--entries-per-file", type=int, default=100)
+    parser.add_argument("--no-trace", dest="trace", action="store_false",
+                        help="Only measure RSS; tracemalloc slows Python allocations several times over")
+    parser.add_argument("--top", type=int, default=5, help="Allocation sites listed per operation")
+    parser.add_argument("--output", type=Path, default=None, help="Write the report as JSON")
+    args = parser.parse_args()
+
+    workspace = Path(tempfile.mkdtemp(prefix="fioneer-memory-"))
+    items = {}
+    try:
+        if args.trace:
+            tracemalloc.start()
+        if args.embed_files:
+            items["embeddings"] = profile_embeddings(workspace, args.embed_files, args.entries_per_file, args.dimension)
+
+        vectors = synthetic_vectors(args.vectors, args.dimension)
+        metadata = synthetic_corpus(min(args.vectors, 10_000))
+        metadata = [metadata[i % len(metadata)] for i in range(args.vectors)]
+        print(f"Corpus: {args.vectors} x {args.dimension} vectors, process RSS {current_rss() / 2 ** 20:.0f} MB")
+        create_and_save_index(vectors, metadata, workspace / "index", index_type=args.index_type, reduce_dim=args.reduce_dim)
+        items["create_index"] = args.vectors
+        del vectors, metadata
+
+        from fioneer.retrieval.faiss_retriever import FaissRetriever
+        retriever = FaissRetriever()
+        retriever.load_index(workspace / "index")
+        items["load_index"] = args.vectors
+    finally:
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+        shutil.rmtree(workspace, ignore_errors=True)
+
+    rows = [{**PROFILES[operation].summary(), "items": count} for operation, count in items.items()]
+    print_report(rows, args.top)
+    if args.output:
+        serialization.save({"vectors": args.vectors, "dimension": args.dimension, "operations": rows}, args.output)
+        print(f"\nReport written to {args.output}")
+
+if __name__ == "__main__":
+    main()
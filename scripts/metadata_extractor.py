@@ -1,12 +1,21 @@
+import argparse
 import json
 import pandas as pd
 from pathlib import Path
-from typing import Dict, List
+from typing import Callable, Dict, List
 from fioneer.llm.openai_client import chat_completion
+from fioneer.metrics import counter, histogram, timer, write_run_summary
+from fioneer import serialization
 import asyncio
+import time
 from concurrent.futures import ThreadPoolExecutor
 from pprint import pprint
 
+FILE_SECONDS = histogram("extractor_file_seconds", "Time to extract metadata from one transcript")
+PASS_SECONDS = histogram("extractor_pass_seconds", "Time spent in each extraction pass per transcript")
+SECTIONS_TOTAL = counter("extractor_sections_total", "Transcript sections by Q&A extraction outcome")
+ENTRIES_TOTAL = counter("extractor_entries_total", "Q&A entries by insight extraction outcome")
+
 class MetadataExtractor:
     # Add constants at the top of the class
     SYSTEM_PROMPT = "Extract key business insights and financial information from the given text. Return the insight directly in one sentence without any prefix. If no meaningful business insight can be extracted, return 'NO_INSIGHT'."
@@ -30,9 +39,7 @@ class MetadataExtractor:
 
     def _load_earnings_dates(self) -> Dict:
         """Load earnings dates from JSON file"""
-        earnings_dates_path = Path("data/processed/earnings_dates.json")
-        with open(earnings_dates_path, 'r') as f:
-            return json.load(f)
+        return serialization.load(Path("data/processed/earnings_dates.json"))
 
     def _parse_filename(self, filename: str) -> Dict:
         """Extract ticker, year and quarter from filename"""
@@ -52,6 +59,14 @@ class MetadataExtractor:
             print(f"Error parsing filename {filename}: {str(e)}")
             return None
 
+    @staticmethod
+    def split_sections(df: pd.DataFrame) -> List[str]:
+        """Split a transcript into sections, each starting at an Operator line"""
+        # Plain lists instead of iterrows, which builds a Series per line
+        lines = [f"{speaker}: {content}" for speaker, content in zip(df['speaker'].tolist(), df['content'].tolist())]
+        starts = [i for i, speaker in enumerate(df['speaker'].tolist()) if speaker == 'Operator']
+        return ["\n".join(lines[start:end]) for start, end in zip(starts, starts[1:] + [len(lines)])]
+
     async def _extract_qa_structure(self, content: str) -> Dict:
         """Extract question and answer structure using LLM"""
         prompt = [
@@ -177,19 +192,35 @@ class MetadataExtractor:
                 'insight': insight
             }
 
-    async def extract_metadata(self) -> List[Dict]:
-        """Extract metadata from all CSV files in transcripts directory"""
+    async def extract_metadata(
+        self,
+        csv_files: List[Path] = None,
+        overwrite: bool = False,
+        on_file_saved: Callable[[Path], None] = None,
+    ) -> List[Dict]:
+        """
+        Extract metadata from CSV files in the transcripts directory
+
+        Existing metadata files are skipped unless overwrite is set; files
+        passed explicitly are always reprocessed. on_file_saved is called with
+        each metadata path as soon as it is written.
+        """
         total_processed = 0
         skipped_qa = 0
         skipped_insights = 0
 
-        csv_files = sorted(self.transcripts_dir.glob("*.csv"))
-        if self.max_files:
-            csv_files = csv_files[:self.max_files]
-            print(f"Processing limited to {self.max_files} files")
+        if csv_files is not None:
+            csv_files = [Path(path) for path in csv_files]
+            overwrite = True
+        else:
+            csv_files = sorted(self.transcripts_dir.glob("*.csv"))
+            if self.max_files:
+                csv_files = csv_files[:self.max_files]
+                print(f"Processing limited to {self.max_files} files")
         print(f"Found {len(csv_files)} CSV files in {self.transcripts_dir}")
         
         for file_idx, csv_path in enumerate(csv_files, 1):
+            file_start = time.perf_counter()
             try:
                 file_info = self._parse_filename(csv_path.stem)
                 if not file_info:
@@ -198,7 +229,7 @@ class MetadataExtractor:
                 metadata_filename = f"{file_info['ticker']}_{file_info['year']}_Q{file_info['q']}.json"
                 metadata_path = self.metadata_dir / metadata_filename
                 
-                if metadata_path.exists():
+                if metadata_path.exists() and not overwrite:
                     print(f"Skipping already processed file: {csv_path.name}")
                     continue
 
@@ -216,23 +247,12 @@ class MetadataExtractor:
                 
                 df = pd.read_csv(csv_path)
                 
-                # Group by Operator sections
-                operator_indices = df[df['speaker'] == 'Operator'].index
-                qa_sections = []
-                
-                for i in range(len(operator_indices)):
-                    start_idx = operator_indices[i]
-                    end_idx = operator_indices[i + 1] if i + 1 < len(operator_indices) else len(df)
-                    
-                    section = df.iloc[start_idx:end_idx]
-                    section_text = "\n".join([f"{row['speaker']}: {row['content']}" 
-                                            for _, row in section.iterrows()])
-                    qa_sections.append(section_text)
+                qa_sections = self.split_sections(df)
 
                 print(f"Found {len(qa_sections)} sections to process")
                 
                 # First pass: Extract Q&A structure
-                with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                with timer(PASS_SECONDS, stage="qa_structure"), ThreadPoolExecutor(max_workers=self.max_workers) as executor:
                     qa_structures = list(executor.map(self._extract_qa_sync, qa_sections))
                 
                 # Print skipped Q&A sections
@@ -246,6 +266,8 @@ class MetadataExtractor:
                         print(f"\nSection {i}:")
                         pprint(section)
                     skipped_qa += len(skipped_sections)
+                SECTIONS_TOTAL.inc(len(skipped_sections), status="skipped")
+                SECTIONS_TOTAL.inc(len(qa_sections) - len(skipped_sections), status="ok")
                 
                 qa_structures = [qa for qa in qa_structures if qa]
                 print(f"Found {len(qa_structures)} Q&A structures to process")
@@ -265,7 +287,7 @@ class MetadataExtractor:
                             })
 
                 # Second pass: Extract insights and summarize Q&A in parallel
-                with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                with timer(PASS_SECONDS, stage="insights"), ThreadPoolExecutor(max_workers=self.max_workers) as executor:
                     insight_results = list(executor.map(
                         lambda x: self._extract_insight_sync(x[0], x[1]), 
                         insight_tasks
@@ -287,6 +309,7 @@ class MetadataExtractor:
                         print("\nSkipped insight extraction:")
                         pprint({"question": question, "answer": answer})
                         skipped_insights += 1
+                        ENTRIES_TOTAL.inc(status="skipped")
                         continue
                         
                     metadata = {
@@ -307,11 +330,16 @@ class MetadataExtractor:
                     }
                     file_metadata.append(metadata)
                     total_processed += 1
+                    ENTRIES_TOTAL.inc(status="ok")
 
                 self.save_metadata(file_metadata, metadata_path)
+                FILE_SECONDS.observe(time.perf_counter() - file_start, status="ok")
                 print(f"Completed processing {csv_path.name} and saved metadata")
+                if on_file_saved:
+                    on_file_saved(metadata_path)
                     
             except Exception as e:
+                FILE_SECONDS.observe(time.perf_counter() - file_start, status="error")
                 print(f"Error processing {csv_path}: {str(e)}")
                 continue
 
@@ -323,33 +351,25 @@ class MetadataExtractor:
 
     def save_metadata(self, metadata_list: List[Dict], metadata_path: Path) -> None:
         """Save metadata to individual JSON file"""
-        # Create backup of existing file if it exists
-        if metadata_path.exists():
-            backup_file = metadata_path.with_suffix('.json.bak')
-            metadata_path.rename(backup_file)
-            
-        try:
-            with open(metadata_path, 'w', encoding='utf-8') as f:
-                json.dump(metadata_list, f, indent=2, ensure_ascii=False)
-            # Remove backup file after successful save
-            backup_file = metadata_path.with_suffix('.json.bak')
-            if backup_file.exists():
-                backup_file.unlink()
-        except Exception as e:
-            # Restore from backup if save fails
-            if backup_file.exists():
-                backup_file.rename(metadata_path)
-            raise e
+        # Written to a temp file and renamed, so an existing file is only replaced by a complete one
+        serialization.save(metadata_list, metadata_path)
 
-    async def process(self) -> None:
+    async def process(self, csv_files: List[Path] = None, overwrite: bool = False) -> None:
         """Extract and save metadata"""
-        total_processed = await self.extract_metadata()
+        total_processed = await self.extract_metadata(csv_files, overwrite=overwrite)
         print(f"Processed {total_processed} entries")
+        print(f"Run summary saved to {write_run_summary('metadata_extractor')}")
 
 async def main():
-    # Example: Process only 5 files
-    extractor = MetadataExtractor(max_files=2000)  # Remove or set to None to process all files
-    await extractor.process()
+    parser = argparse.ArgumentParser(description="Extract Q&A metadata from transcripts")
+    parser.add_argument("files", nargs="*", type=Path,
+                        help="Transcript CSVs to (re)process; default is every transcript without metadata")
+    parser.add_argument("--overwrite", action="store_true", help="Reprocess transcripts that already have metadata")
+    parser.add_argument("--max-files", type=int, default=2000)
+    args = parser.parse_args()
+
+    extractor = MetadataExtractor(max_files=args.max_files)
+    await extractor.process(args.files or None, overwrite=args.overwrite)
 
 if __name__ == "__main__":
     asyncio.run(main())
\ No newline at end of file
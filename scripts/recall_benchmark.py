@@ -0,0 +1,65 @@
+import argparse
+import time
+import faiss
+import numpy as np
+from pathlib import Path
+from fioneer.embeddings.quantization import quantize_int8, dequantize_int8
+from create_index import build_index, load_metadata_and_embeddings
+
+def synthetic_embeddings(n: int, dimension: int, n_clusters: int = 200, seed: int = 0) -> np.ndarray:
+    """Clustered unit vectors that roughly mimic the neighbourhood structure of real embeddings"""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((n_clusters, dimension)).astype(np.float32)
+    labels = rng.integers(0, n_clusters, n)
+    vectors = centers[labels] + 0.6 * rng.standard_normal((n, dimension)).astype(np.float32)
+    faiss.normalize_L2(vectors)
+    return vectors
+
+def recall_at_k(ground_truth: np.ndarray, results: np.ndarray) -> float:
+    """Fraction of true top-k neighbours that appear in the returned top-k"""
+    hits = sum(len(set(gt) & set(res)) for gt, res in zip(ground_truth, results))
+    return hits / ground_truth.size
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare recall and size of reduced-precision embeddings")
+    parser.add_argument("--synthetic", type=int, default=0,
+                        help="Use N synthetic vectors instead of data/embeddings")
+    parser.add_argument("--dimension", type=int, default=1536)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args()
+
+    if args.synthetic:
+        embeddings = synthetic_embeddings(args.synthetic + args.queries, args.dimension)
+    else:
+        _, embeddings = load_metadata_and_embeddings(Path("data/processed/metadata"), Path("data/embeddings"))
+        embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+        faiss.normalize_L2(embeddings)
+
+    # Hold out queries from the corpus
+    queries, corpus = embeddings[:args.queries], embeddings[args.queries:]
+    ground_truth = build_index(corpus, "flat").search(queries, args.k)[1]
+    dimension = corpus.shape[1]
+
+    codes, scales = quantize_int8(corpus)
+    candidates = {
+        "float32 file + flat": (corpus, "flat", 4 * dimension),
+        "float16 file + flat": (corpus.astype(np.float16).astype(np.float32), "flat", 2 * dimension),
+        "int8 file + flat": (dequantize_int8(codes, scales), "flat", dimension + 4),
+        "float32 file + sq16": (corpus, "sq16", 2 * dimension),
+        "float32 file + sq8": (corpus, "sq8", dimension),
+    }
+
+    print(f"{len(corpus)} vectors, {len(queries)} queries, dimension {dimension}, k={args.k}\n")
+    print(f"{'configuration':<22}{'bytes/vector':>14}{'recall@k':>10}{'search ms':>11}")
+    for name, (vectors, index_type, bytes_per_vector) in candidates.items():
+        vectors = np.ascontiguousarray(vectors)
+        faiss.normalize_L2(vectors)
+        index = build_index(vectors, index_type)
+        start = time.perf_counter()
+        _, results = index.search(queries, args.k)
+        elapsed = (time.perf_counter() - start) * 1000
+        print(f"{name:<22}{bytes_per_vector:>14}{recall_at_k(ground_truth, results):>10.4f}{elapsed:>11.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+import argparse
+import json
+import random
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+from fioneer import serialization
+
+def load_corpus(metadata_dir: Path) -> List[Dict]:
+    """All metadata entries from the per-transcript files"""
+    entries = []
+    for path in sorted(metadata_dir.glob("*.json")):
+        entries.extend(serialization.load(path))
+    return entries
+
+def synthetic_corpus(n: int) -> List[Dict]:
+    """Entries shaped like extractor output, for trees without a corpus"""
+    rng = random.Random(0)
+    words = "revenue margin guidance growth demand pricing supply cloud capex buyback outlook quarter".split()
+
+    def sentence(length: int) -> str:
+        return " ".join(rng.choice(words) for _ in range(length)).capitalize() + "."
+
+    return [{
+        "company": f"Company {i % 500}",
+        "country": "United States",
+        "ticker": f"T{i % 500}",
+        "date": "2024-07-30",
+        "year": 2024,
+        "q": 1 + i % 4,
+        "sector": "Technology",
+        "industry": "Software",
+        "q_speaker": "Analyst",
+        "a_speaker": "CFO",
+        "question_summary": sentence(25),
+        "answer_summary": sentence(40),
+        "insight": sentence(20),
+        "reasoning_steps": [sentence(15) for _ in range(3)],
+    } for i in range(n)]
+
+# The plain json module with indent=2, as metadata was written before the serialization layer
+STDLIB_JSON = "stdlib-json"
+
+def available_formats() -> List[str]:
+    formats = [STDLIB_JSON]
+    for fmt in serialization.FORMATS:
+        try:
+            serialization.dumps([], fmt)
+            formats.append(fmt)
+        except ImportError as e:
+            print(f"Skipping {fmt}: {e}")
+    return formats
+
+def save(entries: List[Dict], path: Path, fmt: str) -> None:
+    if fmt == STDLIB_JSON:
+        serialization.atomic_write(path, json.dumps(entries, indent=2).encode("utf-8"))
+    else:
+        serialization.save(entries, path)
+
+def load(path: Path, fmt: str) -> List[Dict]:
+    if fmt == STDLIB_JSON:
+        return json.loads(path.read_bytes())
+    return serialization.load(path)
+
+def benchmark(entries: List[Dict], formats: List[str], repeat: int) -> List[Dict]:
+    """Best-of-repeat save and load times per format"""
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for fmt in formats:
+            suffix = ".json" if fmt == STDLIB_JSON else serialization.FORMATS[fmt]
+            path = Path(tmp) / f"metadata{suffix}"
+            save_times, load_times = [], []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                save(entries, path, fmt)
+                save_times.append(time.perf_counter() - start)
+                start = time.perf_counter()
+                loaded = load(path, fmt)
+                load_times.append(time.perf_counter() - start)
+            assert loaded == entries, f"{fmt} did not round-trip"
+            results.append({
+                "format": fmt,
+                "save_ms": min(save_times) * 1000,
+                "load_ms": min(load_times) * 1000,
+                "size_mb": path.stat().st_size / 1e6,
+            })
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare save/load times of metadata serialization formats")
+    parser.add_argument("--metadata-dir", type=Path, default=Path("data/processed/metadata"))
+    parser.add_argument("--synthetic", type=int, default=None,
+                        help="Benchmark this many generated entries instead of the corpus")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    entries = synthetic_corpus(args.synthetic) if args.synthetic else load_corpus(args.metadata_dir)
+    if not entries:
+        print(f"No metadata found in {args.metadata_dir}; use --synthetic N")
+        return
+    formats = available_formats()
+    print(f"{len(entries)} entries, best of {args.repeat}\n")
+    print(f"{'format':<12}{'save ms':>10}{'load ms':>10}{'size MB':>10}")
+    for row in benchmark(entries, formats, args.repeat):
+        print(f"{row['format']:<12}{row['save_ms']:>10.1f}{row['load_ms']:>10.1f}{row['size_mb']:>10.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+import argparse
+import asyncio
+import threading
+import time
+from pathlib import Path
+from typing import List, Optional
+from create_index import append_to_index
+from metadata_extractor import MetadataExtractor
+from fioneer.embeddings.backends import EmbeddingBackend
+from fioneer.embeddings.store import EmbeddingStore
+from fioneer.embeddings.vectorizer import EmbeddingGenerator, embed_metadata_file
+from fioneer.metrics import histogram, write_run_summary
+from fioneer import serialization
+
+# Time from a metadata file being saved until its entries are in the saved index
+SEARCHABLE_LAG_SECONDS = histogram("stream_searchable_lag_seconds", "Delay from metadata saved to searchable")
+
+DONE = None
+
+async def run_streaming(
+    csv_files: List[Path] = None,
+    overwrite: bool = False,
+    queue_size: int = 4,
+    embeddings_dir: Path = Path("data/embeddings"),
+    index_dir: Path = Path("data/index"),
+    backend: Optional[EmbeddingBackend] = None,
+) -> int:
+    """
+    Extract, embed and index transcripts as overlapping stages
+
+    The extractor runs on its own thread (it drives its own event loops) and
+    hands each saved metadata file to the embedding worker through a bounded
+    queue; a full queue pauses extraction. The index worker appends whatever
+    has been embedded since its last write, so one index write can cover
+    several transcripts when indexing falls behind. Returns the number of
+    transcripts indexed.
+    """
+    loop = asyncio.get_running_loop()
+    embed_queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+    index_queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+    store = EmbeddingStore(embeddings_dir)
+    generator = EmbeddingGenerator(backend=backend)
+    store.set_embedding(generator.backend.spec())
+    extractor = MetadataExtractor()
+
+    def on_file_saved(metadata_path: Path) -> None:
+        # Called on the extractor thread; blocks while the queue is full
+        asyncio.run_coroutine_threadsafe(embed_queue.put((metadata_path, time.perf_counter())), loop).result()
+
+    def extract() -> None:
+        try:
+            asyncio.run(extractor.extract_metadata(csv_files, overwrite=overwrite, on_file_saved=on_file_saved))
+        finally:
+            asyncio.run_coroutine_threadsafe(embed_queue.put(DONE), loop).result()
+
+    async def embed_worker() -> None:
+        while True:
+            item = await embed_queue.get()
+            if item is DONE:
+                await index_queue.put(DONE)
+                return
+            metadata_path, saved_at = item
+            if await embed_metadata_file(generator, store, metadata_path):
+                await index_queue.put((metadata_path, saved_at))
+
+    async def index_worker() -> int:
+        indexed = 0
+        finished = False
+        while not finished:
+            items = [await index_queue.get()]
+            # Take everything already waiting so one write covers it
+            while not index_queue.empty():
+                items.append(index_queue.get_nowait())
+            finished = DONE in items
+            items = [item for item in items if item is not DONE]
+            if not items:
+                continue
+
+            batches = []
+            for metadata_path, _ in items:
+                entries = serialization.load(metadata_path)
+                batches.append((metadata_path.stem, store.get(metadata_path.stem), entries))
+            ntotal = await asyncio.to_thread(append_to_index, index_dir, batches, embedding=store.embedding)
+
+            now = time.perf_counter()
+            for metadata_path, saved_at in items:
+                SEARCHABLE_LAG_SECONDS.observe(now - saved_at)
+                print(f"{metadata_path.stem} searchable {now - saved_at:.1f}s after extraction ({ntotal} vectors)")
+            indexed += len(items)
+        return indexed
+
+    extractor_thread = threading.Thread(target=extract, name="metadata-extractor", daemon=True)
+    extractor_thread.start()
+    _, indexed = await asyncio.gather(embed_worker(), index_worker())
+    await asyncio.to_thread(extractor_thread.join)
+    return indexed
+
+def main():
+    parser = argparse.ArgumentParser(description="Stream transcripts through extraction, embedding and indexing")
+    parser.add_argument("files", nargs="*", type=Path, help="Transcript CSVs to process (default: those without metadata)")
+    parser.add_argument("--overwrite", action="store_true", help="Reprocess transcripts that already have metadata")
+    parser.add_argument("--queue-size", type=int, default=4,
+                        help="Metadata files allowed to wait for embedding before extraction pauses")
+    args = parser.parse_args()
+
+    indexed = asyncio.run(run_streaming(args.files or None, overwrite=args.overwrite, queue_size=args.queue_size))
+    print(f"Indexed {indexed} transcripts")
+    print(f"Run summary saved to {write_run_summary('stream_pipeline')}")
+
+if __name__ == "__main__":
+    main()
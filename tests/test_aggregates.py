@@ -0,0 +1,107 @@
+import tempfile
+import unittest
+from pathlib import Path
+import numpy as np
+from fioneer.retrieval.aggregates import centroids
+from fioneer.retrieval.faiss_retriever import FaissRetriever
+from scripts.create_index import append_to_index, create_and_save_index
+
+DIMENSION = 16
+
+def company_corpus(rng, bases, quarters):
+    """Entries scattered around one base vector per ticker, for each (year, q)"""
+    embeddings, metadata = [], []
+    for ticker, base in bases.items():
+        for year, q in quarters:
+            embeddings.append(base + 0.3 * rng.standard_normal((4, DIMENSION)))
+            metadata += [{"ticker": ticker, "company": f"{ticker} Inc.", "year": year, "q": q}] * 4
+    return np.vstack(embeddings).astype(np.float32), metadata
+
+class TestAggregates(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(5)
+        bases = {ticker: rng.standard_normal(DIMENSION) for ticker in ("NVDA", "AMD", "KO", "PEP")}
+        # Chip makers and drink makers sound alike
+        bases["AMD"] = bases["NVDA"] + 0.2 * rng.standard_normal(DIMENSION)
+        bases["PEP"] = bases["KO"] + 0.2 * rng.standard_normal(DIMENSION)
+        self.rng = rng
+        self.embeddings, self.metadata = company_corpus(rng, bases, [(2024, 1), (2024, 2), (2023, 4)])
+
+    def test_centroids_match_group_means(self):
+        codes = np.array([0, 0, 1, -1, 1, 0])
+        vectors = self.embeddings[:6]
+        expected = np.stack([vectors[[0, 1, 5]].mean(axis=0), vectors[[2, 4]].mean(axis=0)])
+        expected /= np.linalg.norm(expected, axis=1, keepdims=True)
+        np.testing.assert_allclose(centroids(vectors, codes, 2), expected, rtol=1e-5)
+
+    def test_peers_and_quarter_trend(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            create_and_save_index(self.embeddings, self.metadata, Path(tmp))
+            retriever = FaissRetriever()
+            retriever.load_index(Path(tmp))
+
+        self.assertEqual(retriever.peers("NVDA", k=1)[0]["ticker"], "AMD")
+        quarter_peers = retriever.peers("KO", k=3, year=2024, q=2)
+        self.assertEqual([peer["ticker"] for peer in quarter_peers][0], "PEP")
+        self.assertEqual({(peer["year"], peer["q"]) for peer in quarter_peers}, {(2024, 2)})
+        self.assertEqual(retriever.aggregates.latest_quarter("KO"), (2024, 2))
+
+        trend = retriever.quarter_trend("NVDA")
+        self.assertEqual([(entry["year"], entry["q"]) for entry in trend], [(2023, 4), (2024, 1), (2024, 2)])
+        self.assertIsNone(trend[0]["similarity_to_previous"])
+        self.assertGreater(trend[1]["similarity_to_previous"], 0.8)
+        with self.assertRaises(ValueError):
+            retriever.peers("AAPL")
+        with self.assertRaisesRegex(ValueError, "both year and q"):
+            retriever.peers("KO", year=2024)
+
+    def test_append_rebuilds_and_opt_out(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            create_and_save_index(self.embeddings, self.metadata, root)
+            new = self.embeddings[:4] + 0.01
+            append_to_index(root, [("NVDA_2024_Q3", new, [{"ticker": "NVDA", "company": "NVDA Inc.", "year": 2024, "q": 3}] * 4)])
+            retriever = FaissRetriever()
+            retriever.load_index(root)
+            self.assertEqual(retriever.aggregates.latest_quarter("NVDA"), (2024, 3))
+
+            create_and_save_index(self.embeddings, self.metadata, root / "plain", aggregates=False)
+            plain = FaissRetriever()
+            plain.load_index(root / "plain")
+        with self.assertRaises(ValueError):
+            plain.peers("NVDA")
+
+    def test_append_updates_centroids_like_a_rebuild(self):
+        nvda = [{"ticker": "NVDA", "company": "NVDA Inc.", "year": 2024, "q": 1}]
+        intc = [{"ticker": "INTC", "company": "Intel", "year": 2024, "q": 1}]
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            create_and_save_index(self.embeddings, self.metadata, root / "appended")
+            # Replace NVDA's 2024 Q1 call and add a new company
+            replacement = self.embeddings[:2] + 0.5
+            new = self.rng.standard_normal((3, DIMENSION)).astype(np.float32)
+            append_to_index(root / "appended", [
+                ("NVDA_2024_Q1", replacement, nvda * 2),
+                ("INTC_2024_Q1", new, intc * 3),
+            ])
+            kept = [row for row, entry in enumerate(self.metadata)
+                    if (entry["ticker"], entry["year"], entry["q"]) != ("NVDA", 2024, 1)]
+            rebuilt_metadata = [self.metadata[row] for row in kept] + nvda * 2 + intc * 3
+            create_and_save_index(np.vstack([self.embeddings[kept], replacement, new]), rebuilt_metadata, root / "rebuilt")
+
+            appended, rebuilt = FaissRetriever(), FaissRetriever()
+            appended.load_index(root / "appended")
+            rebuilt.load_index(root / "rebuilt")
+
+        for ticker in ("NVDA", "AMD", "INTC"):
+            for ours, expected in zip(appended.peers(ticker, k=4), rebuilt.peers(ticker, k=4)):
+                self.assertEqual(ours["ticker"], expected["ticker"])
+                self.assertEqual(ours["entries"], expected["entries"])
+                self.assertAlmostEqual(ours["similarity"], expected["similarity"], places=5)
+        np.testing.assert_allclose(
+            [entry["similarity_to_previous"] or 0 for entry in appended.quarter_trend("NVDA")],
+            [entry["similarity_to_previous"] or 0 for entry in rebuilt.quarter_trend("NVDA")], atol=1e-5,
+        )
+
+if __name__ == '__main__':
+    unittest.main()
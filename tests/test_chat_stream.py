@@ -0,0 +1,63 @@
+import asyncio
+import os
+import unittest
+from unittest.mock import patch
+from fioneer.config import get_settings
+from fioneer.llm import openai_client
+from fioneer.testing import MockOpenAIServer
+
+MESSAGES = [
+    {"role": "system", "content": "Summarize this earnings call answer."},
+    {"role": "user", "content": "Revenue grew 12% on strong services demand. Margins expanded. Guidance was raised."},
+]
+
+class TestChatCompletionStream(unittest.TestCase):
+    def setUp(self):
+        self.server = MockOpenAIServer(stream_token_interval_ms=1).start()
+        env = {
+            "OPENAI_BASE_URL": self.server.base_url,
+            "OPENAI_API_KEY": "mock",
+            "NINJA_API_KEY": "mock",
+            "HF_WRITE_TOKEN": "mock",
+            "HF_READ_TOKEN": "mock",
+        }
+        self.env = patch.dict(os.environ, env)
+        self.env.start()
+        get_settings.cache_clear()
+        openai_client.get_async_openai_client.cache_clear()
+        openai_client.get_openai_client.cache_clear()
+
+    def tearDown(self):
+        openai_client.get_async_openai_client.cache_clear()
+        openai_client.get_openai_client.cache_clear()
+        get_settings.cache_clear()
+        self.env.stop()
+        self.server.stop()
+
+    def test_stream_matches_blocking_completion(self):
+        async def run():
+            tokens = [token async for token in openai_client.chat_completion_stream(MESSAGES)]
+            blocking = await openai_client.chat_completion(MESSAGES)
+            return tokens, blocking
+
+        tokens_before = openai_client.TOKENS_TOTAL.value(endpoint="chat_stream", model="gpt-3.5-turbo", kind="completion")
+        tokens, blocking = asyncio.run(run())
+        self.assertGreater(len(tokens), 1)
+        self.assertEqual("".join(tokens), blocking)
+        tokens_after = openai_client.TOKENS_TOTAL.value(endpoint="chat_stream", model="gpt-3.5-turbo", kind="completion")
+        self.assertGreater(tokens_after, tokens_before)
+
+    def test_closing_the_stream_early_is_recorded_as_cancelled(self):
+        async def run():
+            stream = openai_client.chat_completion_stream(MESSAGES)
+            first = await stream.__anext__()
+            await stream.aclose()
+            return first
+
+        cancelled_before = openai_client.REQUESTS_TOTAL.value(endpoint="chat_stream", model="gpt-3.5-turbo", status="cancelled")
+        self.assertTrue(asyncio.run(run()))
+        cancelled_after = openai_client.REQUESTS_TOTAL.value(endpoint="chat_stream", model="gpt-3.5-turbo", status="cancelled")
+        self.assertEqual(cancelled_after, cancelled_before + 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,49 @@
+import os
+import subprocess
+import sys
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+from fioneer.config import Settings
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+# Dependencies that must only load when a code path actually needs them
+HEAVY_MODULES = ("faiss", "numpy", "openai", "tqdm", "pydantic_settings")
+
+# Cumulative import time allowed for the retrieval entry point, in seconds
+IMPORT_BUDGET_SECONDS = 0.5
+
+def import_times(module: str) -> dict:
+    """Cumulative import time in seconds per module, from python -X importtime"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=REPO_ROOT,
+        env={**os.environ, "PYTHONPATH": str(REPO_ROOT)},
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        times[name.strip()] = int(cumulative) / 1e6
+    return times
+
+class TestColdStart(unittest.TestCase):
+    def test_retriever_import_is_lazy(self):
+        times = import_times("fioneer.retrieval.faiss_retriever")
+        self.assertEqual([m for m in HEAVY_MODULES if m in times], [])
+        self.assertLess(times["fioneer.retrieval.faiss_retriever"], IMPORT_BUDGET_SECONDS)
+
+    def test_credentials_are_validated_on_use(self):
+        with patch.dict(os.environ, {"OPENAI_API_KEY": "sk-test"}, clear=True):
+            settings = Settings()
+        self.assertEqual(settings.require("openai_api_key"), "sk-test")
+        with self.assertRaisesRegex(ValueError, "NINJA_API_KEY"):
+            settings.require("ninja_api_key")
+
+if __name__ == '__main__':
+    unittest.main()
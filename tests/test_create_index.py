@@ -0,0 +1,163 @@
+import json
+import tempfile
+import unittest
+from pathlib import Path
+import faiss
+import numpy as np
+from fioneer.retrieval.bundles import bundle_dir
+from fioneer.retrieval.faiss_retriever import FaissRetriever
+from scripts.create_index import append_to_index, collapse_near_duplicates, create_and_save_index, partition_rows
+
+def entry(ticker: str, q: int) -> dict:
+    return {
+        "ticker": ticker,
+        "year": 2024,
+        "q": q,
+        "date": f"2024-0{q}-01",
+        "question_summary": f"{ticker} guidance Q{q}",
+    }
+
+class TestNearDuplicateCollapsing(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        base = rng.standard_normal((3, 32)).astype(np.float32)
+        # Rows 0, 2 and 4 repeat the same guidance with tiny perturbations
+        self.embeddings = np.vstack([
+            base[0],
+            base[1],
+            base[0] + 0.01 * rng.standard_normal(32),
+            base[2],
+            base[0] + 0.01 * rng.standard_normal(32),
+        ]).astype(np.float32)
+        faiss.normalize_L2(self.embeddings)
+        self.metadata = [entry("AAPL", 1), entry("MSFT", 1), entry("AAPL", 2), entry("NVDA", 1), entry("AAPL", 3)]
+
+    def test_collapse_keeps_first_entry_of_each_cluster(self):
+        embeddings, metadata = collapse_near_duplicates(self.embeddings, self.metadata, threshold=0.95, batch_size=2)
+        self.assertEqual(embeddings.shape, (3, 32))
+        self.assertEqual([m["ticker"] for m in metadata], ["AAPL", "MSFT", "NVDA"])
+        self.assertEqual([(d["ticker"], d["q"]) for d in metadata[0]["duplicates"]], [("AAPL", 2), ("AAPL", 3)])
+        self.assertNotIn("duplicates", metadata[1])
+        self.assertNotIn("duplicates", self.metadata[0])
+
+    def test_index_build_records_dedup_in_manifest(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            output_dir = Path(tmp)
+            create_and_save_index(self.embeddings, self.metadata, output_dir, dedup_threshold=0.95)
+            manifest = json.loads((output_dir / "manifest.json").read_text())
+            metadata = json.loads((output_dir / "metadata.json").read_text())
+            index = faiss.read_index(str(output_dir / "earnings.index"))
+        self.assertEqual((manifest["ntotal"], manifest["source_entries"]), (3, 5))
+        self.assertEqual(index.ntotal, len(metadata))
+
+class TestShardedIndex(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(1)
+        self.embeddings = rng.standard_normal((60, 16)).astype(np.float32)
+        faiss.normalize_L2(self.embeddings)
+        self.metadata = [
+            {**entry(ticker, q), "year": year, "sector": sector}
+            for year in (2023, 2024)
+            for ticker, sector in (("AAPL", "Technology"), ("MSFT", "Technology"), ("XOM", "Energy"))
+            for q in range(1, 5)
+            for _ in range(2)
+        ]
+        self.embeddings = self.embeddings[:len(self.metadata)]
+
+    def test_partitions_cover_every_row_once(self):
+        for partition in ("hash", "sector", "year"):
+            shards = partition_rows(self.metadata, 3, partition)
+            self.assertEqual(sorted(np.concatenate(shards).tolist()), list(range(len(self.metadata))))
+        sector_shards = partition_rows(self.metadata, 2, "sector")
+        self.assertEqual({self.metadata[row]["sector"] for row in sector_shards[0]}, {"Technology"})
+
+    def test_sharded_search_matches_single_index(self):
+        queries = self.embeddings[:5]
+        with tempfile.TemporaryDirectory() as tmp:
+            single_dir, sharded_dir = Path(tmp) / "single", Path(tmp) / "sharded"
+            create_and_save_index(self.embeddings.copy(), self.metadata, single_dir)
+            create_and_save_index(self.embeddings.copy(), self.metadata, sharded_dir, n_shards=3, partition="year")
+            single, sharded = FaissRetriever(), FaissRetriever()
+            single.load_index(single_dir)
+            sharded.load_index(sharded_dir)
+
+        self.assertEqual((len(sharded.shards), sharded.index.ntotal), (3, len(self.metadata)))
+        expected = single.search_by_vectors(queries, k=4)
+        actual = sharded.search_by_vectors(queries, k=4)
+        for want, got in zip(expected, actual):
+            self.assertEqual([r["metadata"] for r in got], [r["metadata"] for r in want])
+
+class TestAppendToIndex(unittest.TestCase):
+    def test_append_and_replace_sources(self):
+        rng = np.random.default_rng(2)
+        aapl, msft, aapl_new = (rng.standard_normal((n, 8)).astype(np.float32) for n in (3, 2, 4))
+        with tempfile.TemporaryDirectory() as tmp:
+            output_dir = Path(tmp)
+            append_to_index(output_dir, [("AAPL_2024_Q1", aapl, [entry("AAPL", 1)] * 3)])
+            append_to_index(output_dir, [("MSFT_2024_Q1", msft, [entry("MSFT", 1)] * 2)])
+            # Re-extracted transcript: its old rows are dropped and the new ones appended
+            ntotal = append_to_index(output_dir, [("AAPL_2024_Q1", aapl_new, [entry("AAPL", 1)] * 4)])
+
+            retriever = FaissRetriever()
+            retriever.load_index(output_dir)
+
+        self.assertEqual(ntotal, 6)
+        self.assertEqual([m["ticker"] for m in retriever.metadata], ["MSFT"] * 2 + ["AAPL"] * 4)
+        results = retriever.search_by_vectors(aapl_new[:1], k=1)[0]
+        self.assertEqual(results[0]["metadata"]["ticker"], "AAPL")
+        self.assertAlmostEqual(results[0]["similarity"], 1.0, places=5)
+
+class TestMetadataFormat(unittest.TestCase):
+    def test_binary_metadata_replaces_json_and_loads(self):
+        rng = np.random.default_rng(3)
+        embeddings = rng.standard_normal((4, 8)).astype(np.float32)
+        metadata = [entry("AAPL", q) for q in range(1, 5)]
+        with tempfile.TemporaryDirectory() as tmp:
+            output_dir = Path(tmp)
+            create_and_save_index(embeddings, metadata, output_dir)
+            create_and_save_index(embeddings, metadata, output_dir, metadata_format="json.gz")
+            append_to_index(output_dir, [("MSFT_2024_Q1", embeddings[:1], [entry("MSFT", 1)])])
+            # Appending publishes a new version next to the unversioned index
+            manifest = json.loads((bundle_dir(output_dir) / "manifest.json").read_text())
+            files = sorted(path.name for path in bundle_dir(output_dir).glob("metadata*"))
+
+            retriever = FaissRetriever()
+            retriever.load_index(output_dir)
+
+        self.assertEqual(manifest["metadata_file"], "metadata.json.gz")
+        self.assertEqual(files, ["metadata.json.gz"])
+        self.assertEqual([m["ticker"] for m in retriever.metadata], ["AAPL"] * 4 + ["MSFT"])
+
+class TestReducedIndex(unittest.TestCase):
+    def test_reduced_search_reranks_at_full_precision(self):
+        rng = np.random.default_rng(4)
+        # Vectors in a 6-dimensional subspace of 32 dimensions, so 8 PCA components keep all the signal
+        embeddings = (rng.standard_normal((300, 6)) @ rng.standard_normal((6, 32))).astype(np.float32)
+        embeddings += 0.01 * rng.standard_normal((300, 32)).astype(np.float32)
+        metadata = [{"row": i} for i in range(len(embeddings))]
+        queries = embeddings[:20] + 0.05 * rng.standard_normal((20, 32)).astype(np.float32)
+        with tempfile.TemporaryDirectory() as tmp:
+            flat_dir, reduced_dir = Path(tmp) / "flat", Path(tmp) / "reduced"
+            create_and_save_index(embeddings, metadata, flat_dir)
+            create_and_save_index(embeddings, metadata, reduced_dir, reduce_dim=8, rerank_factor=3)
+            manifest = json.loads((reduced_dir / "manifest.json").read_text())
+            self.assertEqual(faiss.read_index(str(reduced_dir / "earnings.index")).d, 32)
+
+            exact, reduced = FaissRetriever(), FaissRetriever()
+            exact.load_index(flat_dir)
+            reduced.load_index(reduced_dir)
+            self.assertIsInstance(reduced.full_vectors, np.memmap)
+            expected = exact.search_by_vectors(queries, k=5)
+            actual = reduced.search_by_vectors(queries, k=5)
+            with self.assertRaises(ValueError):
+                append_to_index(reduced_dir, [("AAPL_2024_Q1", embeddings[:1], [entry("AAPL", 1)])])
+            del reduced
+
+        self.assertEqual((manifest["reduce_dim"], manifest["rerank_factor"]), (8, 3))
+        for want, got in zip(expected, actual):
+            self.assertEqual([r["metadata"] for r in got], [r["metadata"] for r in want])
+            # Reranked similarities are exact inner products, not projected ones
+            np.testing.assert_allclose([r["similarity"] for r in got], [r["similarity"] for r in want], rtol=1e-5)
+
+if __name__ == '__main__':
+    unittest.main()
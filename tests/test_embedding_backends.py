@@ -0,0 +1,168 @@
+import asyncio
+import importlib.util
+import tempfile
+import threading
+import unittest
+import zlib
+from pathlib import Path
+from typing import List
+import numpy as np
+from fioneer import serialization
+from fioneer.embeddings.backends import BACKENDS, EmbeddingBackend, LocalBackend, OpenAIBackend, create_backend
+from fioneer.embeddings.store import EmbeddingStore
+from fioneer.embeddings.vectorizer import generate_and_save_embeddings
+from fioneer.retrieval.faiss_retriever import FaissRetriever
+from scripts.create_index import append_to_index, create_and_save_index, load_metadata_and_embeddings, publish_index
+
+DIMENSION = 8
+
+class HashBackend(EmbeddingBackend):
+    """Deterministic offline backend: each text maps to a fixed random vector"""
+
+    name = "hash"
+
+    def __init__(self, model: str = "crc32"):
+        super().__init__(model)
+        self.closed = False
+
+    async def embed(self, texts: List[str]) -> np.ndarray:
+        return np.stack([
+            np.random.default_rng(zlib.crc32(text.encode())).standard_normal(DIMENSION) for text in texts
+        ]).astype(np.float32)
+
+    def close(self) -> None:
+        self.closed = True
+
+class FakeModel:
+    """Stands in for a SentenceTransformer: the vector is [len(text), 0]"""
+
+    def encode(self, texts, batch_size, normalize_embeddings, convert_to_numpy):
+        return np.array([[len(text), 0] for text in texts], dtype=np.float64)
+
+class FakeLocalBackend(LocalBackend):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.loaded_on = []
+
+    def load_model(self):
+        self.loaded_on.append(threading.get_ident())
+        return FakeModel()
+
+def entry(ticker: str, insight: str) -> dict:
+    return {
+        "company": f"{ticker} Inc.", "country": "US", "ticker": ticker, "date": "2024-05-01", "year": 2024, "q": 1,
+        "sector": "Tech", "industry": "Software", "q_speaker": "Analyst", "a_speaker": "CEO",
+        "question_summary": "q", "answer_summary": "a", "insight": insight, "reasoning_steps": ["r"],
+    }
+
+class TestEmbeddingBackends(unittest.TestCase):
+    def setUp(self):
+        BACKENDS["hash"] = HashBackend
+        self.addCleanup(BACKENDS.pop, "hash")
+
+    def test_create_backend_from_spec(self):
+        self.assertEqual(create_backend().spec(), OpenAIBackend().spec())
+        local = create_backend({"backend": "local", "model": "/models/minilm", "runtime": "onnx", "dimension": 384}, workers=2)
+        self.assertEqual(local.spec(), {"backend": "local", "model": "/models/minilm", "runtime": "onnx"})
+        self.assertEqual(local.workers, 2)
+        with self.assertRaises(ValueError):
+            create_backend({"backend": "nope", "model": "x"})
+
+    def test_local_backend_batches_across_workers(self):
+        backend = FakeLocalBackend("fake", workers=3, batch_size=2)
+        texts = ["a" * n for n in range(1, 12)]
+        backend.warm()
+        vectors = asyncio.run(backend.embed(texts))
+        self.assertEqual(vectors.dtype, np.float32)
+        # Order is preserved across batches, and every worker loaded its own model
+        self.assertEqual(vectors[:, 0].tolist(), list(range(1, 12)))
+        self.assertEqual(len(set(backend.loaded_on)), 3)
+        self.assertEqual(len(backend.loaded_on), 3)
+
+    def test_failed_load_does_not_hang_warm(self):
+        class BrokenBackend(FakeLocalBackend):
+            def load_model(self):
+                if not self.loaded_on:
+                    self.loaded_on.append(threading.get_ident())
+                    raise MemoryError("model does not fit")
+                return super().load_model()
+
+        with self.assertRaises(MemoryError):
+            BrokenBackend("fake", workers=3).warm(timeout=5)
+
+    def test_closed_local_backend_stops_its_workers(self):
+        backend = FakeLocalBackend("fake", workers=2)
+        self.assertEqual(len(asyncio.run(backend.embed(["a", "bb"]))), 2)
+        backend.close()
+        with self.assertRaises(RuntimeError):
+            asyncio.run(backend.embed(["a"]))
+
+    def test_reload_closes_the_replaced_query_backend(self):
+        vectors = np.random.default_rng(0).standard_normal((2, DIMENSION)).astype(np.float32)
+        metadata = [entry("AAPL", "a"), entry("NVDA", "b")]
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            publish_index(vectors, metadata, root, embedding={"backend": "hash", "model": "v1"})
+            retriever = FaissRetriever()
+            retriever.load_index(root)
+            first = retriever.embedding_generator.backend
+            publish_index(vectors, metadata, root, embedding={"backend": "hash", "model": "v1"})
+            self.assertTrue(asyncio.run(retriever.reload_if_changed(root)))
+            # Same backend spec: the embedder is kept
+            self.assertIs(retriever.embedding_generator.backend, first)
+            self.assertFalse(first.closed)
+            publish_index(vectors, metadata, root, embedding={"backend": "hash", "model": "v2"})
+            self.assertTrue(asyncio.run(retriever.reload_if_changed(root)))
+
+        self.assertTrue(first.closed)
+        self.assertEqual(retriever.embedding_generator.backend.model, "v2")
+        self.assertFalse(retriever.embedding_generator.backend.closed)
+
+    @unittest.skipIf(importlib.util.find_spec("sentence_transformers"), "sentence-transformers is installed")
+    def test_local_backend_explains_missing_dependency(self):
+        with self.assertRaisesRegex(ImportError, "local-embeddings"):
+            asyncio.run(LocalBackend("/models/minilm").embed(["revenue"]))
+
+    def test_backend_recorded_from_store_to_index_to_queries(self):
+        entries = [entry("AAPL", "services growth"), entry("NVDA", "data center demand")]
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            metadata_dir = root / "metadata"
+            metadata_dir.mkdir()
+            serialization.save(entries, metadata_dir / "MIX_2024_Q1.json")
+            asyncio.run(generate_and_save_embeddings(metadata_dir=metadata_dir, embeddings_dir=root / "embeddings",
+                                                     backend=HashBackend()))
+            store = EmbeddingStore(root / "embeddings")
+            self.assertEqual(store.embedding, {"backend": "hash", "model": "crc32"})
+            with self.assertRaises(ValueError):
+                store.set_embedding(OpenAIBackend().spec())
+            # A store from before backends were recorded holds OpenAI embeddings
+            legacy = EmbeddingStore(root / "legacy")
+            self.assertIsNone(legacy.embedding)
+            legacy.append("MIX_2024_Q1", np.ones((1, DIMENSION)), "hash")
+            self.assertEqual(legacy.embedding, OpenAIBackend().spec())
+            with self.assertRaises(ValueError):
+                legacy.set_embedding(HashBackend().spec())
+
+            metadata, embeddings = load_metadata_and_embeddings(metadata_dir, root / "embeddings")
+            create_and_save_index(embeddings, metadata, root / "index", embedding=store.embedding)
+            with self.assertRaises(ValueError):
+                append_to_index(root / "index", [("X_2024_Q1", embeddings[:1], metadata[:1])],
+                                embedding=OpenAIBackend().spec())
+
+            retriever = FaissRetriever()
+            retriever.load_index(root / "index")
+            pinned = FaissRetriever(backend=OpenAIBackend())
+            pinned.load_index(root / "index")
+
+        self.assertIsInstance(retriever.embedding_generator.backend, HashBackend)
+        self.assertIsNone(retriever.embedding_generator.hedging)
+        # The query text of an entry embeds to exactly that entry's vector
+        query = retriever.embedding_generator.format_text(entries[1])
+        results = asyncio.run(retriever.search_similar(query, k=1))
+        self.assertEqual(results[0]["metadata"]["ticker"], "NVDA")
+        self.assertAlmostEqual(results[0]["similarity"], 1.0, places=5)
+        self.assertIsInstance(pinned.embedding_generator.backend, OpenAIBackend)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,122 @@
+import tempfile
+import unittest
+from pathlib import Path
+import numpy as np
+from fioneer.embeddings.quantization import save_embeddings
+from fioneer import serialization
+from fioneer.embeddings.store import EmbeddingStore, migrate_legacy_files
+from fioneer.hub.manifest import file_sha256
+from scripts.create_index import load_metadata_and_embeddings
+
+class TestEmbeddingStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name) / "embeddings"
+        self.rng = np.random.default_rng(0)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def vectors(self, n: int) -> np.ndarray:
+        return self.rng.standard_normal((n, 16)).astype(np.float32)
+
+    def test_append_and_reopen(self):
+        store = EmbeddingStore(self.root, shard_rows=5)
+        a, b, c = self.vectors(3), self.vectors(2), self.vectors(4)
+        store.append("AAPL_2024_Q1", a, "hash-a")
+        store.append("AAPL_2024_Q2", b, "hash-b")
+        store.append("MSFT_2024_Q1", c, "hash-c")
+
+        # An entry never spans shards, so the third append opens a new shard
+        self.assertEqual(len(store.manifest["shards"]), 2)
+
+        reopened = EmbeddingStore(self.root)
+        self.assertEqual(reopened.sources(), ["AAPL_2024_Q1", "AAPL_2024_Q2", "MSFT_2024_Q1"])
+        self.assertEqual(reopened.content_hash("AAPL_2024_Q2"), "hash-b")
+        np.testing.assert_array_equal(reopened.get("MSFT_2024_Q1"), c)
+        np.testing.assert_array_equal(reopened.load(), np.vstack([a, b, c]))
+
+    def test_reappend_replaces_entry_and_compacts(self):
+        store = EmbeddingStore(self.root)
+        store.append("AAPL_2024_Q1", self.vectors(3), "old")
+        new = self.vectors(2)
+        store.append("AAPL_2024_Q1", new, "new")
+        self.assertEqual((store.live_rows, store.total_rows), (2, 5))
+
+        store.compact()
+        self.assertEqual((store.live_rows, store.total_rows), (2, 2))
+        np.testing.assert_array_equal(EmbeddingStore(self.root).get("AAPL_2024_Q1"), new)
+
+    def test_interrupted_compaction_keeps_store(self):
+        store = EmbeddingStore(self.root, dtype="int8", shard_rows=4)
+        a, b = self.vectors(3), self.vectors(3)
+        store.append("AAPL_2024_Q1", a, "a")
+        store.append("AAPL_2024_Q2", b, "b")
+        store.append("AAPL_2024_Q1", a, "a2")
+        expected = EmbeddingStore(self.root).load()
+
+        # Crash after the first source has been copied into the new shards
+        write_rows = store._write_rows
+        calls = []
+        def crash_on_second_copy(*args):
+            calls.append(args)
+            if len(calls) == 2:
+                raise OSError("disk full")
+            return write_rows(*args)
+        store._write_rows = crash_on_second_copy
+        with self.assertRaises(OSError):
+            store.compact()
+        np.testing.assert_array_equal(EmbeddingStore(self.root).load(), expected)
+
+        store = EmbeddingStore(self.root)
+        store.compact()
+        self.assertEqual((store.live_rows, store.total_rows), (6, 6))
+        # Codes are copied as they are, not re-quantized
+        np.testing.assert_array_equal(EmbeddingStore(self.root).load(), expected)
+        live = {path.name for path in store.files()}
+        self.assertEqual({path.name for path in self.root.iterdir()}, live)
+
+    def test_interrupted_append_is_discarded(self):
+        store = EmbeddingStore(self.root)
+        store.append("AAPL_2024_Q1", self.vectors(2), "a")
+        # Simulate a crash after writing rows but before the manifest update
+        with open(self.root / "shard-00000.bin", "ab") as f:
+            f.write(b"\x00" * 100)
+        b = self.vectors(1)
+        store = EmbeddingStore(self.root)
+        store.append("AAPL_2024_Q2", b, "b")
+        np.testing.assert_array_equal(store.get("AAPL_2024_Q2"), b)
+
+    def test_int8_store(self):
+        store = EmbeddingStore(self.root, dtype="int8")
+        a = self.vectors(4)
+        store.append("AAPL_2024_Q1", a, "a")
+        np.testing.assert_allclose(EmbeddingStore(self.root).get("AAPL_2024_Q1"), a, atol=0.05)
+        with self.assertRaises(ValueError):
+            EmbeddingStore(self.root, dtype="float16")
+
+    def test_migrate_legacy_files(self):
+        self.root.mkdir(parents=True)
+        a = self.vectors(3)
+        save_embeddings(self.root, "AAPL_2024_Q1", a, "float32")
+        self.assertEqual(migrate_legacy_files(self.root, Path(self.tmp.name)), 1)
+        self.assertFalse((self.root / "AAPL_2024_Q1.npy").exists())
+        np.testing.assert_array_equal(EmbeddingStore(self.root).get("AAPL_2024_Q1"), a)
+
+    def test_index_skips_sources_with_stale_embeddings(self):
+        metadata_dir = Path(self.tmp.name) / "metadata"
+        metadata_dir.mkdir()
+        store = EmbeddingStore(self.root)
+        for source, n in (("AAPL_2024_Q1", 3), ("MSFT_2024_Q1", 2)):
+            path = metadata_dir / f"{source}.json"
+            serialization.save([{"id": f"{source}-{i}"} for i in range(n)], path)
+            store.append(source, self.vectors(n), file_sha256(path))
+        # Re-extracted with one more entry, but the embeddings were not regenerated
+        serialization.save([{"id": f"AAPL_2024_Q1-{i}"} for i in range(4)], metadata_dir / "AAPL_2024_Q1.json")
+
+        metadata, embeddings = load_metadata_and_embeddings(metadata_dir, self.root)
+        self.assertEqual([m["id"] for m in metadata], ["MSFT_2024_Q1-0", "MSFT_2024_Q1-1"])
+        np.testing.assert_array_equal(embeddings, store.get("MSFT_2024_Q1"))
+
+if __name__ == '__main__':
+    unittest.main()
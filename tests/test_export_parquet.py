@@ -0,0 +1,80 @@
+import importlib.util
+import tempfile
+import unittest
+from pathlib import Path
+import numpy as np
+from fioneer import serialization
+from fioneer.embeddings.store import EmbeddingStore
+
+# pyarrow comes with the optional parquet extra
+HAS_PYARROW = importlib.util.find_spec("pyarrow") is not None
+
+def entries(ticker: str, year: int, q: int, sector: str, n: int) -> list:
+    return [{
+        "company": f"{ticker} Inc.", "country": "United States", "ticker": ticker, "date": f"{year}-0{q}-15",
+        "year": year, "q": q, "sector": sector, "industry": "Software", "q_speaker": "Analyst",
+        "a_speaker": "CFO", "question_summary": f"Question {i}", "answer_summary": f"Answer {i}",
+        "insight": f"{ticker} insight {i}", "reasoning_steps": ["a", "b"],
+    } for i in range(n)]
+
+@unittest.skipUnless(HAS_PYARROW, "pyarrow is not installed")
+class TestExportParquet(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        root = Path(self.tmp.name)
+        self.metadata_dir = root / "metadata"
+        self.metadata_dir.mkdir()
+        self.embeddings_dir = root / "embeddings"
+        self.output_dir = root / "parquet"
+        store = EmbeddingStore(self.embeddings_dir)
+        self.vectors = {}
+        for source, items in (
+            ("AAPL_2024_Q3", entries("AAPL", 2024, 3, "Technology", 3)),
+            ("XOM_2024_Q3", entries("XOM", 2024, 3, "Energy", 2)),
+            ("AAPL_2023_Q1", entries("AAPL", 2023, 1, "Technology", 1)),
+        ):
+            serialization.save(items, self.metadata_dir / f"{source}.json")
+            self.vectors[source] = np.random.default_rng(len(items)).standard_normal((len(items), 8)).astype(np.float32)
+            store.append(source, self.vectors[source], source)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_partitions_prune_and_keep_statistics(self):
+        import pyarrow.dataset as ds
+        import pyarrow.parquet as pq
+        from scripts.export_parquet import export_parquet
+
+        self.assertEqual(export_parquet(self.metadata_dir, self.output_dir), 6)
+        self.assertTrue((self.output_dir / "year=2024" / "q=3" / "sector=Technology").is_dir())
+
+        dataset = ds.dataset(self.output_dir, format="parquet", partitioning="hive")
+        selected = dataset.to_table(
+            columns=["ticker", "insight"],
+            filter=(ds.field("year") == 2024) & (ds.field("q") == 3) & (ds.field("sector") == "Technology"),
+        )
+        self.assertEqual(selected.column("ticker").to_pylist(), ["AAPL"] * 3)
+        self.assertNotIn("embedding", dataset.schema.names)
+
+        part = next(self.output_dir.rglob("*.parquet"))
+        stats = pq.ParquetFile(part).metadata.row_group(0).column(0).statistics
+        self.assertTrue(stats.has_min_max)
+
+    def test_embedding_column_and_rerun_replaces_dataset(self):
+        import pyarrow.dataset as ds
+        from scripts.export_parquet import export_parquet
+
+        export_parquet(self.metadata_dir, self.output_dir)
+        (self.metadata_dir / "XOM_2024_Q3.json").unlink()
+        rows = export_parquet(self.metadata_dir, self.output_dir, embeddings_dir=self.embeddings_dir)
+
+        table = ds.dataset(self.output_dir, partitioning="hive").to_table(filter=ds.field("source") == "AAPL_2024_Q3")
+        self.assertEqual(rows, 4)
+        self.assertFalse((self.output_dir / "year=2024" / "q=3" / "sector=Energy").exists())
+        self.assertEqual(sorted(path.name for path in self.output_dir.parent.glob("parquet*")), ["parquet"])
+        self.assertEqual(table.schema.field("embedding").type.list_size, 8)
+        embeddings = np.array(table.sort_by("row").column("embedding").to_pylist(), dtype=np.float32)
+        np.testing.assert_array_equal(embeddings, self.vectors["AAPL_2024_Q3"])
+
+if __name__ == "__main__":
+    unittest.main()
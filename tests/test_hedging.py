@@ -0,0 +1,88 @@
+import asyncio
+import gc
+import unittest
+from unittest.mock import patch
+from fioneer.embeddings.hedging import HedgingPolicy
+from fioneer.embeddings.vectorizer import EmbeddingGenerator, HEDGE_CALLS_TOTAL, HEDGE_SAVED_SECONDS
+
+def scripted_embeddings(delays, failures=()):
+    """Fake create_embeddings whose n-th call takes delays[n] seconds, and fails if n is in failures"""
+    calls = []
+
+    async def create_embeddings(texts, model):
+        n = len(calls)
+        calls.append(n)
+        await asyncio.sleep(delays[n])
+        if n in failures:
+            raise ConnectionError(f"call {n} failed")
+        return [[float(n)] for _ in texts]
+
+    return create_embeddings, calls
+
+class TestHedgingPolicy(unittest.TestCase):
+    def test_delay_tracks_percentile(self):
+        policy = HedgingPolicy(percentile=90, initial_delay_ms=300, min_delay_ms=1, min_samples=10)
+        self.assertEqual(policy.delay(), 0.3)
+        for ms in range(1, 101):
+            policy.observe(ms / 1000)
+        self.assertAlmostEqual(policy.delay(), 0.090, places=3)
+
+    def test_delay_is_clipped(self):
+        policy = HedgingPolicy(min_delay_ms=50, max_delay_ms=200, min_samples=1)
+        policy.observe(0.001)
+        self.assertEqual(policy.delay(), 0.05)
+        policy = HedgingPolicy(min_delay_ms=50, max_delay_ms=200, min_samples=1)
+        policy.observe(10.0)
+        self.assertEqual(policy.delay(), 0.2)
+
+class TestHedgedEmbeddings(unittest.TestCase):
+    def run_query(self, delays, settle=0.0, failures=()):
+        generator = EmbeddingGenerator(hedging=HedgingPolicy(initial_delay_ms=50))
+        fake, calls = scripted_embeddings(delays, failures)
+        self.loop_errors = []
+
+        async def query():
+            asyncio.get_running_loop().set_exception_handler(lambda loop, context: self.loop_errors.append(context))
+            result = await generator.generate_embedding("revenue guidance")
+            # Let the abandoned call finish so its latency is recorded
+            await asyncio.sleep(settle)
+            gc.collect()
+            return result
+
+        with patch("fioneer.embeddings.backends.create_embeddings", fake):
+            result = asyncio.run(query())
+        return result, calls, generator
+
+    def test_fast_primary_is_not_hedged(self):
+        before = HEDGE_CALLS_TOTAL.value(outcome="unhedged")
+        result, calls, generator = self.run_query([0.01])
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(result[0][0], 0.0)
+        self.assertEqual(HEDGE_CALLS_TOTAL.value(outcome="unhedged"), before + 1)
+        self.assertEqual(len(generator.hedging.latencies), 1)
+
+    def test_backup_beats_slow_primary(self):
+        before = HEDGE_CALLS_TOTAL.value(outcome="backup_won")
+        saved_before = HEDGE_SAVED_SECONDS.value()
+        result, calls, generator = self.run_query([0.5, 0.01], settle=0.6)
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(result[0][0], 1.0)
+        self.assertEqual(HEDGE_CALLS_TOTAL.value(outcome="backup_won"), before + 1)
+        self.assertGreater(HEDGE_SAVED_SECONDS.value() - saved_before, 0.3)
+        self.assertEqual(generator.abandoned, set())
+
+    def test_primary_can_still_win(self):
+        before = HEDGE_CALLS_TOTAL.value(outcome="primary_won")
+        result, calls, _ = self.run_query([0.08, 0.5])
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(result[0][0], 0.0)
+        self.assertEqual(HEDGE_CALLS_TOTAL.value(outcome="primary_won"), before + 1)
+
+    def test_abandoned_backup_failure_is_retrieved(self):
+        result, calls, generator = self.run_query([0.08, 0.2], settle=0.3, failures={1})
+        self.assertEqual(result[0][0], 0.0)
+        self.assertEqual(generator.abandoned, set())
+        self.assertEqual(self.loop_errors, [])
+
+if __name__ == "__main__":
+    unittest.main()
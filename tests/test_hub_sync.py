@@ -0,0 +1,68 @@
+import tempfile
+import unittest
+from pathlib import Path
+from fioneer.hub import LocalDirBackend, collect_files, sync_to_hub
+
+class FlakyBackend(LocalDirBackend):
+    """Local backend that fails the first upload containing a given file"""
+
+    def __init__(self, root: Path, fail_on: str):
+        super().__init__(root)
+        self.fail_on = fail_on
+        self.uploaded_paths = []
+
+    def upload_files(self, files):
+        if self.fail_on and any(repo_path == self.fail_on for _, repo_path in files):
+            self.fail_on = None
+            raise RuntimeError("connection reset")
+        super().upload_files(files)
+        self.uploaded_paths.extend(repo_path for _, repo_path in files)
+
+class TestHubSync(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        root = Path(self.tmp.name)
+        self.local_dir = root / "local"
+        self.local_dir.mkdir()
+        for i in range(5):
+            (self.local_dir / f"file_{i}.npy").write_bytes(bytes([i]) * 100)
+        self.paths = [(str(self.local_dir), "embeddings")]
+        self.state_path = root / "state.json"
+        self.remote_dir = root / "remote"
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def sync(self, backend):
+        return sync_to_hub(backend, collect_files(self.paths), self.state_path, chunk_size=2, max_workers=2)
+
+    def test_only_changed_files_are_uploaded(self):
+        backend = FlakyBackend(self.remote_dir, fail_on=None)
+        summary = self.sync(backend)
+        self.assertEqual(summary["uploaded"], 5)
+        self.assertEqual((self.remote_dir / "embeddings" / "file_3.npy").read_bytes(), bytes([3]) * 100)
+
+        summary = self.sync(backend)
+        self.assertEqual(summary["uploaded"], 0)
+        self.assertEqual(summary["skipped"], 5)
+
+        # Same path, new content must be re-uploaded
+        (self.local_dir / "file_1.npy").write_bytes(b"regenerated")
+        backend.uploaded_paths = []
+        summary = self.sync(backend)
+        self.assertEqual(backend.uploaded_paths, ["embeddings/file_1.npy"])
+        self.assertEqual(summary["bytes"], len(b"regenerated"))
+
+    def test_failed_chunk_is_retried_on_next_sync(self):
+        backend = FlakyBackend(self.remote_dir, fail_on="embeddings/file_4.npy")
+        summary = self.sync(backend)
+        self.assertEqual(summary["failed_chunks"], 1)
+        self.assertEqual(summary["uploaded"], 4)
+
+        backend.uploaded_paths = []
+        summary = self.sync(backend)
+        self.assertEqual(backend.uploaded_paths, ["embeddings/file_4.npy"])
+        self.assertEqual(set(backend.read_manifest()), {f"embeddings/file_{i}.npy" for i in range(5)})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+import asyncio
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+import numpy as np
+from fioneer.retrieval.bundles import VERSIONS_DIR, bundle_dir, current_version
+from fioneer.retrieval.faiss_retriever import FaissRetriever
+from scripts.create_index import publish_index
+
+def vectors(seed: int, n: int = 6) -> np.ndarray:
+    return np.random.default_rng(seed).standard_normal((n, 8)).astype(np.float32)
+
+class TestIndexBundles(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def publish(self, seed: int, label: str, keep: int = 3) -> str:
+        return publish_index(vectors(seed), [{"label": label, "row": i} for i in range(6)], self.root, keep=keep)
+
+    def test_publish_writes_checksummed_versions_and_prunes(self):
+        versions = [self.publish(seed, f"v{seed}", keep=2) for seed in range(3)]
+        self.assertEqual(current_version(self.root), versions[-1])
+        self.assertEqual(sorted(p.name for p in (self.root / VERSIONS_DIR).iterdir()), versions[1:])
+
+        retriever = FaissRetriever()
+        retriever.load_index(self.root)
+        self.assertEqual(retriever.version, versions[-1])
+        self.assertEqual(retriever.metadata[0]["label"], "v2")
+
+    def test_hot_reload_swaps_new_version(self):
+        self.publish(0, "old")
+        retriever = FaissRetriever()
+        retriever.load_index(self.root)
+        in_flight = retriever.state
+
+        new = self.publish(1, "new")
+        self.assertTrue(asyncio.run(retriever.reload_if_changed(self.root)))
+        self.assertFalse(asyncio.run(retriever.reload_if_changed(self.root)))
+        self.assertEqual(retriever.version, new)
+        result = retriever.search_by_vectors(vectors(1)[:1], k=1)[0][0]
+        self.assertEqual(result["metadata"]["label"], "new")
+        # A search that started before the swap still sees a complete old version
+        self.assertEqual(in_flight.metadata[0]["label"], "old")
+        self.assertEqual(in_flight.index.ntotal, len(in_flight.metadata))
+
+    def test_reload_waits_for_a_load_in_flight(self):
+        version = self.publish(0, "only")
+        retriever = FaissRetriever()
+        read_index, started, release, reads = retriever.read_index, threading.Event(), threading.Event(), []
+
+        def slow_read_index(index_dir):
+            reads.append(index_dir)
+            started.set()
+            release.wait(5)
+            return read_index(index_dir)
+
+        retriever.read_index = slow_read_index
+        loader = threading.Thread(target=retriever.load_index, args=(self.root,))
+        loader.start()
+        started.wait(5)
+        # The startup load is still reading, so the poll must not start a second read of the same version
+        self.assertFalse(asyncio.run(retriever.reload_if_changed(self.root)))
+        release.set()
+        loader.join()
+        self.assertFalse(asyncio.run(retriever.reload_if_changed(self.root)))
+        self.assertEqual(len(reads), 1)
+        self.assertEqual(retriever.version, version)
+
+    def test_corrupt_version_is_rejected_and_old_one_kept(self):
+        old = self.publish(0, "old")
+        retriever = FaissRetriever()
+        retriever.load_index(self.root)
+
+        bad = self.publish(1, "bad")
+        with open(bundle_dir(self.root, bad) / "earnings.index", "r+b") as f:
+            f.seek(-4, 2)
+            f.write(b"\x00\x01\x02\x03")
+        self.assertFalse(asyncio.run(retriever.reload_if_changed(self.root)))
+        self.assertEqual((retriever.version, retriever.failed_version), (old, bad))
+        with self.assertRaises(ValueError):
+            FaissRetriever().load_index(self.root)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,50 @@
+import asyncio
+import unittest
+from fioneer.metrics import Histogram
+from scripts.load_test import bucket_quantile, bucket_stage_summary, run_load, synthetic_queries
+
+def scrape(histogram: Histogram) -> str:
+    return "\n".join(histogram.prometheus_lines())
+
+class TestLoadTest(unittest.TestCase):
+    def test_closed_and_open_loop(self):
+        calls = []
+
+        async def send(query):
+            calls.append(query["query"])
+            await asyncio.sleep(0.01)
+            if query["query"] == "bad":
+                raise RuntimeError("boom")
+
+        queries = [{"query": "good", "k": 5}] * 3 + [{"query": "bad", "k": 5}]
+        closed = asyncio.run(run_load(send, queries, duration=0.2, concurrency=4))
+        self.assertEqual(closed["requests"], len(calls))
+        self.assertEqual(closed["completed"] + closed["errors"]["RuntimeError"], closed["requests"])
+        self.assertAlmostEqual(closed["error_rate"], 0.25, delta=0.05)
+
+        calls.clear()
+        opened = asyncio.run(run_load(send, queries, duration=0.5, rate=100))
+        self.assertGreater(opened["requests"], 20)
+        self.assertGreaterEqual(opened["latency_ms"]["p50"], 10)
+
+    def test_stage_percentiles_from_scrapes(self):
+        histogram = Histogram("retrieval_stage_seconds", "", buckets=(0.01, 0.1, 1.0))
+        histogram.observe(5.0, stage="search")
+        before = scrape(histogram)
+        for _ in range(100):
+            histogram.observe(0.05, stage="search")
+        summary = bucket_stage_summary(before, scrape(histogram))
+        # Only the 100 observations between scrapes count; the median interpolates inside (0.01, 0.1]
+        self.assertEqual(summary["search"]["count"], 100)
+        self.assertAlmostEqual(summary["search"]["p50"], 55.0)
+        self.assertAlmostEqual(bucket_quantile(0.5, [(1.0, 0), (2.0, 4), (float("inf"), 4)]), 1.5)
+
+    def test_synthetic_queries_name_indexed_companies(self):
+        metadata = [{"company": "Apple Inc.", "year": 2024, "q": 3}]
+        queries = synthetic_queries(50, metadata, k=3)
+        self.assertEqual({query["k"] for query in queries}, {3})
+        self.assertTrue(any("Apple Inc." in query["query"] for query in queries))
+        self.assertEqual(queries, synthetic_queries(50, metadata, k=3))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+import asyncio
+import gc
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+import numpy as np
+from fioneer import serialization
+from fioneer.config import get_settings
+from fioneer.embeddings.store import EmbeddingStore
+from fioneer.embeddings.vectorizer import generate_and_save_embeddings
+from fioneer.llm import openai_client
+from fioneer.metrics.memory import PROFILES, MemoryProfile
+from fioneer.retrieval.faiss_retriever import FaissRetriever
+from fioneer.testing import MockOpenAIServer
+from scripts.create_index import create_and_save_index
+from scripts.serialization_benchmark import synthetic_corpus
+
+VECTORS = 50_000
+DIMENSION = 256
+
+# Peak RSS growth allowed per vector, in bytes, with extractor-shaped metadata (~1.2 KB of JSON
+# per entry) and 1 KB vectors. Measured: build ~2.4 KB (index copy + serialized metadata), load
+# ~6.5 KB (index + parsed metadata + the file being parsed), embedding ~10 KB (API responses).
+BUDGETS = {
+    "create_index": 4 * 1024,
+    "load_index": 9 * 1024,
+    "embeddings": 24 * 1024,
+}
+
+class TestMemoryProfile(unittest.TestCase):
+    def test_peak_includes_freed_memory(self):
+        with MemoryProfile("allocate") as outer:
+            with MemoryProfile("inner"):
+                block = np.ones(64 * 2 ** 20 // 8)
+            del block
+        self.assertGreater(outer.peak_growth, 48 * 2 ** 20)
+        self.assertLess(outer.retained, 32 * 2 ** 20)
+        self.assertGreaterEqual(PROFILES["inner"].peak_growth, 48 * 2 ** 20)
+
+class TestMemoryBudget(unittest.TestCase):
+    def assertWithinBudget(self, operation: str, items: int):
+        per_item = PROFILES[operation].peak_growth / items
+        self.assertLessEqual(per_item, BUDGETS[operation],
+                             f"{operation} peaked at {per_item:.0f} bytes per vector (budget {BUDGETS[operation]})")
+
+    def test_index_build_and_load(self):
+        entries = synthetic_corpus(2000)
+        metadata = [entries[i % len(entries)] for i in range(VECTORS)]
+        vectors = np.random.default_rng(0).standard_normal((VECTORS, DIMENSION), dtype=np.float32)
+        with tempfile.TemporaryDirectory() as tmp:
+            gc.collect()
+            create_and_save_index(vectors, metadata, Path(tmp))
+            del vectors, metadata
+            gc.collect()
+            FaissRetriever().load_index(Path(tmp))
+
+        self.assertWithinBudget("create_index", VECTORS)
+        self.assertWithinBudget("load_index", VECTORS)
+
+    def test_embeddings(self):
+        files, per_file = 4, 200
+        entries = synthetic_corpus(files * per_file)
+        with tempfile.TemporaryDirectory() as tmp, MockOpenAIServer(embedding_dimension=DIMENSION) as server:
+            metadata_dir = Path(tmp) / "metadata"
+            metadata_dir.mkdir()
+            for i in range(files):
+                serialization.save(entries[i * per_file:(i + 1) * per_file], metadata_dir / f"T{i}_2024_Q1.json")
+            with patch.dict(os.environ, {"OPENAI_BASE_URL": server.base_url, "OPENAI_API_KEY": "mock"}):
+                get_settings.cache_clear()
+                openai_client.get_openai_client.cache_clear()
+                openai_client.get_rate_limiter.cache_clear()
+                try:
+                    # Load the SDK outside the measured call
+                    openai_client.get_openai_client()
+                    asyncio.run(generate_and_save_embeddings(metadata_dir=metadata_dir, embeddings_dir=Path(tmp) / "embeddings"))
+                    rows = EmbeddingStore(Path(tmp) / "embeddings").live_rows
+                finally:
+                    openai_client.get_openai_client.cache_clear()
+                    openai_client.get_rate_limiter.cache_clear()
+                    get_settings.cache_clear()
+
+        self.assertEqual(rows, files * per_file)
+
+        self.assertWithinBudget("embeddings", files * per_file)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,50 @@
+import json
+import tempfile
+import unittest
+from pathlib import Path
+from fioneer.metrics import MetricsRegistry, timer
+
+class TestMetricsRegistry(unittest.TestCase):
+    def setUp(self):
+        self.registry = MetricsRegistry()
+
+    def test_counter(self):
+        requests = self.registry.counter("requests_total", "Requests")
+        requests.inc(endpoint="chat", status="ok")
+        requests.inc(2, endpoint="chat", status="ok")
+        requests.inc(endpoint="chat", status="error")
+        self.assertEqual(requests.value(endpoint="chat", status="ok"), 3)
+        self.assertIs(self.registry.counter("requests_total"), requests)
+        with self.assertRaises(ValueError):
+            self.registry.histogram("requests_total")
+
+    def test_histogram_prometheus_text(self):
+        latency = self.registry.histogram("latency_seconds", "Latency", buckets=(0.1, 1.0))
+        for value in (0.05, 0.5, 0.5, 2.0):
+            latency.observe(value, stage="search")
+        text = self.registry.to_prometheus()
+        self.assertIn("# TYPE latency_seconds histogram", text)
+        self.assertIn('latency_seconds_bucket{stage="search",le="0.1"} 1', text)
+        self.assertIn('latency_seconds_bucket{stage="search",le="1"} 3', text)
+        self.assertIn('latency_seconds_bucket{stage="search",le="+Inf"} 4', text)
+        self.assertIn('latency_seconds_count{stage="search"} 4', text)
+        self.assertEqual(latency.percentile(50, stage="search"), 0.5)
+
+    def test_timer_and_summary(self):
+        latency = self.registry.histogram("block_seconds")
+        with timer(latency, step="build"):
+            pass
+        self.assertEqual(latency.count(step="build"), 1)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = self.registry.write_summary(Path(tmp) / "run.json")
+            summary = json.loads(path.read_text())
+        series = summary["histograms"]["block_seconds"][0]
+        self.assertEqual(series["labels"], {"step": "build"})
+        self.assertEqual(series["count"], 1)
+
+        self.registry.reset()
+        self.assertEqual(latency.count(step="build"), 0)
+
+if __name__ == '__main__':
+    unittest.main()
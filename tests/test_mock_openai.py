@@ -0,0 +1,47 @@
+import json
+import unittest
+import urllib.error
+import urllib.request
+from fioneer.testing import MockOpenAIServer
+
+def post(server, path, body):
+    request = urllib.request.Request(
+        server.base_url + path,
+        data=json.dumps(body).encode("utf-8"),
+        headers={"Content-Type": "application/json"},
+    )
+    with urllib.request.urlopen(request) as response:
+        return json.loads(response.read()), response.headers
+
+class TestMockOpenAIServer(unittest.TestCase):
+    def test_embeddings_are_deterministic(self):
+        with MockOpenAIServer(embedding_dimension=8) as server:
+            first, _ = post(server, "/embeddings", {"input": ["a", "b"], "model": "m"})
+            second, _ = post(server, "/embeddings", {"input": ["a"], "model": "m"})
+        self.assertEqual(len(first["data"][0]["embedding"]), 8)
+        self.assertEqual(first["data"][0]["embedding"], second["data"][0]["embedding"])
+        self.assertNotEqual(first["data"][0]["embedding"], first["data"][1]["embedding"])
+
+    def test_chat_returns_qa_structure(self):
+        messages = [
+            {"role": "system", "content": 'Format: {"qa_pairs": [...]}'},
+            {"role": "user", "content": "Operator: Next question.\nJane Doe: Margins?\nJohn Roe: Up 2 points."},
+        ]
+        with MockOpenAIServer() as server:
+            payload, _ = post(server, "/chat/completions", {"messages": messages, "model": "m"})
+        qa = json.loads(payload["choices"][0]["message"]["content"])["qa_pairs"][0]
+        self.assertEqual((qa["q_speaker"], qa["a_speaker"]), ("Jane Doe", "John Roe"))
+        self.assertGreater(payload["usage"]["total_tokens"], 0)
+
+    def test_rate_limit(self):
+        with MockOpenAIServer(rpm_limit=2) as server:
+            _, headers = post(server, "/embeddings", {"input": "a"})
+            self.assertEqual(headers["x-ratelimit-remaining-requests"], "1")
+            post(server, "/embeddings", {"input": "a"})
+            with self.assertRaises(urllib.error.HTTPError) as context:
+                post(server, "/embeddings", {"input": "a"})
+        self.assertEqual(context.exception.code, 429)
+        self.assertEqual(server.stats["rate_limited"], 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,140 @@
+import json
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+from fioneer.pipeline import Pipeline, Stage
+
+# Copies every raw/*.txt to out/*.txt upper-cased (or only the files given) and logs its arguments
+PROCESS = """
+import sys
+from pathlib import Path
+suffix = Path('config.txt').read_text()
+with open('calls.log', 'a') as log:
+    log.write(' '.join(sys.argv[1:]) + '\\n')
+paths = [Path(p) for p in sys.argv[1:] if not p.startswith('-')] or sorted(Path('raw').glob('*.txt'))
+Path('out').mkdir(exist_ok=True)
+for path in paths:
+    (Path('out') / path.name).write_text(path.read_text().upper() + suffix)
+"""
+
+SUMMARIZE = "from pathlib import Path; Path('summary.txt').write_text(str(len(list(Path('out').glob('*.txt')))))"
+
+class TestPipeline(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        (self.root / "raw").mkdir()
+        for name in ("a", "b", "c"):
+            (self.root / "raw" / f"{name}.txt").write_text(name)
+        (self.root / "config.txt").write_text("!")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def pipeline(self) -> Pipeline:
+        return Pipeline([
+            Stage(
+                "process",
+                ["python", "-c", PROCESS],
+                inputs=["raw/*.txt", "config.txt"],
+                outputs=["out/*.txt"],
+                items="raw/*.txt",
+                item_output=lambda path: Path("out") / path.name,
+                full_rerun_args=["--overwrite"],
+            ),
+            Stage("summarize", ["python", "-c", SUMMARIZE], inputs=["out/*.txt"], outputs=["summary.txt"]),
+            Stage("fail", ["python", "-c", "raise SystemExit(1)"], inputs=["config.txt"], outputs=["never.txt"]),
+            Stage("after_fail", ["python", "-c", "pass"], inputs=["never.txt"], outputs=["unused.txt"]),
+        ], root=self.root)
+
+    def calls(self):
+        return (self.root / "calls.log").read_text().splitlines()
+
+    def test_dependencies_follow_declared_files(self):
+        pipeline = self.pipeline()
+        self.assertEqual(pipeline.dependencies["summarize"], ["process"])
+        self.assertEqual(pipeline.selected(["summarize"]), ["process", "summarize"])
+
+    def test_reruns_only_changed_stages_and_items(self):
+        results = self.pipeline().run(["summarize"])
+        self.assertEqual(results, {"process": "ran", "summarize": "ran"})
+        self.assertEqual((self.root / "summary.txt").read_text(), "3")
+
+        # Nothing changed: a fresh runner reads the recorded hashes and skips everything
+        self.assertEqual(self.pipeline().run(["summarize"]), {"process": "skipped", "summarize": "skipped"})
+
+        # One item changed: only that item is reprocessed
+        (self.root / "raw" / "b.txt").write_text("bee")
+        self.pipeline().run(["summarize"])
+        self.assertEqual(self.calls()[-1], "raw/b.txt")
+        self.assertEqual((self.root / "out" / "b.txt").read_text(), "BEE!")
+
+        # A deleted output makes its item stale
+        (self.root / "out" / "c.txt").unlink()
+        self.pipeline().run(["process"])
+        self.assertEqual(self.calls()[-1], "raw/c.txt")
+
+        # A shared input changed: every item is reprocessed
+        (self.root / "config.txt").write_text("?")
+        self.pipeline().run(["summarize"])
+        self.assertEqual(self.calls()[-1], "--overwrite")
+        self.assertEqual((self.root / "out" / "a.txt").read_text(), "A?")
+
+    def test_item_inputs_limit_shared_changes_to_affected_items(self):
+        def labels(root, items):
+            table = json.loads((root / "labels.json").read_text())
+            return [table.get(item.stem) for item in items]
+
+        (self.root / "labels.json").write_text(json.dumps({"a": 1, "b": 2}))
+        def pipeline():
+            return Pipeline([
+                Stage(
+                    "process",
+                    ["python", "-c", PROCESS],
+                    inputs=["raw/*.txt", "labels.json", "config.txt"],
+                    outputs=["out/*.txt"],
+                    items="raw/*.txt",
+                    item_output=lambda path: Path("out") / path.name,
+                    full_rerun_args=["--overwrite"],
+                    item_inputs=labels,
+                ),
+                Stage("summarize", ["python", "-c", SUMMARIZE], inputs=["out/*.txt"], outputs=["summary.txt"]),
+            ], root=self.root)
+        pipeline().run(["process"])
+
+        # Only the items whose entry changed or appeared are reprocessed
+        (self.root / "labels.json").write_text(json.dumps({"a": 1, "b": 3, "c": 4, "z": 0}))
+        self.assertEqual(pipeline().run(["process"]), {"process": "ran"})
+        self.assertEqual(self.calls()[-1], "raw/b.txt raw/c.txt")
+        (self.root / "labels.json").write_text(json.dumps({"a": 1, "b": 3, "c": 4}))
+        self.assertEqual(pipeline().run(["process"]), {"process": "skipped"})
+
+        # A dry run shows the item-level plan, and downstream stages run without a full rerun
+        (self.root / "raw" / "a.txt").write_text("ay")
+        with patch("builtins.print") as printed:
+            results = pipeline().run(["summarize"], dry_run=True)
+        self.assertEqual(results, {"process": "would run", "summarize": "would run"})
+        lines = [call.args[0] for call in printed.call_args_list]
+        self.assertTrue(any(line.startswith("[process] would run") and line.endswith("raw/a.txt") for line in lines))
+
+    def test_stage_with_missing_module_is_skipped_until_installed(self):
+        stage = Stage("export", ["python", "-c", "pass"], inputs=["config.txt"], outputs=["export.txt"],
+                      requires=["no_such_module_for_fioneer"])
+        pipeline = Pipeline([stage], root=self.root)
+        self.assertEqual(pipeline.run(), {"export": "skipped"})
+        self.assertNotIn("export", pipeline.state)
+
+    def test_failure_blocks_downstream_stages(self):
+        results = self.pipeline().run(["after_fail", "summarize"])
+        self.assertEqual(results["fail"], "failed")
+        self.assertEqual(results["after_fail"], "blocked")
+        self.assertEqual(results["summarize"], "ran")
+
+    def test_dry_run_changes_nothing(self):
+        results = self.pipeline().run(["summarize"], dry_run=True)
+        self.assertEqual(results, {"process": "would run", "summarize": "would run"})
+        self.assertFalse((self.root / "out").exists())
+
+if __name__ == '__main__':
+    unittest.main()
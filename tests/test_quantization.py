@@ -0,0 +1,35 @@
+import tempfile
+import unittest
+from pathlib import Path
+import numpy as np
+from fioneer.embeddings.quantization import find_embedding_file, load_embeddings, save_embeddings
+
+class TestEmbeddingQuantization(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.embeddings_dir = Path(self.tmp.name)
+        rng = np.random.default_rng(0)
+        self.embeddings = rng.standard_normal((8, 64)).astype(np.float32)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_round_trip_per_dtype(self):
+        for dtype, tolerance in [("float32", 0), ("float16", 1e-2), ("int8", 3e-2)]:
+            path = save_embeddings(self.embeddings_dir, f"AAPL_2024_Q{dtype}", self.embeddings, dtype)
+            loaded = load_embeddings(path)
+            self.assertEqual(loaded.dtype, np.float32)
+            self.assertEqual(loaded.shape, self.embeddings.shape)
+            np.testing.assert_allclose(loaded, self.embeddings, atol=tolerance)
+
+    def test_int8_file_is_found_by_stem(self):
+        save_embeddings(self.embeddings_dir, "AAPL_2024_Q1", self.embeddings, "int8")
+        self.assertEqual(find_embedding_file(self.embeddings_dir, "AAPL_2024_Q1").suffix, ".npz")
+        self.assertIsNone(find_embedding_file(self.embeddings_dir, "AAPL_2024_Q2"))
+
+    def test_unknown_dtype(self):
+        with self.assertRaises(ValueError):
+            save_embeddings(self.embeddings_dir, "AAPL_2024_Q1", self.embeddings, "bfloat16")
+
+if __name__ == '__main__':
+    unittest.main()
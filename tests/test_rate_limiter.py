@@ -0,0 +1,109 @@
+import asyncio
+import os
+import threading
+import time
+import unittest
+from unittest.mock import patch
+from fioneer.config import get_settings
+from fioneer.llm import openai_client
+from fioneer.llm.rate_limiter import AdaptiveRateLimiter, parse_duration
+from fioneer.testing import MockOpenAIServer
+
+class TestAdaptiveRateLimiter(unittest.TestCase):
+    def test_parse_duration(self):
+        self.assertEqual(parse_duration("20ms"), 0.02)
+        self.assertEqual(parse_duration("6m0s"), 360.0)
+        self.assertEqual(parse_duration("1.5s"), 1.5)
+        self.assertEqual(parse_duration("2"), 2.0)
+        self.assertIsNone(parse_duration(None))
+
+    def test_paces_requests_to_quota(self):
+        # 600 rpm with a 0.1s burst: one request every 0.1s after the first
+        limiter = AdaptiveRateLimiter(rpm=600, burst_seconds=0.1)
+        start = time.monotonic()
+        for _ in range(6):
+            limiter.acquire("chat", 1)
+        self.assertGreater(time.monotonic() - start, 0.4)
+
+    def test_headers_reset_quota(self):
+        limiter = AdaptiveRateLimiter()
+        limiter.acquire("chat", 10)
+        limiter.update({
+            "x-ratelimit-limit-requests": "60",
+            "x-ratelimit-remaining-requests": "0",
+            "x-ratelimit-reset-requests": "200ms",
+        })
+        # Refill alone would take a second; the reset header says 0.2s
+        waited = limiter.acquire("chat", 10)
+        self.assertGreater(waited, 0.15)
+        self.assertLess(waited, 0.6)
+
+    def test_kinds_are_served_round_robin(self):
+        limiter = AdaptiveRateLimiter(rpm=1200, burst_seconds=0.05)
+        order, lock = [], threading.Lock()
+
+        def worker(kind):
+            limiter.acquire(kind, 1)
+            with lock:
+                order.append(kind)
+
+        threads = [threading.Thread(target=worker, args=("chat",)) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        time.sleep(0.05)
+        embedding_threads = [threading.Thread(target=worker, args=("embeddings",)) for _ in range(3)]
+        for thread in embedding_threads:
+            thread.start()
+        for thread in threads + embedding_threads:
+            thread.join()
+        # Embeddings queued behind eight chat calls still go out within the first few grants
+        self.assertLess(max(i for i, kind in enumerate(order) if kind == "embeddings"), 8)
+
+class TestRateLimitedClient(unittest.TestCase):
+    def setUp(self):
+        self.server = MockOpenAIServer(rpm_limit=3, rate_limit_window_seconds=1.0).start()
+        self.env = patch.dict(os.environ, {"OPENAI_BASE_URL": self.server.base_url, "OPENAI_API_KEY": "mock"})
+        self.env.start()
+        self.clear_caches()
+
+    def tearDown(self):
+        self.clear_caches()
+        self.env.stop()
+        self.server.stop()
+
+    def clear_caches(self):
+        get_settings.cache_clear()
+        openai_client.get_openai_client.cache_clear()
+        openai_client.get_rate_limiter.cache_clear()
+
+    def test_no_request_is_dropped_under_rate_limits(self):
+        messages = [{"role": "user", "content": f"Section {i}. Revenue grew."} for i in range(8)]
+        gaps = []
+
+        async def heartbeat(done: asyncio.Event):
+            loop = asyncio.get_running_loop()
+            last = loop.time()
+            while not done.is_set():
+                await asyncio.sleep(0.01)
+                gaps.append(loop.time() - last)
+                last = loop.time()
+
+        async def run():
+            done = asyncio.Event()
+            beat = asyncio.create_task(heartbeat(done))
+            try:
+                return await asyncio.gather(*(openai_client.chat_completion([message]) for message in messages))
+            finally:
+                done.set()
+                await beat
+
+        results = asyncio.run(run())
+
+        self.assertEqual(len(results), len(messages))
+        self.assertTrue(all(results))
+        self.assertEqual(self.server.stats["chat"] - self.server.stats["rate_limited"], len(messages))
+        # Rate-limit waits happen off the event loop
+        self.assertLess(max(gaps), 0.5)
+
+if __name__ == '__main__':
+    unittest.main()
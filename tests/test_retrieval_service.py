@@ -0,0 +1,106 @@
+import asyncio
+import time
+import unittest
+import faiss
+import numpy as np
+from fastapi.testclient import TestClient
+from fioneer.retrieval.faiss_retriever import FaissRetriever
+from fioneer.retrieval.service import QueryBatcher, create_app
+
+DIMENSION = 8
+
+def build_retriever(n: int = 20) -> FaissRetriever:
+    """Retriever over random vectors whose embedder maps 'doc i' to vector i"""
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((n, DIMENSION)).astype(np.float32)
+    faiss.normalize_L2(vectors)
+    retriever = FaissRetriever()
+    retriever.index = faiss.IndexFlatIP(DIMENSION)
+    retriever.index.add(vectors)
+    retriever.metadata = [{"ticker": f"T{i}"} for i in range(n)]
+    retriever.embedding_calls = []
+
+    async def generate_embeddings(texts):
+        retriever.embedding_calls.append(len(texts))
+        return vectors[[int(text.split()[1]) for text in texts]]
+
+    retriever.embedding_generator.generate_embeddings = generate_embeddings
+    return retriever
+
+class TestQueryBatcher(unittest.TestCase):
+    def test_concurrent_queries_share_one_batch(self):
+        retriever = build_retriever()
+
+        async def run():
+            batcher = QueryBatcher(retriever, window_ms=20)
+            batcher.start()
+            results = await asyncio.gather(*(batcher.search(f"doc {i}", k=i % 3 + 1) for i in range(10)))
+            await batcher.stop()
+            return batcher, results
+
+        batcher, results = asyncio.run(run())
+        self.assertEqual(list(batcher.batch_sizes), [10])
+        self.assertEqual(retriever.embedding_calls, [10])
+        for i, result in enumerate(results):
+            self.assertEqual(len(result), i % 3 + 1)
+            self.assertEqual(result[0]["metadata"]["ticker"], f"T{i}")
+
+class SlowIndex:
+    """Index wrapper whose search blocks like a large flat scan"""
+
+    def __init__(self, index, seconds: float):
+        self.index = index
+        self.seconds = seconds
+        self.d = index.d
+        self.ntotal = index.ntotal
+
+    def search(self, queries, k):
+        time.sleep(self.seconds)
+        return self.index.search(queries, k)
+
+class TestSearchExecutor(unittest.TestCase):
+    def test_search_does_not_block_event_loop(self):
+        retriever = build_retriever()
+        retriever.index = SlowIndex(retriever.index, seconds=0.2)
+
+        async def run():
+            ticks = 0
+
+            async def heartbeat():
+                nonlocal ticks
+                while True:
+                    await asyncio.sleep(0.01)
+                    ticks += 1
+
+            beat = asyncio.create_task(heartbeat())
+            results = await retriever.search_batch(["doc 4"], k=1)
+            beat.cancel()
+            return ticks, results
+
+        ticks, results = asyncio.run(run())
+        self.assertEqual(results[0][0]["metadata"]["ticker"], "T4")
+        # The loop kept running while the search slept on the executor thread
+        self.assertGreater(ticks, 5)
+
+class TestRetrievalService(unittest.TestCase):
+    def test_endpoints(self):
+        app = create_app(retriever=build_retriever(), window_ms=1)
+        with TestClient(app) as client:
+            self.assertEqual(client.get("/health").json(), {"status": "ok"})
+            self.assertEqual(client.get("/ready").json(), {"status": "ready", "vectors": 20})
+            response = client.post("/search", json={"query": "doc 3", "k": 2})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.json()["results"][0]["metadata"]["ticker"], "T3")
+            self.assertEqual(client.post("/search", json={"query": ""}).status_code, 422)
+            metrics = client.get("/metrics").text
+            self.assertIn('retrieval_stage_seconds_count{stage="search"}', metrics)
+
+    def test_not_ready_without_index(self):
+        retriever = FaissRetriever()
+        app = create_app(index_dir="/nonexistent", retriever=retriever)
+        with TestClient(app) as client:
+            self.assertEqual(client.get("/ready").status_code, 503)
+            self.assertEqual(client.post("/search", json={"query": "q"}).status_code, 503)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+import unittest
+import faiss
+import numpy as np
+from fioneer.retrieval.faiss_retriever import FaissRetriever
+from fioneer.retrieval.router import AhoCorasick, EntityRouter, Route, RowIndex
+
+METADATA = [
+    {"ticker": "AAPL", "company": "Apple Inc.", "year": 2024, "q": 3},
+    {"ticker": "AAPL", "company": "Apple Inc.", "year": 2024, "q": 2},
+    {"ticker": "A", "company": "Agilent Technologies, Inc.", "year": 2024, "q": 3},
+    {"ticker": "AXP", "company": "American Express Company", "year": 2023, "q": 1},
+    {"ticker": "AAL", "company": "American Airlines Group Inc.", "year": 2024, "q": 3},
+    {"ticker": "AI", "company": "C3.ai, Inc.", "year": 2024, "q": 3},
+]
+
+class TestEntityRouter(unittest.TestCase):
+    def setUp(self):
+        self.router = EntityRouter.from_metadata(METADATA, aliases={"AAPL": ["iPhone maker"]})
+
+    def test_aho_corasick_finds_overlapping_keys(self):
+        matcher = AhoCorasick({"he": "he", "she": "she", "hers": "hers"})
+        self.assertEqual(sorted(value for _, _, value in matcher.find("ushers")), ["he", "hers", "she"])
+
+    def test_company_names_and_tickers(self):
+        self.assertEqual(self.router.entities("How will tariffs impact Apple?"), {"AAPL"})
+        self.assertEqual(self.router.entities("What did the iPhone maker say about China"), {"AAPL"})
+        self.assertEqual(self.router.entities("AAPL vs $A margins"), {"AAPL", "A"})
+        self.assertEqual(self.router.entities("American Airlines and American Express"), {"AAL", "AXP"})
+        # Word boundaries, single-letter tickers and common acronyms do not match on their own
+        self.assertEqual(self.router.entities("Pineapple and applesauce demand"), set())
+        self.assertEqual(self.router.entities("How is AI changing A grade credit?"), set())
+
+    def test_common_word_company_names(self):
+        router = EntityRouter.from_metadata([
+            {"ticker": "AAPL", "company": "Apple Inc."},
+            {"ticker": "TGT", "company": "Target Corporation"},
+            {"ticker": "BKNG", "company": "Booking Holdings Inc."},
+            {"ticker": "XYZ", "company": "Block, Inc."},
+            {"ticker": "DLR", "company": "Digital Realty Trust, Inc."},
+            {"ticker": "RF", "company": "Regions Financial Corporation"},
+            {"ticker": "STLD", "company": "Steel Dynamics, Inc."},
+            {"ticker": "IR", "company": "Ingersoll Rand Inc."},
+        ], aliases={"XYZ": ["Square"]})
+        self.assertEqual(router.entities("How is digital advertising growing across regions?"), set())
+        self.assertEqual(router.entities("price target after the steel tariffs"), set())
+        self.assertEqual(router.entities("booking trends and the IR day"), set())
+        self.assertEqual(router.entities("Apple commentary on block trades"), {"AAPL"})
+        # Capitalized single-word names, full names, aliases and tickers still route
+        self.assertEqual(router.entities("Target holiday sales"), {"TGT"})
+        self.assertEqual(router.entities("Booking versus regions financial"), {"BKNG", "RF"})
+        self.assertEqual(router.entities("square seller growth at $IR"), {"XYZ", "IR"})
+
+    def test_periods(self):
+        self.assertEqual(EntityRouter.periods("Apple Q3 2024 guidance"), {(2024, 3)})
+        self.assertEqual(EntityRouter.periods("2023Q1 vs Q2'24"), {(2023, 1), (2024, 2)})
+        self.assertEqual(EntityRouter.periods("third quarter of fiscal 2023"), {(2023, 3)})
+        self.assertEqual(EntityRouter.periods("capex in 2024"), {(2024, None)})
+        self.assertEqual(EntityRouter.periods("what changed in Q4"), {(None, 4)})
+
+    def test_row_index_narrows_and_falls_back(self):
+        rows = RowIndex(METADATA)
+        self.assertEqual(rows.rows(self.router.route("Apple Q2 2024")).tolist(), [1])
+        # Apple has no 2023 calls, so the period is dropped rather than returning nothing
+        self.assertEqual(rows.rows(self.router.route("Apple in 2023")).tolist(), [0, 1])
+        self.assertEqual(rows.rows(self.router.route("Q3 2024 outlook")).tolist(), [0, 2, 4, 5])
+        self.assertIsNone(rows.rows(Route()))
+        self.assertIs(rows.rows(self.router.route("Apple Q2 2024")), rows.rows(self.router.route("Apple 2024 q2")))
+
+class TestRoutedSearch(unittest.TestCase):
+    def test_routed_queries_only_see_their_subset(self):
+        vectors = np.random.default_rng(0).standard_normal((len(METADATA), 8)).astype(np.float32)
+        faiss.normalize_L2(vectors)
+        retriever = FaissRetriever(routing=True)
+        retriever.index = faiss.IndexFlatIP(8)
+        retriever.index.add(vectors)
+        retriever.metadata = METADATA
+        retriever.router = EntityRouter.from_metadata(METADATA)
+        retriever.row_index = RowIndex(METADATA)
+
+        queries = ["Apple guidance", "Airline capacity in 2023?", "Apple margins", "general question"]
+        subsets = retriever.route_queries(queries)
+        # Every query looks exactly like the AXP call, so only routing keeps it out of Apple's results
+        results = retriever.search_by_vectors(np.repeat(vectors[3:4], len(queries), axis=0), k=3, subsets=subsets)
+
+        self.assertEqual({r["metadata"]["ticker"] for r in results[0]}, {"AAPL"})
+        self.assertEqual(len(results[0]), 2)
+        self.assertEqual(results[1][0]["metadata"]["ticker"], "AXP")
+        self.assertEqual([r["metadata"] for r in results[2]], [r["metadata"] for r in results[0]])
+        self.assertEqual(results[3][0]["metadata"]["ticker"], "AXP")
+        self.assertEqual(len(results[3]), 3)
+
+if __name__ == "__main__":
+    unittest.main()
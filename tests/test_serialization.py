@@ -0,0 +1,58 @@
+import importlib.util
+import math
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+from fioneer import serialization
+
+HAS_MSGPACK = importlib.util.find_spec("msgpack") is not None
+
+DATA = [{"ticker": "AAPL", "year": 2024, "q": 2, "insight": "Services margin hit a record — 74%",
+         "reasoning_steps": ["Mix shift", "Pricing"], "score": 0.5, "duplicates": None}]
+
+class TestSerialization(unittest.TestCase):
+    def round_trip(self, fmt: str):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / f"metadata{serialization.FORMATS[fmt]}"
+            serialization.save(DATA, path)
+            self.assertEqual(serialization.load(path), DATA)
+            self.assertEqual([p.name for p in Path(tmp).iterdir()], [path.name])
+
+    def test_json_round_trip(self):
+        self.round_trip("json")
+        self.round_trip("json.gz")
+
+    @unittest.skipUnless(HAS_MSGPACK, "msgpack is not installed")
+    def test_msgpack_round_trip(self):
+        self.round_trip("msgpack")
+        self.round_trip("msgpack.gz")
+
+    def test_json_stays_readable(self):
+        text = serialization.dumps(DATA, "json").decode("utf-8")
+        self.assertIn('\n  {\n    "ticker": "AAPL"', text)
+        self.assertIn("—", text)
+
+    def test_json_keys_and_nan_do_not_depend_on_orjson(self):
+        self.assertEqual(serialization.loads(serialization.dumps({2024: [1]}, "json")), {"2024": [1]})
+        # Files written by the json module spell missing values NaN
+        loaded = serialization.loads(b'[{"sector": NaN}]')
+        self.assertTrue(math.isnan(loaded[0]["sector"]))
+
+    def test_failed_write_leaves_no_temp_file(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "metadata.json"
+            serialization.save(DATA, path)
+            with patch("os.replace", side_effect=OSError("disk full")), self.assertRaises(OSError):
+                serialization.save([], path)
+            self.assertEqual([p.name for p in Path(tmp).iterdir()], [path.name])
+            self.assertEqual(serialization.load(path), DATA)
+
+    def test_format_from_suffix(self):
+        self.assertEqual(serialization.format_of(Path("a/metadata.msgpack.gz")), "msgpack.gz")
+        self.assertEqual(serialization.format_of(Path("AAPL_2024_Q2.json")), "json")
+        with self.assertRaises(ValueError):
+            serialization.format_of(Path("metadata.pkl"))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,41 +1,40 @@
+import asyncio
 import unittest
-from unittest.mock import patch, MagicMock
+from unittest.mock import AsyncMock, patch
 import numpy as np
 from fioneer.embeddings.vectorizer import EmbeddingGenerator
 
 class TestEmbeddingGenerator(unittest.TestCase):
     def setUp(self):
         self.embedding_generator = EmbeddingGenerator()
-        
+
     def test_generate_embedding_success(self):
         # Test data
         transcripts = ["Hello world", "Test text"]
         mock_embeddings = [[0.1, 0.2, 0.3], [0.4, 0.5, 0.6]]
-        
+
         # Mock OpenAI API response
-        mock_response = {
-            "data": [
-                {"embedding": mock_embeddings[0]},
-                {"embedding": mock_embeddings[1]}
-            ]
-        }
-        
-        with patch('openai.Embedding.create', return_value=mock_response):
-            result = self.embedding_generator.generate_embedding(transcripts)
-            
+        with patch('fioneer.embeddings.backends.create_embeddings', AsyncMock(return_value=mock_embeddings)):
+            result = asyncio.run(self.embedding_generator.generate_embeddings(transcripts))
+
             self.assertIsInstance(result, np.ndarray)
             self.assertEqual(result.shape, (2, 3))
             np.testing.assert_array_almost_equal(result, np.array(mock_embeddings))
 
     def test_generate_embedding_empty_input(self):
         with self.assertRaises(ValueError):
-            self.embedding_generator.generate_embedding([])
+            asyncio.run(self.embedding_generator.process_items([]))
 
     def test_generate_embedding_api_error(self):
-        with patch('openai.Embedding.create', side_effect=Exception("API Error")):
+        with patch('fioneer.embeddings.backends.create_embeddings', AsyncMock(side_effect=Exception("API Error"))):
+            with self.assertRaises(Exception) as context:
+                asyncio.run(self.embedding_generator.generate_embedding("test"))
+            self.assertIn("API Error", str(context.exception))
+
+            # Failed document batches are skipped; all of them failing is an error
             with self.assertRaises(ValueError) as context:
-                self.embedding_generator.generate_embedding(["test"])
-            self.assertIn("Failed to generate embeddings", str(context.exception))
+                asyncio.run(self.embedding_generator.process_items([{}]))
+            self.assertIn("Failed to generate any embeddings", str(context.exception))
 
     def test_custom_model(self):
         custom_model = "text-embedding-3-large"
@@ -43,4 +42,4 @@ class TestEmbeddingGenerator(unittest.TestCase):
         self.assertEqual(generator.model, custom_model)
 
 if __name__ == '__main__':
-    unittest.main()
\ No newline at end of file
+    unittest.main()